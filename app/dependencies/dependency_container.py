@@ -12,13 +12,14 @@ from app.services.caching_service import CachingService
 from app.recommenders.content_based_recommender import ContentBasedRecommender
 from app.recommenders.collaborative_based_recommender import CollaborativeBasedRecommender
 from app.recommenders.hybrid_based_recommender import HybridRecommender
-from app.services.score_combiner import ScoreCombiner 
+from app.services.score_combiner import ScoreCombiner, ArrayScoreCombiner, VehicleIdIndex
 from app.services.model_serving_service import ModelServingService
 from app.db import DatabaseManager
 from app.services.user_context_service import MLUserContextService
 from app.services.feedback_service import FeedbackService
 from app.services.ai_assistant_service import AIQueryService
 from config.app_config import settings
+from config.ml_config import MLConfig
 from app.services.query_executor import QueryExecutor
 from app.utils.openai_client import OpenAIClient
 from app.services.popular_query_service import PopularQueryService
@@ -82,11 +83,16 @@ class DependencyContainer:
             self._instances[interface] = ContentBasedRecommender(
                 vehicle_repository=self._vehicle_repo,
                 model_service=self.model_serving_service,      
-                caching_service=self._caching_service
+                caching_service=self._caching_service,
+                weight_profiles=MLConfig().similarity_weight_profiles,
             )
         elif interface.__name__ == "ICollaborativeRecommender":
+            config = MLConfig()
             self._instances[interface] = CollaborativeBasedRecommender(
-                model_serving=self.model_serving_service,        
+                model_serving=self.model_serving_service,
+                user_repo=self._user_repo if config.collaborative_fold_in else None,
+                interaction_weights=config.interaction_weights,
+                fold_in_cache_size=config.fold_in_cache_size,
             )
         elif interface.__name__ == "IHybridRecommender":
             self._instances[interface] = HybridRecommender(
@@ -97,7 +103,16 @@ class DependencyContainer:
                 score_combiner=self.get(IScoreCombiner)
             )
         elif interface.__name__ == "IScoreCombiner":
-            self._instances[interface] = ScoreCombiner()
+            config = MLConfig()
+            if config.score_combiner == "array":
+                self._instances[interface] = ArrayScoreCombiner(
+                    fusion=config.score_fusion,
+                    normalization=config.score_normalization,
+                    rrf_k=config.rrf_k,
+                    vehicle_index=VehicleIdIndex(source=lambda: self._vehicle_repo.vehicle_ids),
+                )
+            else:
+                self._instances[interface] = ScoreCombiner()
         elif interface.__name__ == "IRecommendationOrchestrator":
             self._instances[interface] = self._orchestrator
         elif interface.__name__ == "IAssistantOrchestrator":
@@ -21,6 +21,14 @@ class ModelNotAvailableError(RecommendationServiceError):
             error_code="MODEL_NOT_AVAILABLE"
         )
 
+class InvalidWeightProfileError(RecommendationServiceError):
+    """Raised when a similarity weight profile is unknown or invalid."""
+    def __init__(self, message: str):
+        super().__init__(
+            message=message,
+            error_code="INVALID_WEIGHT_PROFILE"
+        )
+
 class InsufficientDataError(RecommendationServiceError):
     """Raised when there's not enough data to generate recommendations."""
     def __init__(self, user_id: int):
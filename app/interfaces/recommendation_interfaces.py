@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any, Tuple
+from typing import AsyncIterator, List, Dict, Mapping, Optional, Any, Sequence, Tuple
 import pandas as pd
-from app.schemas.schemas import RecommendationResponse, SimilarVehiclesResponse
+from app.schemas.schemas import RecommendationResponse, SimilarVehiclesResponse, BatchRecommendationItem
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from app.models.feature_store import FeatureSet
     from app.strategies.recommendation_strategies import RecommendationStrategy
 
 class IVehicleRepository(ABC):
@@ -18,12 +19,12 @@ class IVehicleRepository(ABC):
         pass
 
     @abstractmethod
-    def get_vehicle_by_id(self, vehicle_id: int) -> Optional[Dict[str, Any]]:
+    def get_vehicle_by_id(self, vehicle_id: int) -> Optional[Mapping[str, Any]]:
         pass
 
     @staticmethod
     @abstractmethod
-    def extract_vehicle_features(row: pd.Series | Dict[str, Any]) -> Dict[str, str]:
+    def extract_vehicle_features(row: pd.Series | Mapping[str, Any]) -> Dict[str, str]:
         pass
 
 class IMLModelService(ABC):
@@ -32,6 +33,14 @@ class IMLModelService(ABC):
     async def prepare_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         pass
 
+    @abstractmethod
+    async def prepare_features(self) -> "FeatureSet":
+        pass
+
+    @abstractmethod
+    async def train_all_models(self, models: Optional[Sequence[str]] = None) -> None:
+        pass
+
     @abstractmethod
     async def train_vehicle_similarity_model(self) -> None:
         pass
@@ -52,7 +61,12 @@ class IRecommendationOrchestrator(ABC):
         pass
 
     @abstractmethod
-    async def get_similar_vehicles(self, vehicle_id: int, top_n: int) -> SimilarVehiclesResponse:
+    def get_batch_recommendations(self, user_ids: List[int], top_n: int) -> AsyncIterator[BatchRecommendationItem]:
+        pass
+
+    @abstractmethod
+    async def get_similar_vehicles(self, vehicle_id: int, top_n: int, profile: Optional[str] = None,
+                                   weights: Optional[Dict[str, float]] = None) -> SimilarVehiclesResponse:
         pass
 
 class IUserRepository(ABC):
@@ -61,6 +75,11 @@ class IUserRepository(ABC):
     async def user_exists(self, user_id: int) -> bool:
         pass
 
+    @abstractmethod
+    async def get_interaction_stamps(self, user_ids: List[int]) -> Dict[int, str]:
+        """Fingerprint of each existing user's interactions; unknown users are absent."""
+        pass
+
     @abstractmethod
     async def load_interactions_summary(self) -> pd.DataFrame:
         pass
@@ -72,9 +91,13 @@ class IUserRepository(ABC):
 class IContentBasedRecommender(ABC):
     @abstractmethod
     async def get_similar_vehicles(
-        self, vehicle_id: int, top_n: int
+        self, vehicle_id: int, top_n: int, profile: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None
     ) -> SimilarVehiclesResponse:
-        """Return vehicles similar to the given one (with enrichment)."""
+        """
+        Return vehicles similar to the given one (with enrichment). A named `profile`
+        and/or explicit feature `weights` rank by query-time weighted similarity instead.
+        """
         pass
 
     @abstractmethod
@@ -84,14 +107,30 @@ class IContentBasedRecommender(ABC):
         """Return only similarity scores without enrichment."""
         pass
 
+    @abstractmethod
+    async def get_content_scores(
+        self, interactions: List[Dict], top_n: int, model_name: str = "user_similarity"
+    ) -> Dict[int, float]:
+        """Aggregate weighted similarity scores over a user's interactions."""
+        pass
+
 class ICollaborativeRecommender(ABC):
     @abstractmethod
     async def get_collaborative_recommendations(
-        self, user_id: int, top_n: int
+        self, user_id: int, top_n: int, exclude_seen: bool = False,
+        interactions: Optional[Dict[int, List[Dict]]] = None,
     ) -> Dict[int, float]:
         """Generate recommendations using collaborative filtering"""
         pass
 
+    @abstractmethod
+    async def get_batch_collaborative_recommendations(
+        self, user_ids: List[int], top_n: int, exclude_seen: bool = False,
+        interactions: Optional[Dict[int, List[Dict]]] = None,
+    ) -> Dict[int, Dict[int, float]]:
+        """Collaborative recommendations for many users from one matrix multiply"""
+        pass
+
 class IHybridRecommender(ABC):
     @abstractmethod
     async def get_recommendations(
@@ -110,4 +149,16 @@ class IScoreCombiner(ABC):
         collaborative_weight: float = 0.5,
     ) -> Dict[int, float]:
         """Combine content-based and collaborative scores into a hybrid score dict"""
-        pass
\ No newline at end of file
+        pass
+
+    def combine_top_n(
+        self,
+        content_scores: Dict[int, float],
+        collaborative_scores: Dict[int, float],
+        content_weight: float = 0.5,
+        collaborative_weight: float = 0.5,
+        top_n: int = 10,
+    ) -> List[Tuple[int, float]]:
+        """Highest `top_n` hybrid scores as (vehicle_id, score), best first"""
+        combined = self.combine(content_scores, collaborative_scores, content_weight, collaborative_weight)
+        return sorted(combined.items(), key=lambda kv: kv[1], reverse=True)[:top_n]
@@ -4,7 +4,6 @@ from contextlib import asynccontextmanager
 import logging
 import asyncio
 import time
-import os
 from redis.asyncio import Redis
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -15,12 +14,17 @@ from app.repositories.user_repository import UserRepository
 from app.services.ml_service import MLModelService
 from app.orchestrators.recommendation_orchestrator import RecommendationOrchestrator
 from app.services.caching_service import CachingService
+from app.services.materialization_service import RecommendationMaterializer
+from app.services.catalog_refresh_service import CatalogRefresher
+from app.services.training_runner import ModelUpdateListener, TrainingRunner
+from app.services.retrain_scheduler import RetrainScheduler
 from app.middleware.rate_limit_middleware import limiter
 from app.dependencies.dependency_container import DependencyContainer
 from config.ml_config import MLConfig
 from config.app_config import settings
 from .routes import recommendation_routes
 from app.services.model_serving_service import ModelServingService
+from app.models import model_persistance
 from app.strategies.recommendation_strategies import RecommendationStrategyFactory, RecommendationStrategy
 from app.routes import ai_assistant_routes, recommendation_routes, health
 from app.observability.metrics import attach_metrics
@@ -42,6 +46,10 @@ container: DependencyContainer | None = None
 async def lifespan(app: FastAPI):
     global container
     start_time = time.time()
+    catalog_refresher = None
+    update_listener = None
+    retrain_scheduler = None
+    catalog_redis = None
     logger.info("Starting AutoFi Vehicle Recommendation API...")
 
     async def retry_async(coro_factory, name: str):
@@ -67,13 +75,28 @@ async def lifespan(app: FastAPI):
             decode_responses=True
         )
         await retry_async(redis_client.ping, "Redis Ping")
-        vehicle_repo = VehicleRepository(pool=pool, vehicle_limit=20000)
+        # Separate client without response decoding: the catalog snapshot is binary Arrow IPC.
+        catalog_redis = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=False
+        ) if settings.CATALOG_SNAPSHOT_REDIS else None
+        vehicle_repo = VehicleRepository(
+            pool=pool,
+            vehicle_limit=settings.VEHICLE_LIMIT,
+            chunk_size=settings.CATALOG_CHUNK_SIZE,
+            redis=catalog_redis,
+            snapshot_dir=settings.CATALOG_SNAPSHOT_DIR,
+            snapshot_every=settings.CATALOG_SNAPSHOT_EVERY,
+            snapshot_min_changes=settings.CATALOG_SNAPSHOT_MIN_CHANGES
+        )
         user_repo = UserRepository(pool=pool)
 
         asyncio.create_task(vehicle_repo.load_vehicle_features())
 
         ml_config = MLConfig()
-        model_serving = ModelServingService(max_workers=4)
+        model_serving = ModelServingService(max_workers=4, load_timeout=settings.MODEL_LOAD_TIMEOUT)
         caching_service = CachingService(redis_client=redis_client)
         ml_service = MLModelService(
             user_repo=user_repo,
@@ -82,6 +105,19 @@ async def lifespan(app: FastAPI):
             config=ml_config
         )
 
+        materializer = RecommendationMaterializer(
+            caching_service=caching_service,
+            model_serving=model_serving,
+            user_repo=user_repo,
+            top_n=settings.MATERIALIZED_TOP_N,
+            ttl=settings.MATERIALIZED_TTL,
+        ) if settings.MATERIALIZE_RECOMMENDATIONS else None
+
+        training_runner = TrainingRunner(
+            model_serving=model_serving,
+            notify_channel=settings.TRAINING_NOTIFY_CHANNEL
+        ) if settings.TRAINING_WORKER else None
+
         strategy_factory = RecommendationStrategyFactory(None)
 
         orchestrator = RecommendationOrchestrator(
@@ -91,7 +127,10 @@ async def lifespan(app: FastAPI):
             strategy_factory=strategy_factory,
             ml_service=ml_service,
             logger=logger,
-            default_strategy=RecommendationStrategy.HYBRID
+            default_strategy=RecommendationStrategy.HYBRID,
+            model_serving=model_serving,
+            materializer=materializer,
+            training_runner=training_runner
         )
 
         container = DependencyContainer(
@@ -110,28 +149,62 @@ async def lifespan(app: FastAPI):
         logger.info("Recommendation orchestrator initialized successfully")
 
         async def train_missing_models():
-            def model_exists(name: str) -> bool:
-                paths = {
-                    "collaborative": "trained_models/collaborative_model.pkl",
-                    "vehicle_similarity": "trained_models/similarity_topk_vehicle.pkl",
-                    "user_similarity": "trained_models/similarity_topk_user.pkl",
-                }
-                path = paths.get(name)
-                return path and os.path.exists(path)
-
-            if not model_exists("vehicle_similarity"):
+            missing = [name for name in ("vehicle_similarity", "user_similarity", "collaborative")
+                       if not model_persistance.model_exists(name)]
+            if missing and training_runner is not None:
+                logger.info(f"Models not found: {missing}. Training in worker process...")
+                await training_runner.train(missing)
+                missing = []
+            features = await ml_service.prepare_features() if missing else None
+            if "vehicle_similarity" in missing:
                 logger.info("Vehicle similarity model not found. Training...")
-                await ml_service.train_vehicle_similarity_model()
-            if not model_exists("user_similarity"):
+                await ml_service.train_vehicle_similarity_model(features)
+            if "user_similarity" in missing:
                 logger.info("User similarity model not found. Training...")
-                await ml_service.train_user_similarity_model()
-            if not model_exists("collaborative"):
+                await ml_service.train_user_similarity_model(features)
+            if "collaborative" in missing:
                 logger.info("Collaborative model not found. Training...")
-                await ml_service.train_collaborative_model()
+                await ml_service.train_collaborative_model(features)
             logger.info("Model training checks completed")
 
+            if await model_serving.preload_all():
+                logger.info("All models resident, instance is ready")
+            else:
+                logger.warning("Some models could not be loaded, instance is not ready")
+
         asyncio.create_task(train_missing_models())
 
+        catalog_refresher = CatalogRefresher(
+            vehicle_repo=vehicle_repo,
+            caching_service=caching_service,
+            interval=settings.CATALOG_REFRESH_INTERVAL,
+            ml_service=ml_service
+        ) if settings.CATALOG_REFRESH_INTERVAL > 0 else None
+        if catalog_refresher:
+            catalog_refresher.start()
+
+        if settings.TRAINING_NOTIFY_CHANNEL:
+            update_listener = ModelUpdateListener(
+                redis_client=redis_client,
+                model_serving=model_serving,
+                channel=settings.TRAINING_NOTIFY_CHANNEL
+            )
+            update_listener.start()
+
+        retrain_scheduler = RetrainScheduler(
+            vehicle_repo=vehicle_repo,
+            user_repo=user_repo,
+            redis_client=redis_client,
+            retrain=orchestrator.retrain_models,
+            interval=settings.RETRAIN_INTERVAL,
+            jitter=settings.RETRAIN_JITTER,
+            min_new_interactions=settings.RETRAIN_MIN_NEW_INTERACTIONS,
+            min_vehicle_changes=settings.RETRAIN_MIN_VEHICLE_CHANGES,
+            lease_ttl=settings.RETRAIN_LEASE_TTL
+        ) if settings.RETRAIN_INTERVAL > 0 else None
+        if retrain_scheduler:
+            retrain_scheduler.start()
+
         yield
 
     except Exception as e:
@@ -143,6 +216,17 @@ async def lifespan(app: FastAPI):
 
     finally:
         logger.info("Shutting down AutoFi Vehicle Recommendation API...")
+        if catalog_refresher:
+            await catalog_refresher.stop()
+        if update_listener:
+            await update_listener.stop()
+        if retrain_scheduler:
+            await retrain_scheduler.stop()
+        if catalog_redis is not None:
+            try:
+                await catalog_redis.aclose()
+            except Exception as e:
+                logger.error(f"Error closing catalog Redis client: {e}")
         try:
             await db_manager.close()
             logger.info("Database pool closed successfully")
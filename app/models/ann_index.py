@@ -0,0 +1,250 @@
+import copy
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+ANN_ARRAYS = ("vehicle_ids", "vectors", "centroids", "offsets")
+ANN_TYPE = "ivf"
+_ASSIGN_BLOCK = 4096
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    normalized = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    normalized /= norms
+    return normalized
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Closest centroid (max dot product) of every row, computed in bounded blocks."""
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        assign[start:start + _ASSIGN_BLOCK] = np.argmax(vectors[start:start + _ASSIGN_BLOCK] @ centroids.T, axis=1)
+    return assign
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int, rng: np.random.Generator,
+                      sample_size: int) -> np.ndarray:
+    sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=n_lists) > 0
+        # Empty lists keep their previous centroid.
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over L2-normalized vectors, so the
+    dot product is the cosine similarity. A spherical k-means quantizer splits the catalog
+    into `n_lists` lists; a query scans only the `n_probe` lists whose centroids are
+    closest to it, widening the probe until it has enough candidates for `top_n`.
+
+    Arrays (rows grouped by list):
+      vehicle_ids  vehicle ID of each row
+      vectors      normalized float32 feature vectors
+      centroids    (n_lists, d) normalized list centroids
+      offsets      row offsets of each list (len = n_lists + 1)
+
+    Vectors added after loading (vehicle fold-in) live in a small overlay, scanned in full
+    by every query, which shadows the rows above; those stay untouched and memory-mapped.
+    `compact` merges it.
+    """
+
+    def __init__(self, vehicle_ids: np.ndarray, vectors: np.ndarray, centroids: np.ndarray,
+                 offsets: np.ndarray, n_probe: int = 8):
+        self.vehicle_ids = vehicle_ids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+        self.n_probe = n_probe
+        self._order = np.argsort(vehicle_ids, kind="stable")
+        self._sorted_ids = np.asarray(vehicle_ids)[self._order]
+        self.overlay_ids = np.zeros(0, dtype=np.int64)
+        self.overlay_vectors = np.zeros((0, np.shape(vectors)[-1]), dtype=np.float32)
+        self._shadowed = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def build(cls, vehicle_ids: np.ndarray, vectors: np.ndarray, n_lists: Optional[int] = None,
+              n_probe: int = 8, iterations: int = 10, random_state: int = 42) -> "IVFIndex":
+        """
+        Cluster the vectors and group them by list. `n_lists` defaults to sqrt(N); the
+        quantizer is fitted on a sample of at most 256 rows per list.
+        """
+        vehicle_ids = np.asarray(vehicle_ids, dtype=np.int64)
+        vectors = _normalize(vectors) if len(vectors) else np.zeros((0, np.shape(vectors)[-1]), dtype=np.float32)
+        n = len(vehicle_ids)
+        n_lists = max(1, min(n_lists or int(np.sqrt(n)), n))
+        if n == 0:
+            return cls(vehicle_ids, vectors, np.zeros((1, vectors.shape[1]), dtype=np.float32),
+                       np.zeros(2, dtype=np.int64), n_probe)
+
+        rng = np.random.default_rng(random_state)
+        centroids = _spherical_kmeans(vectors, n_lists, iterations, rng, sample_size=256 * n_lists)
+        return cls._grouped(vehicle_ids, vectors, centroids, _nearest(vectors, centroids), n_probe)
+
+    @classmethod
+    def _grouped(cls, vehicle_ids: np.ndarray, vectors: np.ndarray, centroids: np.ndarray,
+                 assign: np.ndarray, n_probe: int) -> "IVFIndex":
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(vehicle_ids[order], np.ascontiguousarray(vectors[order]), centroids, offsets, n_probe)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.vehicle_ids) - len(self._shadowed) + len(self.overlay_ids)
+
+    def __contains__(self, vehicle_id) -> bool:
+        return self.vector_of(vehicle_id) is not None
+
+    def row_of(self, vehicle_id) -> int:
+        """Row of a vehicle in the built arrays (ignoring the overlay), -1 if absent."""
+        key = int(vehicle_id)
+        pos = int(np.searchsorted(self._sorted_ids, key))
+        if pos < len(self._sorted_ids) and int(self._sorted_ids[pos]) == key:
+            return int(self._order[pos])
+        return -1
+
+    def _base_rows(self, vehicle_ids: np.ndarray) -> np.ndarray:
+        """Rows of the given vehicles that are in the built arrays."""
+        if not len(self._sorted_ids):
+            return np.zeros(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, vehicle_ids), len(self._sorted_ids) - 1)
+        return self._order[pos[self._sorted_ids[pos] == vehicle_ids]]
+
+    def vector_of(self, vehicle_id) -> Optional[np.ndarray]:
+        """Current normalized vector of a vehicle, overlay first; None if not indexed."""
+        key = int(vehicle_id)
+        pos = int(np.searchsorted(self.overlay_ids, key))
+        if pos < len(self.overlay_ids) and int(self.overlay_ids[pos]) == key:
+            return self.overlay_vectors[pos]
+        row = self.row_of(key)
+        return self.vectors[row] if row >= 0 else None
+
+    def _candidates(self, centroid_scores: np.ndarray, needed: int, n_probe: Optional[int],
+                    include: Optional[int] = None) -> np.ndarray:
+        """
+        Sorted rows of the best-scoring lists (plus list `include`), probing more lists
+        until there are at least `needed` rows.
+        """
+        ranked = np.argsort(-centroid_scores, kind="stable")
+        if include is not None:
+            ranked = np.concatenate([[include], ranked[ranked != include]])
+        probe = max(1, min(n_probe or self.n_probe, self.n_lists))
+        covered = np.cumsum(np.diff(self.offsets)[ranked])
+        if covered[probe - 1] < needed:
+            probe = min(self.n_lists, int(np.searchsorted(covered, needed)) + 1)
+        lists = np.sort(ranked[:probe])
+        return np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+
+    def search(self, query: np.ndarray, top_n: int, n_probe: Optional[int] = None,
+               exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-N (vehicle_ids, scores) for one query vector, best first."""
+        query = _normalize(query)[0]
+        needed = top_n + (exclude is not None) + len(self._shadowed)
+        rows = self._candidates(self.centroids @ query, needed, n_probe)
+        if len(self._shadowed):
+            rows = rows[~np.isin(rows, self._shadowed)]
+        ids = np.asarray(self.vehicle_ids[rows], dtype=np.int64)
+        scores = self.vectors[rows] @ query
+        if len(self.overlay_ids):
+            ids = np.concatenate([ids, self.overlay_ids])
+            scores = np.concatenate([scores, self.overlay_vectors @ query])
+        if exclude is not None:
+            keep = ids != exclude
+            ids, scores = ids[keep], scores[keep]
+
+        k = min(top_n, len(ids))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(scores, len(scores) - k)[-k:] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
+
+    def neighbors(self, vehicle_id, top_n: int, n_probe: Optional[int] = None) -> Optional[List[Tuple[int, float]]]:
+        """Top-N neighbours of an indexed vehicle as (vehicle_id, score) pairs, None if not indexed."""
+        vector = self.vector_of(vehicle_id)
+        if vector is None:
+            return None
+        ids, scores = self.search(vector, top_n, n_probe, exclude=int(vehicle_id))
+        return list(zip(ids.tolist(), scores.astype(np.float32).tolist()))
+
+    def topk_table(self, top_k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k neighbours of every row, one list at a time: the list's rows are
+        scored in one block against the lists probed for its centroid. Returns (N, k) row
+        positions into `vehicle_ids` and their scores, each row sorted by descending score.
+        Covers the built rows only; call it on a compacted index.
+        """
+        n = len(self.vehicle_ids)
+        k = max(0, min(top_k, n - 1))
+        top_idx = np.zeros((n, k), dtype=np.int64)
+        top_vals = np.zeros((n, k), dtype=np.float32)
+        if k == 0:
+            return top_idx, top_vals
+
+        for l in range(self.n_lists):
+            start, stop = int(self.offsets[l]), int(self.offsets[l + 1])
+            if start == stop:
+                continue
+            candidates = self._candidates(self.centroids @ self.centroids[l], k + 1, n_probe, include=l)
+            sims = self.vectors[start:stop] @ self.vectors[candidates].T
+            # Each row is its own best match; drop it.
+            own = np.searchsorted(candidates, np.arange(start, stop))
+            sims[np.arange(stop - start), own] = -np.inf
+
+            part = np.argpartition(sims, -k, axis=1)[:, -k:]
+            part_vals = np.take_along_axis(sims, part, axis=1)
+            order = np.argsort(-part_vals, axis=1, kind="stable")
+            top_idx[start:stop] = candidates[np.take_along_axis(part, order, axis=1)]
+            top_vals[start:stop] = np.take_along_axis(part_vals, order, axis=1)
+        return top_idx, top_vals
+
+    def with_vectors(self, vehicle_ids: np.ndarray, vectors: np.ndarray) -> "IVFIndex":
+        """
+        Index with the given vehicles added or replaced, as an overlay over the shared
+        arrays; only the overlay is copied.
+        """
+        new_ids = np.asarray(vehicle_ids, dtype=np.int64)
+        keep = ~np.isin(self.overlay_ids, new_ids)
+        ids = np.concatenate([self.overlay_ids[keep], new_ids])
+        stacked = np.vstack([self.overlay_vectors[keep], _normalize(vectors)])
+        order = np.argsort(ids, kind="stable")
+
+        patched = copy.copy(self)
+        patched.overlay_ids = ids[order]
+        patched.overlay_vectors = stacked[order]
+        patched._shadowed = np.sort(self._base_rows(patched.overlay_ids))
+        return patched
+
+    def compact(self) -> "IVFIndex":
+        """Copy with the overlay merged into the lists, each vector assigned to its nearest list."""
+        if not len(self.overlay_ids):
+            return self
+        keep = np.ones(len(self.vehicle_ids), dtype=bool)
+        keep[self._shadowed] = False
+        old_assign = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        return self._grouped(
+            np.concatenate([np.asarray(self.vehicle_ids, dtype=np.int64)[keep], self.overlay_ids]),
+            np.vstack([self.vectors[keep], self.overlay_vectors]),
+            self.centroids,
+            np.concatenate([old_assign[keep], _nearest(self.overlay_vectors, self.centroids)]),
+            self.n_probe,
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"vehicle_ids": self.vehicle_ids, "vectors": self.vectors,
+                "centroids": self.centroids, "offsets": self.offsets}
+
+    def manifest(self) -> Dict[str, object]:
+        return {"type": ANN_TYPE, "n_lists": self.n_lists, "n_probe": self.n_probe,
+                "n_vectors": int(len(self.vehicle_ids)), "dim": int(self.vectors.shape[1])}
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from app.models import model_persistance
+
+FEATURE_STORE_DIR = "feature_store"
+FEATURE_FORMAT_VERSION = 3
+FEATURE_ARRAYS = ("vehicle_ids", "features", "user_ids", "item_ids")
+TYPED_ARRAYS = ("indptr", "indices", "data")
+
+
+@dataclass
+class FeatureEncoder:
+    """
+    The fitted encoding pipeline: label vocabularies for categorical columns, the fill
+    means and scales of the standardized numeric columns, and the per-model feature
+    weights. Lets a single new vehicle be encoded exactly as at training time.
+    """
+    categorical: Dict[str, List[str]]
+    means: Dict[str, float]
+    scales: Dict[str, float]
+    feature_weights: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> List[str]:
+        return [*self.categorical, *self.means]
+
+    def weight_vector(self, model_name: str) -> np.ndarray:
+        weights = self.feature_weights.get(model_name, {})
+        return np.array([float(weights.get(col, 1.0)) for col in self.columns], dtype=np.float32)
+
+    def encode_row(self, get: Callable[[str, Any], Any]) -> np.ndarray:
+        """
+        Encode one vehicle given a `get(column, default)` accessor. Unseen categories map
+        to a fresh label past the vocabulary; missing numerics take the training mean.
+        """
+        values = []
+        for col, vocabulary in self.categorical.items():
+            value = str(get(col, ""))
+            try:
+                values.append(float(vocabulary.index(value)))
+            except ValueError:
+                values.append(float(len(vocabulary)))
+        for col, mean in self.means.items():
+            raw = get(col, None)
+            if col == "EngineSize" and raw is not None:
+                raw = str(raw).replace("L", "")
+            number = pd.to_numeric(pd.Series([raw], dtype=object), errors="coerce").iloc[0]
+            number = mean if pd.isna(number) else float(number)
+            values.append((number - mean) / self.scales[col])
+        return np.array(values, dtype=np.float32)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"categorical": self.categorical, "means": self.means,
+                "scales": self.scales, "feature_weights": self.feature_weights}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FeatureEncoder":
+        return cls(categorical=data["categorical"], means=data["means"],
+                   scales=data["scales"], feature_weights=data.get("feature_weights", {}))
+
+
+@dataclass
+class FeatureSet:
+    """
+    Training inputs shared by every trainer: the encoded catalog as a float32 matrix
+    (rows aligned with `vehicle_ids`, columns named by `feature_columns`) and the user x
+    vehicle interactions as CSR (rows `user_ids`, columns `item_ids`, both sorted).
+
+    Raw counts are kept per interaction type in `typed_interactions`; `interactions` is
+    their combination under `interaction_weights`. `reweighted` derives the matrix for
+    other weights without touching the interactions table, e.g. to sweep weights offline.
+    """
+    fingerprint: str
+    watermark: Dict[str, Any]
+    vehicle_ids: np.ndarray
+    feature_columns: List[str]
+    features: np.ndarray
+    user_ids: np.ndarray
+    item_ids: np.ndarray
+    interactions: csr_matrix
+    typed_interactions: Dict[str, csr_matrix] = field(default_factory=dict)
+    interaction_weights: Dict[str, float] = field(default_factory=dict)
+    encoder: Optional[FeatureEncoder] = None
+    manifest: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, fingerprint: str, watermark: Dict[str, Any], features_df: pd.DataFrame,
+              feature_columns: List[str], interactions_raw: pd.DataFrame,
+              interaction_weights: Dict[str, float], encoder: Optional[FeatureEncoder] = None) -> "FeatureSet":
+        """
+        `features_df` is the encoded catalog (with "Id"); `interactions_raw` has columns
+        [user_id, vehicle_id, interaction_type, count].
+        """
+        user_ids = np.unique(interactions_raw["user_id"].to_numpy(dtype=np.int64))
+        item_ids = np.unique(interactions_raw["vehicle_id"].to_numpy(dtype=np.int64))
+        rows = np.searchsorted(user_ids, interactions_raw["user_id"].to_numpy(dtype=np.int64))
+        cols = np.searchsorted(item_ids, interactions_raw["vehicle_id"].to_numpy(dtype=np.int64))
+        types = interactions_raw["interaction_type"].astype(str).to_numpy()
+        counts = interactions_raw["count"].to_numpy(dtype=np.float32)
+
+        typed_interactions = {}
+        for interaction_type in sorted(set(types.tolist())):
+            mask = types == interaction_type
+            typed_interactions[interaction_type] = csr_matrix(
+                (counts[mask], (rows[mask], cols[mask])), shape=(len(user_ids), len(item_ids)))
+        return cls(
+            fingerprint=fingerprint,
+            watermark=watermark,
+            vehicle_ids=features_df["Id"].to_numpy(dtype=np.int64),
+            feature_columns=list(feature_columns),
+            features=np.ascontiguousarray(features_df[list(feature_columns)].to_numpy(dtype=np.float32)),
+            user_ids=user_ids,
+            item_ids=item_ids,
+            interactions=combine_interactions(typed_interactions, interaction_weights, (len(user_ids), len(item_ids))),
+            typed_interactions=typed_interactions,
+            interaction_weights=dict(interaction_weights),
+            encoder=encoder,
+        )
+
+    def reweighted(self, interaction_weights: Dict[str, float]) -> "FeatureSet":
+        """A copy whose `interactions` combine the per-type counts under other weights."""
+        if dict(interaction_weights) == self.interaction_weights:
+            return self
+        return replace(
+            self,
+            interactions=combine_interactions(self.typed_interactions, interaction_weights, self.interactions.shape),
+            interaction_weights=dict(interaction_weights),
+        )
+
+
+def combine_interactions(typed_interactions: Dict[str, csr_matrix], weights: Dict[str, float],
+                         shape: Tuple[int, int]) -> csr_matrix:
+    """
+    sum(weights[type] * counts[type]) over the per-type matrices; types without a weight
+    count 0. Every observed (user, vehicle) pair keeps an entry, even at weight 0.
+    """
+    parts = [(matrix.tocoo(), float(weights.get(interaction_type, 0.0)))
+             for interaction_type, matrix in typed_interactions.items()]
+    if not parts:
+        return csr_matrix(shape, dtype=np.float64)
+    combined = csr_matrix(
+        (np.concatenate([coo.data.astype(np.float64) * weight for coo, weight in parts]),
+         (np.concatenate([coo.row for coo, _ in parts]), np.concatenate([coo.col for coo, _ in parts]))),
+        shape=shape,
+    )
+    combined.sum_duplicates()
+    return combined
+
+
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps([FEATURE_FORMAT_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _store_dir() -> str:
+    return os.path.join(model_persistance.MODEL_DIR, FEATURE_STORE_DIR)
+
+
+def save_feature_set(feature_set: FeatureSet) -> str:
+    """Write the feature set under MODEL_DIR/feature_store/<fingerprint>, keeping the newest few."""
+    base = _store_dir()
+    path = os.path.join(base, feature_set.fingerprint)
+    if os.path.isdir(path):
+        return path
+    tmp_path = os.path.join(base, f".{feature_set.fingerprint}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    arrays = {
+        "vehicle_ids": feature_set.vehicle_ids,
+        "features": feature_set.features,
+        "user_ids": feature_set.user_ids,
+        "item_ids": feature_set.item_ids,
+    }
+    interaction_types = list(feature_set.typed_interactions)
+    # One CSR count matrix per interaction type, named by position (types are free-form strings).
+    for i, interaction_type in enumerate(interaction_types):
+        matrix = feature_set.typed_interactions[interaction_type]
+        for part in TYPED_ARRAYS:
+            arrays[f"typed_{i}_{part}"] = getattr(matrix, part)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+    manifest = {
+        "format_version": FEATURE_FORMAT_VERSION,
+        "fingerprint": feature_set.fingerprint,
+        "data_watermark": feature_set.watermark,
+        "feature_columns": feature_set.feature_columns,
+        "interaction_shape": list(feature_set.interactions.shape),
+        "interaction_types": interaction_types,
+        "interaction_weights": feature_set.interaction_weights,
+        "encoder": feature_set.encoder.to_dict() if feature_set.encoder else None,
+        **feature_set.manifest,
+    }
+    with open(os.path.join(tmp_path, model_persistance.MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    os.replace(tmp_path, path)
+    _prune(base)
+    return path
+
+
+def load_feature_set(fingerprint: str, interaction_weights: Optional[Dict[str, float]] = None) -> Optional[FeatureSet]:
+    """
+    Load a stored feature set, combining its interactions under `interaction_weights`
+    (by default the weights it was built with).
+    """
+    path = os.path.join(_store_dir(), fingerprint)
+    manifest_path = os.path.join(path, model_persistance.MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FEATURE_FORMAT_VERSION:
+        return None
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f"{name}.npy"), allow_pickle=False)
+
+    arrays = {name: load(name) for name in FEATURE_ARRAYS}
+    shape = tuple(manifest["interaction_shape"])
+    typed_interactions = {
+        interaction_type: csr_matrix(
+            (load(f"typed_{i}_data"), load(f"typed_{i}_indices"), load(f"typed_{i}_indptr")), shape=shape)
+        for i, interaction_type in enumerate(manifest.get("interaction_types", []))
+    }
+    weights = manifest.get("interaction_weights", {}) if interaction_weights is None else interaction_weights
+    return FeatureSet(
+        fingerprint=fingerprint,
+        watermark=manifest.get("data_watermark", {}),
+        vehicle_ids=arrays["vehicle_ids"],
+        feature_columns=manifest["feature_columns"],
+        features=arrays["features"],
+        user_ids=arrays["user_ids"],
+        item_ids=arrays["item_ids"],
+        interactions=combine_interactions(typed_interactions, weights, shape),
+        typed_interactions=typed_interactions,
+        interaction_weights=dict(weights),
+        encoder=FeatureEncoder.from_dict(manifest["encoder"]) if manifest.get("encoder") else None,
+        manifest=manifest,
+    )
+
+
+def _prune(base: str, keep: Optional[int] = None) -> None:
+    keep = model_persistance.KEEP_VERSIONS if keep is None else keep
+    entries = [
+        os.path.join(base, name) for name in os.listdir(base)
+        if not name.startswith(".") and os.path.isdir(os.path.join(base, name))
+    ]
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:max(0, len(entries) - keep)]:
+        shutil.rmtree(path, ignore_errors=True)
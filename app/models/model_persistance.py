@@ -1,59 +1,329 @@
 import joblib
+import hashlib
+import json
 import os
-from typing import Dict, List, Tuple, Optional
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.models.ann_index import ANN_ARRAYS, IVFIndex
+from app.models.topk_index import TopKSimilarityIndex
+from app.models.weighted_similarity import WEIGHTED_ARRAYS, WeightedFeatureIndex
 
 MODEL_DIR = "trained_models"
+KEEP_VERSIONS = 3
+LEGACY_VERSION = "legacy"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+TOPK_ARRAYS = ("vehicle_ids", "indptr", "neighbor_ids", "scores")
+TOPK_FORMAT = "topk-csr"
+TOPK_FORMAT_VERSION = 1
+
+# Registered model name -> artifact directory (and legacy "<artifact>.pkl" file) under MODEL_DIR.
+ARTIFACT_NAMES = {
+    "collaborative": "collaborative_model",
+    "vehicle_similarity": "similarity_topk_vehicle",
+    "user_similarity": "similarity_topk_user",
+}
+
+SimilarityModel = Union[Dict[int, List[Tuple[int, float]]], TopKSimilarityIndex]
+
+
+# Versioned artifact layout:
+#   MODEL_DIR/<artifact>/CURRENT            -> name of the live version
+#   MODEL_DIR/<artifact>/<version>/...      -> artifact files + manifest.json
+
+def _artifact_dir(model_name: str) -> str:
+    return os.path.join(MODEL_DIR, ARTIFACT_NAMES[model_name])
 
-def save_collaborative_model(model: dict) -> None:
+def version_path(model_name: str, version: str) -> str:
+    return os.path.join(_artifact_dir(model_name), version)
+
+def _new_version() -> str:
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:6]}"
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _checksums(path: str) -> Dict[str, str]:
+    return {
+        fname: _sha256(os.path.join(path, fname))
+        for fname in sorted(os.listdir(path))
+        if fname != MANIFEST_FILE and os.path.isfile(os.path.join(path, fname))
+    }
+
+def current_version(model_name: str) -> Optional[str]:
     """
-    Persist the collaborative model as a single dict (svd, matrices).
+    The version a fresh load would serve: the CURRENT pointer, else LEGACY_VERSION
+    for pre-versioning flat artifacts, else None.
     """
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    path = os.path.join(MODEL_DIR, "collaborative_model.pkl")
-    print("[SAVE] Saving collaborative model ...")
-    joblib.dump(model, path)
-    print("[SAVE] Collaborative model saved.")
+    base = _artifact_dir(model_name)
+    pointer = os.path.join(base, CURRENT_FILE)
+    if os.path.exists(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+        if version and os.path.isdir(os.path.join(base, version)):
+            return version
+    if os.path.exists(f"{base}.pkl") or os.path.exists(os.path.join(base, MANIFEST_FILE)):
+        return LEGACY_VERSION
+    return None
+
+def list_versions(model_name: str) -> List[str]:
+    """Published versions, oldest first."""
+    base = _artifact_dir(model_name)
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        name for name in os.listdir(base)
+        if not name.startswith(".") and os.path.isfile(os.path.join(base, name, MANIFEST_FILE))
+    )
 
-def load_collaborative_model() -> Optional[dict]:
-    path = os.path.join(MODEL_DIR, "collaborative_model.pkl")
+def read_manifest(model_name: str, version: Optional[str] = None) -> Optional[dict]:
+    version = version or current_version(model_name)
+    if version is None:
+        return None
+    path = os.path.join(_artifact_dir(model_name), MANIFEST_FILE) if version == LEGACY_VERSION else os.path.join(version_path(model_name, version), MANIFEST_FILE)
     if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def verify_version(model_name: str, version: str) -> bool:
+    """Recompute file checksums of a published version and compare them to its manifest."""
+    if version == LEGACY_VERSION:
+        return True
+    manifest = read_manifest(model_name, version)
+    if manifest is None:
+        return False
+    return _checksums(version_path(model_name, version)) == manifest.get("checksums", {})
+
+def publish_version(model_name: str, write: Callable[[str], Optional[dict]], watermark: Optional[dict] = None,
+                    protect: Iterable[str] = (), prune: bool = True) -> str:
+    """
+    Write a new immutable version directory and atomically point CURRENT at it.
+
+    `write(path)` writes the artifact files into `path` and may return extra manifest fields.
+    Readers only ever see complete versions: the directory is renamed into place
+    before the CURRENT pointer is swapped with os.replace. Old versions are then pruned
+    (unless `prune` is off), except those in `protect` (e.g. versions still served or leased).
+    A publisher that does not serve, like the training worker, cannot know what is still
+    leased and leaves pruning to the serving process.
+    """
+    base = _artifact_dir(model_name)
+    os.makedirs(base, exist_ok=True)
+    version = _new_version()
+    tmp_path = os.path.join(base, f".{version}.tmp")
+    os.makedirs(tmp_path)
+
+    extra = write(tmp_path) or {}
+    manifest = {
+        "model": model_name,
+        "version": version,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "data_watermark": watermark or {},
+        "checksums": _checksums(tmp_path),
+        **extra,
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    os.replace(tmp_path, os.path.join(base, version))
+
+    pointer_tmp = os.path.join(base, f".{CURRENT_FILE}.{version}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(base, CURRENT_FILE))
+
+    if prune:
+        prune_versions(model_name, protect=protect)
+    return version
+
+def prune_versions(model_name: str, keep: Optional[int] = None, protect: Iterable[str] = ()) -> List[str]:
+    """
+    Delete old versions beyond the `keep` newest. The CURRENT version and any
+    `protect`ed (still referenced) versions are never removed. Returns removed versions.
+    """
+    keep = KEEP_VERSIONS if keep is None else keep
+    protected = set(protect) | {current_version(model_name)}
+    versions = list_versions(model_name)
+    removable = [v for v in versions[:max(0, len(versions) - keep)] if v not in protected]
+    for version in removable:
+        shutil.rmtree(version_path(model_name, version), ignore_errors=True)
+    return removable
+
+def remove_version(model_name: str, version: str) -> bool:
+    """Delete one published version unless it is CURRENT or the legacy flat artifact."""
+    if version in (None, LEGACY_VERSION) or version == current_version(model_name):
+        return False
+    path = version_path(model_name, version)
+    if not os.path.isdir(path):
+        return False
+    shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+def upgrade_collaborative_model(model: Optional[dict]) -> Optional[dict]:
+    """
+    Convert a legacy collaborative model holding a dense users x vehicles DataFrame
+    (`interaction_matrix`) to the sparse layout: `interactions` CSR plus sorted
+    `user_ids` / `vehicle_ids` arrays. Sparse models are returned unchanged.
+    """
+    if not model or "interaction_matrix" not in model or "interactions" in model:
+        return model
+    matrix = model["interaction_matrix"]
+    user_ids = np.asarray(matrix.index, dtype=np.int64)
+    vehicle_ids = np.asarray(matrix.columns, dtype=np.int64)
+    user_order = np.argsort(user_ids, kind="stable")
+    vehicle_order = np.argsort(vehicle_ids, kind="stable")
+
+    upgraded = {key: value for key, value in model.items() if key != "interaction_matrix"}
+    upgraded["interactions"] = csr_matrix(matrix.to_numpy(dtype=np.float64)[user_order][:, vehicle_order])
+    upgraded["user_ids"] = user_ids[user_order]
+    upgraded["vehicle_ids"] = vehicle_ids[vehicle_order]
+    if model.get("user_features") is not None:
+        upgraded["user_features"] = np.asarray(model["user_features"])[user_order]
+    if model.get("vehicle_features") is not None:
+        upgraded["vehicle_features"] = np.asarray(model["vehicle_features"])[vehicle_order]
+    return upgraded
+
+def save_collaborative_model(model: dict, watermark: Optional[dict] = None, protect: Iterable[str] = (),
+                             prune: bool = True) -> str:
+    """
+    Persist the collaborative model as a single dict (svd, factor matrices, sparse
+    interactions and sorted user/vehicle ID arrays).
+    """
+    def write(path: str) -> None:
+        joblib.dump(model, os.path.join(path, "model.pkl"))
+
+    print("[SAVE] Saving collaborative model ...")
+    version = publish_version("collaborative", write, watermark, protect, prune)
+    print(f"[SAVE] Collaborative model saved (version {version}).")
+    return version
+
+def load_collaborative_model(version: Optional[str] = None) -> Optional[dict]:
+    version = version or current_version("collaborative")
+    if version is None:
         print("[LOAD] Collaborative model not found.")
         return None
-    print("[LOAD] Collaborative model found. Loading ...")
-    model = joblib.load(path)
+    path = f"{_artifact_dir('collaborative')}.pkl" if version == LEGACY_VERSION else os.path.join(version_path("collaborative", version), "model.pkl")
+    print(f"[LOAD] Collaborative model found (version {version}). Loading ...")
+    model = upgrade_collaborative_model(joblib.load(path))
     print("[LOAD] Collaborative model loaded.")
     return model
 
-def save_content_model(similarity_topk: Dict[int, List[Tuple[int, float]]]) -> None:
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    path = os.path.join(MODEL_DIR, "similarity_topk_vehicle.pkl")
-    print("[SAVE] Saving content-based model (vehicle TOP-K) ...")
-    joblib.dump(similarity_topk, path)
-    print("[SAVE] Content-based model (vehicle) saved.")
+def write_topk_index(index: TopKSimilarityIndex, path: str) -> dict:
+    """
+    Write a top-k similarity index as flat .npy arrays; returns its manifest fields.
+    """
+    index = index.compact()
+    for array_name in TOPK_ARRAYS:
+        np.save(os.path.join(path, f"{array_name}.npy"), getattr(index, array_name), allow_pickle=False)
+    manifest = {
+        "format": TOPK_FORMAT,
+        "format_version": TOPK_FORMAT_VERSION,
+        "n_vehicles": int(len(index.vehicle_ids)),
+        "n_neighbors": int(len(index.neighbor_ids)),
+        "score_dtype": str(index.scores.dtype),
+    }
+    if index.ann is not None:
+        ann = index.ann.compact()
+        for array_name, array in ann.arrays().items():
+            np.save(os.path.join(path, f"ann_{array_name}.npy"), array, allow_pickle=False)
+        manifest["ann"] = ann.manifest()
+    if index.weighted is not None:
+        weighted = index.weighted.compact()
+        for array_name, array in weighted.arrays().items():
+            np.save(os.path.join(path, f"weighted_{array_name}.npy"), array, allow_pickle=False)
+        manifest["weighted"] = weighted.manifest()
+    return manifest
 
-def load_content_model() -> Optional[Dict[int, List[Tuple[int, float]]]]:
-    path = os.path.join(MODEL_DIR, "similarity_topk_vehicle.pkl")
-    if not os.path.exists(path):
-        print("[LOAD] Content-based model (vehicle) not found.")
+def read_topk_index(path: str) -> Optional[TopKSimilarityIndex]:
+    """
+    Memory-map a top-k similarity index; pages are loaded lazily and shared across processes.
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != TOPK_FORMAT:
         return None
-    print("[LOADING] Content-based model (vehicle)...")
-    sim = joblib.load(path)
-    print("[LOADED] Content-based model (vehicle) loaded.")
-    return sim
 
-def save_user_content_model(similarity_topk: Dict[int, List[Tuple[int, float]]]) -> None:
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    path = os.path.join(MODEL_DIR, "similarity_topk_user.pkl")
-    print("[SAVE] Saving content-based model (user TOP-K) ...")
-    joblib.dump(similarity_topk, path)
-    print("[SAVE] Content-based model (user) saved.")
+    arrays = {
+        array_name: np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode="r", allow_pickle=False)
+        for array_name in TOPK_ARRAYS
+    }
+    ann = None
+    if manifest.get("ann"):
+        ann = IVFIndex(
+            n_probe=int(manifest["ann"].get("n_probe", 8)),
+            **{array_name: np.load(os.path.join(path, f"ann_{array_name}.npy"), mmap_mode="r", allow_pickle=False)
+               for array_name in ANN_ARRAYS},
+        )
+    weighted = None
+    if manifest.get("weighted"):
+        # Loaded fully (not memory-mapped): every weighted query scans the whole matrix.
+        weighted = WeightedFeatureIndex(
+            columns=manifest["weighted"]["columns"],
+            default_weights=manifest["weighted"].get("default_weights"),
+            **{array_name: np.load(os.path.join(path, f"weighted_{array_name}.npy"), allow_pickle=False)
+               for array_name in WEIGHTED_ARRAYS},
+        )
+    return TopKSimilarityIndex(manifest=manifest, ann=ann, weighted=weighted, **arrays)
 
-def load_user_content_model() -> Optional[Dict[int, List[Tuple[int, float]]]]:
-    path = os.path.join(MODEL_DIR, "similarity_topk_user.pkl")
-    if not os.path.exists(path):
-        print("[LOAD] Content-based model (user) not found.")
+def _save_similarity_model(model_name: str, similarity_topk: SimilarityModel, label: str, watermark: Optional[dict],
+                           protect: Iterable[str] = (), prune: bool = True) -> str:
+    def write(path: str) -> Optional[dict]:
+        if isinstance(similarity_topk, TopKSimilarityIndex):
+            return write_topk_index(similarity_topk, path)
+        joblib.dump(similarity_topk, os.path.join(path, "model.pkl"))
+        return {"format": "pickle"}
+
+    print(f"[SAVE] Saving content-based model ({label} TOP-K) ...")
+    version = publish_version(model_name, write, watermark, protect, prune)
+    print(f"[SAVE] Content-based model ({label}) saved (version {version}).")
+    return version
+
+def _load_similarity_model(model_name: str, label: str, version: Optional[str]) -> Optional[SimilarityModel]:
+    version = version or current_version(model_name)
+    if version is None:
+        print(f"[LOAD] Content-based model ({label}) not found.")
         return None
-    print("[LOAD] Content-based model (user) found. Loading ...")
-    sim = joblib.load(path)
-    print("[LOAD] Content-based model (user) loaded.")
+
+    path = _artifact_dir(model_name) if version == LEGACY_VERSION else version_path(model_name, version)
+    index = read_topk_index(path)
+    if index is not None:
+        print(f"[LOADED] Content-based model ({label}) mapped from CSR artifact (version {version}).")
+        return index
+
+    pickle_path = f"{path}.pkl" if version == LEGACY_VERSION else os.path.join(path, "model.pkl")
+    print(f"[LOADING] Content-based model ({label}, version {version})...")
+    sim = joblib.load(pickle_path)
+    print(f"[LOADED] Content-based model ({label}) loaded.")
     return sim
+
+def save_content_model(similarity_topk: SimilarityModel, watermark: Optional[dict] = None, protect: Iterable[str] = (),
+                       prune: bool = True) -> str:
+    return _save_similarity_model("vehicle_similarity", similarity_topk, "vehicle", watermark, protect, prune)
+
+def load_content_model(version: Optional[str] = None) -> Optional[SimilarityModel]:
+    return _load_similarity_model("vehicle_similarity", "vehicle", version)
+
+def save_user_content_model(similarity_topk: SimilarityModel, watermark: Optional[dict] = None, protect: Iterable[str] = (),
+                            prune: bool = True) -> str:
+    return _save_similarity_model("user_similarity", similarity_topk, "user", watermark, protect, prune)
+
+def load_user_content_model(version: Optional[str] = None) -> Optional[SimilarityModel]:
+    return _load_similarity_model("user_similarity", "user", version)
+
+def model_exists(model_name: str) -> bool:
+    """Whether any persisted artifact (versioned or legacy) exists for a registered model."""
+    return model_name in ARTIFACT_NAMES and current_version(model_name) is not None
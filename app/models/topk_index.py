@@ -0,0 +1,301 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.ann_index import IVFIndex
+from app.models.weighted_similarity import WeightedFeatureIndex
+
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def _id_dtype(ids: np.ndarray):
+    return np.int32 if ids.size == 0 or int(ids.max()) <= _INT32_MAX else np.int64
+
+
+class NeighborList:
+    """
+    Lightweight view over one vehicle's neighbours; slicing yields (vehicle_id, score) tuples.
+    """
+    __slots__ = ("_ids", "_scores")
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray):
+        self._ids = ids
+        self._scores = scores
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return list(zip(self._ids[item].tolist(), self._scores[item].astype(np.float32).tolist()))
+        return int(self._ids[item]), float(self._scores[item])
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        return iter(self[:])
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self._scores
+
+
+class TopKSimilarityIndex(Mapping):
+    """
+    Read-only vehicle_id -> neighbours mapping backed by flat CSR arrays.
+
+    Arrays:
+      vehicle_ids  sorted source vehicle IDs, one per row
+      indptr       row offsets into neighbor_ids/scores (len = n_vehicles + 1)
+      neighbor_ids neighbour vehicle IDs, each row sorted by descending score
+      scores       similarity scores (float16 or float32)
+
+    Keeps the `model[vehicle_id][:top_n]` contract of the legacy Dict[int, List[Tuple[int, float]]].
+    An optional `ann` index over the normalized feature vectors answers `similar` queries
+    deeper than the precomputed lists, and for vehicles that have no list. An optional
+    `weighted` index keeps the unweighted features for query-time weight profiles.
+
+    Rows patched after loading (vehicle fold-in) live in `overlay`, vehicle_id -> NeighborList,
+    which shadows the CSR arrays; those stay untouched and memory-mapped. `compact` merges it.
+    """
+
+    def __init__(self, vehicle_ids: np.ndarray, indptr: np.ndarray, neighbor_ids: np.ndarray,
+                 scores: np.ndarray, manifest: Optional[dict] = None, ann: Optional[IVFIndex] = None,
+                 weighted: Optional[WeightedFeatureIndex] = None,
+                 overlay: Optional[Dict[int, NeighborList]] = None):
+        self.vehicle_ids = vehicle_ids
+        self.indptr = indptr
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+        self.manifest = manifest or {}
+        self.ann = ann
+        self.weighted = weighted
+        self.overlay = overlay or {}
+        self._extra_ids = [v for v in self.overlay if self.row_of(v) < 0]
+        self._tails: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_topk(cls, vehicle_ids: np.ndarray, top_idx: np.ndarray, top_vals: np.ndarray,
+                  score_dtype: str = "float32") -> "TopKSimilarityIndex":
+        """
+        Build from dense (N, k) neighbour row-indices and scores as produced by the trainers.
+        """
+        vehicle_ids = np.asarray(vehicle_ids)
+        order = np.argsort(vehicle_ids, kind="stable")
+        id_dtype = _id_dtype(vehicle_ids)
+        n_rows, k = top_idx.shape if top_idx.ndim == 2 else (len(vehicle_ids), 0)
+
+        return cls(
+            vehicle_ids=vehicle_ids[order].astype(id_dtype),
+            indptr=np.arange(n_rows + 1, dtype=np.int64) * k,
+            neighbor_ids=vehicle_ids[top_idx[order]].astype(id_dtype).ravel(),
+            scores=top_vals[order].astype(score_dtype).ravel(),
+        )
+
+    @classmethod
+    def from_dict(cls, similarity_topk: Dict[int, List[Tuple[int, float]]],
+                  score_dtype: str = "float32") -> "TopKSimilarityIndex":
+        vehicle_ids = np.array(sorted(similarity_topk), dtype=np.int64)
+        lengths = np.array([len(similarity_topk[int(v)]) for v in vehicle_ids], dtype=np.int64)
+        indptr = np.zeros(len(vehicle_ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        neighbor_ids = np.fromiter(
+            (oid for v in vehicle_ids for oid, _ in similarity_topk[int(v)]), dtype=np.int64, count=int(indptr[-1])
+        )
+        scores = np.fromiter(
+            (s for v in vehicle_ids for _, s in similarity_topk[int(v)]), dtype=np.float64, count=int(indptr[-1])
+        )
+        id_dtype = _id_dtype(np.concatenate([vehicle_ids, neighbor_ids]))
+        return cls(vehicle_ids.astype(id_dtype), indptr, neighbor_ids.astype(id_dtype), scores.astype(score_dtype))
+
+    def with_rows(self, rows: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> "TopKSimilarityIndex":
+        """
+        Index with the given vehicles' neighbour rows replaced or inserted, as an overlay
+        over the shared CSR arrays; `rows` maps vehicle_id -> (neighbor_ids, scores), each
+        sorted by descending score.
+        """
+        overlay = dict(self.overlay)
+        for vehicle_id, (neighbor_ids, scores) in rows.items():
+            overlay[int(vehicle_id)] = NeighborList(np.asarray(neighbor_ids, dtype=np.int64),
+                                                    np.asarray(scores, dtype=self.scores.dtype))
+        patched = TopKSimilarityIndex(
+            self.vehicle_ids, self.indptr, self.neighbor_ids, self.scores,
+            manifest=self.manifest, ann=self.ann, weighted=self.weighted, overlay=overlay,
+        )
+        patched._tails = self._tails
+        return patched
+
+    def compact(self) -> "TopKSimilarityIndex":
+        """Copy with the overlay merged into fresh CSR arrays (e.g. before writing to disk)."""
+        if not self.overlay:
+            return self
+        new_ids = np.array(sorted(self.overlay), dtype=np.int64)
+        keep = ~np.isin(self.vehicle_ids, new_ids)
+        old_lengths = np.diff(self.indptr).astype(np.int64)
+        entry_keep = np.repeat(keep, old_lengths)
+
+        ids = np.concatenate([self.vehicle_ids[keep].astype(np.int64), new_ids])
+        lengths = np.concatenate([old_lengths[keep], [len(self.overlay[int(v)]) for v in new_ids]]).astype(np.int64)
+        neighbor_ids = np.concatenate([self.neighbor_ids[entry_keep].astype(np.int64),
+                                       *(self.overlay[int(v)].ids.astype(np.int64) for v in new_ids)])
+        scores = np.concatenate([self.scores[entry_keep],
+                                 *(self.overlay[int(v)].scores.astype(self.scores.dtype) for v in new_ids)])
+
+        order = np.argsort(ids, kind="stable")
+        starts = np.cumsum(lengths) - lengths
+        ordered_lengths = lengths[order]
+        total = int(ordered_lengths.sum())
+        positions = np.repeat(starts[order] - np.cumsum(ordered_lengths) + ordered_lengths, ordered_lengths) + np.arange(total)
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(ordered_lengths, out=indptr[1:])
+
+        id_dtype = _id_dtype(np.concatenate([ids, neighbor_ids]))
+        return TopKSimilarityIndex(
+            vehicle_ids=ids[order].astype(id_dtype),
+            indptr=indptr,
+            neighbor_ids=neighbor_ids[positions].astype(id_dtype),
+            scores=scores[positions].astype(self.scores.dtype),
+            manifest=self.manifest,
+            ann=self.ann,
+            weighted=self.weighted,
+        )
+
+    def lists_tail(self, vehicle_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (length, lowest score) of each vehicle's neighbour list; length -1 for unknown
+        vehicles. The CSR part is computed once and shared by patched copies.
+        """
+        if self._tails is None:
+            lengths = np.diff(self.indptr).astype(np.int64)
+            last = np.full(len(lengths), -np.inf, dtype=np.float32)
+            filled = lengths > 0
+            last[filled] = self.scores[self.indptr[1:][filled] - 1]
+            self._tails = (lengths, last)
+
+        keys = np.asarray(vehicle_ids, dtype=np.int64)
+        rows = self.rows_of(keys)
+        lengths = np.where(rows >= 0, self._tails[0][np.maximum(rows, 0)], -1)
+        last = np.where(rows >= 0, self._tails[1][np.maximum(rows, 0)], -np.inf).astype(np.float32)
+        for i, vehicle_id in enumerate(keys.tolist()):
+            patched = self.overlay.get(vehicle_id)
+            if patched is not None:
+                lengths[i] = len(patched)
+                last[i] = patched.scores[-1] if len(patched) else -np.inf
+        return lengths, last
+
+    def listing(self, vehicle_ids: np.ndarray) -> List[int]:
+        """Vehicles whose neighbour lists currently contain any of `vehicle_ids`."""
+        targets = np.asarray(vehicle_ids, dtype=np.int64)
+        hits = np.flatnonzero(np.isin(self.neighbor_ids, targets))
+        rows = np.unique(np.searchsorted(self.indptr, hits, side="right") - 1)
+        found = {int(v) for v in self.vehicle_ids[rows].tolist() if int(v) not in self.overlay}
+        found.update(v for v, patched in self.overlay.items() if np.isin(patched.ids, targets).any())
+        return sorted(found)
+
+    def similar(self, vehicle_id, top_n: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        Top-N neighbours of a vehicle: the precomputed list while it is deep enough, else
+        an ANN query. None when the vehicle is in neither.
+        """
+        neighbors = self.get(vehicle_id)
+        if neighbors is not None and (self.ann is None or len(neighbors) >= top_n):
+            return neighbors[:top_n]
+        if self.ann is not None and vehicle_id in self.ann:
+            return self.ann.neighbors(vehicle_id, top_n)
+        return neighbors[:top_n] if neighbors is not None else None
+
+    def to_dict(self) -> Dict[int, List[Tuple[int, float]]]:
+        rows = {int(v_id): self._row_view(i)[:] for i, v_id in enumerate(self.vehicle_ids)}
+        rows.update((v_id, patched[:]) for v_id, patched in self.overlay.items())
+        return rows
+
+    def row_of(self, vehicle_id) -> int:
+        """Row position of a vehicle ID in the CSR arrays (ignoring the overlay), or -1 if absent."""
+        try:
+            key = int(vehicle_id)
+        except (TypeError, ValueError):
+            return -1
+        pos = int(np.searchsorted(self.vehicle_ids, key))
+        if pos < len(self.vehicle_ids) and int(self.vehicle_ids[pos]) == key:
+            return pos
+        return -1
+
+    def rows_of(self, vehicle_ids: np.ndarray) -> np.ndarray:
+        """Vectorized row_of: row positions for many vehicle IDs, -1 where absent."""
+        keys = np.asarray(vehicle_ids, dtype=np.int64)
+        if len(self.vehicle_ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.vehicle_ids, keys), len(self.vehicle_ids) - 1)
+        return np.where(self.vehicle_ids[pos] == keys, pos, -1)
+
+    def weighted_scores(self, vehicle_ids, weights, per_row: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sparse vector x CSR product: sum of weight x similarity over each listed vehicle's
+        neighbours (at most `per_row` per vehicle). Only the touched rows are read, so a
+        memory-mapped index pages in just what the query needs.
+
+        Returns (neighbor_ids, scores) with unique neighbour IDs.
+        """
+        keys = np.asarray(vehicle_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        rows = self.rows_of(keys)
+        patched = np.zeros(len(keys), dtype=bool)
+        if self.overlay:
+            patched = np.fromiter((int(v) in self.overlay for v in keys), dtype=bool, count=len(keys))
+        valid = (rows >= 0) & ~patched
+        rows, row_weights = rows[valid], weights[valid]
+
+        starts = self.indptr[rows].astype(np.int64)
+        lengths = self.indptr[rows + 1].astype(np.int64) - starts
+        if per_row is not None:
+            lengths = np.minimum(lengths, per_row)
+        total = int(lengths.sum())
+        row_offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = row_offsets + np.arange(total)
+
+        ids_parts = [self.neighbor_ids[positions].astype(np.int64)]
+        score_parts = [self.scores[positions].astype(np.float64) * np.repeat(row_weights, lengths)]
+        for vehicle_id, weight in zip(keys[patched].tolist(), weights[patched].tolist()):
+            neighbors = self.overlay[vehicle_id]
+            ids_parts.append(neighbors.ids[:per_row].astype(np.int64))
+            score_parts.append(neighbors.scores[:per_row].astype(np.float64) * weight)
+
+        all_ids = np.concatenate(ids_parts)
+        if all_ids.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        neighbor_ids, inverse = np.unique(all_ids, return_inverse=True)
+        return neighbor_ids, np.bincount(inverse, weights=np.concatenate(score_parts), minlength=len(neighbor_ids))
+
+    def _row_view(self, row: int) -> NeighborList:
+        start, stop = int(self.indptr[row]), int(self.indptr[row + 1])
+        return NeighborList(self.neighbor_ids[start:stop], self.scores[start:stop])
+
+    def get(self, vehicle_id, default=None) -> Optional[NeighborList]:
+        try:
+            patched = self.overlay.get(int(vehicle_id))
+        except (TypeError, ValueError):
+            return default
+        if patched is not None:
+            return patched
+        row = self.row_of(vehicle_id)
+        return self._row_view(row) if row >= 0 else default
+
+    def __getitem__(self, vehicle_id) -> NeighborList:
+        neighbors = self.get(vehicle_id)
+        if neighbors is None:
+            raise KeyError(vehicle_id)
+        return neighbors
+
+    def __contains__(self, vehicle_id) -> bool:
+        return self.get(vehicle_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self.vehicle_ids.tolist()
+        yield from self._extra_ids
+
+    def __len__(self) -> int:
+        return len(self.vehicle_ids) + len(self._extra_ids)
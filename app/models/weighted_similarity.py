@@ -0,0 +1,173 @@
+import copy
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+WEIGHTED_ARRAYS = ("vehicle_ids", "features")
+
+
+class WeightedFeatureIndex:
+    """
+    The encoded catalog kept resident as a float32 matrix, for weighted cosine similarity
+    under any feature-weight profile at request time.
+
+    With weights w, the similarity of vehicles q and x is the cosine of w*q and w*x:
+        (X @ (w^2 * q)) / (||w*x|| * ||w*q||)
+    so one query is a single mat-vec over the catalog. The row norms ||w*x|| depend only
+    on the profile and are cached for the most recent `profile_cache_size` profiles.
+
+    Arrays:
+      vehicle_ids  vehicle ID of each row
+      features     (n_vehicles, n_columns) encoded, unweighted features
+
+    Features added after loading (vehicle fold-in) live in a small overlay that shadows the
+    rows above, so patched copies share the matrix and its cached norms. `compact` merges it.
+    """
+
+    def __init__(self, vehicle_ids: np.ndarray, features: np.ndarray, columns: List[str],
+                 default_weights: Optional[Mapping[str, float]] = None, profile_cache_size: int = 64):
+        self.vehicle_ids = np.asarray(vehicle_ids, dtype=np.int64)
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        self.columns = list(columns)
+        self.default_weights = {col: float(w) for col, w in (default_weights or {}).items() if col in self.columns}
+        self.profile_cache_size = profile_cache_size
+        self._positions = {col: i for i, col in enumerate(self.columns)}
+        self._order = np.argsort(self.vehicle_ids, kind="stable")
+        self._sorted_ids = self.vehicle_ids[self._order]
+        self._inverse_norms: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.overlay_ids = np.zeros(0, dtype=np.int64)
+        self.overlay_features = np.zeros((0, len(self.columns)), dtype=np.float32)
+        self._shadowed = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.vehicle_ids) - len(self._shadowed) + len(self.overlay_ids)
+
+    def __contains__(self, vehicle_id) -> bool:
+        return self.features_of(vehicle_id) is not None
+
+    def row_of(self, vehicle_id) -> int:
+        """Row of a vehicle in `features` (ignoring the overlay), -1 if absent."""
+        key = int(vehicle_id)
+        pos = int(np.searchsorted(self._sorted_ids, key))
+        if pos < len(self._sorted_ids) and int(self._sorted_ids[pos]) == key:
+            return int(self._order[pos])
+        return -1
+
+    def features_of(self, vehicle_id) -> Optional[np.ndarray]:
+        """Current encoded features of a vehicle, overlay first; None if not indexed."""
+        key = int(vehicle_id)
+        pos = int(np.searchsorted(self.overlay_ids, key))
+        if pos < len(self.overlay_ids) and int(self.overlay_ids[pos]) == key:
+            return self.overlay_features[pos]
+        row = self.row_of(key)
+        return self.features[row] if row >= 0 else None
+
+    def weight_vector(self, weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+        """
+        Per-column weights: the trained defaults overridden by `weights`; unlisted columns
+        weigh 1.0. Raises ValueError for unknown columns or negative weights.
+        """
+        vector = np.ones(len(self.columns), dtype=np.float32)
+        for col, weight in {**self.default_weights, **(weights or {})}.items():
+            if col not in self._positions:
+                raise ValueError(f"Unknown feature '{col}'")
+            if weight < 0:
+                raise ValueError(f"Feature weight '{col}' cannot be negative (got {weight})")
+            vector[self._positions[col]] = weight
+        return vector
+
+    def _inverse_row_norms(self, squared_weights: np.ndarray) -> np.ndarray:
+        key = squared_weights.tobytes()
+        cached = self._inverse_norms.get(key)
+        if cached is not None:
+            self._inverse_norms.move_to_end(key)
+            return cached
+
+        norms = np.sqrt(np.square(self.features) @ squared_weights)
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        self._inverse_norms[key] = inverse
+        if len(self._inverse_norms) > self.profile_cache_size:
+            self._inverse_norms.popitem(last=False)
+        return inverse
+
+    def similar(self, vehicle_id, top_n: int,
+                weights: Optional[Mapping[str, float]] = None) -> Optional[List[Tuple[int, float]]]:
+        """Top-N (vehicle_id, score) under the weight profile, best first; None if not indexed."""
+        query = self.features_of(vehicle_id)
+        if query is None:
+            return None
+        squared = np.square(self.weight_vector(weights))
+        weighted_query = squared * query
+        query_norm = float(np.sqrt(weighted_query @ query))
+        scale = 1.0 / query_norm if query_norm > 0 else 0.0
+
+        k = max(0, min(top_n, len(self) - 1))
+        if k == 0:
+            return []
+        # Best k + 1 of the matrix and of the overlay, merged after dropping the vehicle itself.
+        scores = (self.features @ weighted_query) * self._inverse_row_norms(squared)
+        scores[self._shadowed] = -np.inf
+        ids, best = self._top(self.vehicle_ids, scores, k + 1)
+        if len(self.overlay_ids):
+            norms = np.sqrt(np.square(self.overlay_features) @ squared)
+            overlay_scores = (self.overlay_features @ weighted_query) * np.divide(
+                1.0, norms, out=np.zeros_like(norms), where=norms > 0
+            )
+            overlay_ids, overlay_best = self._top(self.overlay_ids, overlay_scores, k + 1)
+            ids, best = np.concatenate([ids, overlay_ids]), np.concatenate([best, overlay_best])
+        keep = ids != int(vehicle_id)
+        ids, best = self._top(ids[keep], best[keep] * scale, k)
+        return list(zip(ids.tolist(), best.tolist()))
+
+    @staticmethod
+    def _top(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(scores))
+        if k <= 0:
+            return ids[:0], scores[:0]
+        top = np.argpartition(scores, len(scores) - k)[-k:]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
+
+    def with_vectors(self, vehicle_ids: np.ndarray, features: np.ndarray) -> "WeightedFeatureIndex":
+        """
+        Index with the given vehicles' encoded features added or replaced, as an overlay
+        over the shared matrix; only the overlay is copied.
+        """
+        new_ids = np.asarray(vehicle_ids, dtype=np.int64)
+        keep = ~np.isin(self.overlay_ids, new_ids)
+        ids = np.concatenate([self.overlay_ids[keep], new_ids])
+        stacked = np.vstack([self.overlay_features[keep], np.asarray(features, dtype=np.float32)])
+        order = np.argsort(ids, kind="stable")
+
+        patched = copy.copy(self)
+        patched.overlay_ids = ids[order]
+        patched.overlay_features = stacked[order]
+        patched._shadowed = np.sort(self._base_rows(patched.overlay_ids))
+        return patched
+
+    def compact(self) -> "WeightedFeatureIndex":
+        """Copy with the overlay merged into a fresh matrix (e.g. before writing to disk)."""
+        if not len(self.overlay_ids):
+            return self
+        keep = np.ones(len(self.vehicle_ids), dtype=bool)
+        keep[self._shadowed] = False
+        return WeightedFeatureIndex(
+            np.concatenate([self.vehicle_ids[keep], self.overlay_ids]),
+            np.vstack([self.features[keep], self.overlay_features]),
+            self.columns, self.default_weights, self.profile_cache_size,
+        )
+
+    def _base_rows(self, vehicle_ids: np.ndarray) -> np.ndarray:
+        """Rows of the given vehicles that are in `features`."""
+        if not len(self._sorted_ids):
+            return np.zeros(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, vehicle_ids), len(self._sorted_ids) - 1)
+        return self._order[pos[self._sorted_ids[pos] == vehicle_ids]]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"vehicle_ids": self.vehicle_ids, "features": self.features}
+
+    def manifest(self) -> Dict[str, object]:
+        return {"columns": self.columns, "default_weights": self.default_weights,
+                "n_vehicles": int(len(self.vehicle_ids))}
@@ -1,10 +1,15 @@
 from fastapi import Request
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import time
 
 REQUEST_COUNT = Counter("request_count_total", "Total number of requests", ["endpoint", "method", "status_code"])
 REQUEST_LATENCY = Histogram("request_latency_seconds", "Request latency in seconds", ["endpoint", "method"])
 REQUEST_ERRORS = Counter("request_errors_total", "Total number of failed AI requests", ["endpoint", "method"])
+CATALOG_REFRESH_LAG = Gauge("catalog_refresh_lag_seconds", "Seconds since the vehicle catalog was last brought up to date")
+CATALOG_CHANGES_APPLIED = Counter("catalog_changes_applied_total", "Vehicle rows patched into the in-memory catalog")
+TRAINING_PHASE_SECONDS = Gauge("training_phase_seconds", "Duration of the last run of each model training phase", ["phase"])
+TRAINING_RUNS = Counter("training_runs_total", "Training worker runs by outcome", ["status"])
+RETRAINS_TRIGGERED = Counter("retrains_triggered_total", "Scheduled retrains by model after a data change", ["model"])
 
 def attach_metrics(app):
     start_http_server(8001)
@@ -1,5 +1,5 @@
 import logging
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 
 from app.interfaces.recommendation_interfaces import (
     IVehicleRepository,
@@ -14,6 +14,9 @@ from app.exceptions.recommendation_exceptions import (
     VehicleNotFoundError,
 )
 from app.services.caching_service import CachingService
+from app.services.model_serving_service import ModelServingService
+from app.services.materialization_service import RecommendationMaterializer
+from app.services.training_runner import TrainingRunner
 from app.strategies.recommendation_strategies import RecommendationStrategy, RecommendationStrategyFactory
 class RecommendationOrchestrator(IRecommendationOrchestrator):
     """
@@ -30,6 +33,9 @@ class RecommendationOrchestrator(IRecommendationOrchestrator):
         ml_service: IMLModelService,
         logger: logging.Logger,
         default_strategy: RecommendationStrategy = RecommendationStrategy.HYBRID,
+        model_serving: Optional[ModelServingService] = None,
+        materializer: Optional[RecommendationMaterializer] = None,
+        training_runner: Optional[TrainingRunner] = None,
     ):
         self.vehicle_repository = vehicle_repository
         self.user_repository = user_repository
@@ -38,6 +44,9 @@ class RecommendationOrchestrator(IRecommendationOrchestrator):
         self.ml_service = ml_service
         self.logger = logger
         self.default_strategy = default_strategy
+        self.model_serving = model_serving
+        self.materializer = materializer
+        self.training_runner = training_runner
 
     async def get_recommendations(self, user_id: int, top_n: int, strategy: Optional[RecommendationStrategy] = None) -> schemas.RecommendationResponse:
         """
@@ -46,21 +55,71 @@ class RecommendationOrchestrator(IRecommendationOrchestrator):
         strategy = strategy or self.default_strategy
         self.logger.info(f"Fetching {strategy.value} recommendations for user_id={user_id}")
 
-        if not await self.user_repository.user_exists(user_id):
+        if strategy == RecommendationStrategy.HYBRID and self.materializer is not None:
+            # One query checks the user exists and stamps their interactions for the lookup.
+            stamp = (await self.user_repository.get_interaction_stamps([user_id])).get(user_id)
+            if stamp is None:
+                raise UserNotFoundError(user_id)
+            materialized = await self.materializer.get(user_id, top_n, stamp)
+            if materialized is not None:
+                return materialized
+        elif not await self.user_repository.user_exists(user_id):
             raise UserNotFoundError(user_id)
 
         recommender = self.strategy_factory.create_recommender(strategy)
         return await recommender.get_recommendations(user_id=user_id, top_n=top_n)
 
-    async def get_similar_vehicles(self, vehicle_id: int, top_n: int):
+    async def get_batch_recommendations(self, user_ids: List[int], top_n: int) -> AsyncIterator[schemas.BatchRecommendationItem]:
+        """
+        Stream hybrid recommendations for many users, one item per unique user ID.
+        Per-user failures are reported inline instead of aborting the batch.
+        """
+        unique_ids = list(dict.fromkeys(user_ids))
+        self.logger.info(f"Fetching batch hybrid recommendations for {len(unique_ids)} users")
+
+        recommender = self.strategy_factory.create_recommender(RecommendationStrategy.HYBRID)
+        async for user_id, response, error in recommender.get_batch_recommendations(unique_ids, top_n):
+            if error is not None:
+                yield schemas.BatchRecommendationItem(
+                    user_id=user_id,
+                    error=schemas.ErrorDetail(code=error.error_code, message=error.message),
+                )
+            else:
+                yield schemas.BatchRecommendationItem(
+                    user_id=user_id,
+                    recommendations=response.recommendations,
+                    model_type=response.model_type,
+                )
+
+    async def get_similar_vehicles(self, vehicle_id: int, top_n: int, profile: Optional[str] = None,
+                                   weights: Optional[Dict[str, float]] = None):
         row = self.vehicle_repository.get_vehicle_by_id(vehicle_id)
         if not row:
             raise VehicleNotFoundError(vehicle_id)
 
         content_recommender: IContentBasedRecommender = self.strategy_factory.create_recommender(RecommendationStrategy.CONTENT_BASED)
-        return await content_recommender.get_similar_vehicles(vehicle_id, top_n)
+        return await content_recommender.get_similar_vehicles(vehicle_id, top_n, profile=profile, weights=weights)
 
     async def train_all_models(self):
-        await self.ml_service.train_vehicle_similarity_model()
-        await self.ml_service.train_user_similarity_model()
-        await self.ml_service.train_collaborative_model()
\ No newline at end of file
+        await self.retrain_models()
+
+    async def retrain_models(self, models: Optional[Sequence[str]] = None) -> bool:
+        """Retrain `models` (all by default), serve the new versions and re-materialize."""
+        if self.training_runner is not None:
+            # Out of process: the runner hot-swaps the published versions itself.
+            if not await self.training_runner.train(models):
+                return False
+        else:
+            await self.ml_service.train_all_models(models)
+            if self.model_serving is not None:
+                versions = await self.model_serving.reload_all()
+                self.logger.info(f"Serving retrained models: {versions}")
+        await self.materialize_recommendations()
+        return True
+
+    async def materialize_recommendations(self) -> int:
+        """Precompute hybrid recommendations for every known user into Redis."""
+        if self.materializer is None:
+            return 0
+        recommender = self.strategy_factory.create_recommender(RecommendationStrategy.HYBRID)
+        return await self.materializer.materialize(recommender)
@@ -1,43 +1,256 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 from app.exceptions.recommendation_exceptions import (
     UserNotFoundError,
     ModelNotAvailableError,
 )
+from app.models.als import fold_in_user, item_gram
+from app.models.model_persistance import upgrade_collaborative_model
 from app.services.model_serving_service import ModelServingService
 
+def select_top_n(scores: np.ndarray, vehicle_ids: np.ndarray, top_n: int, exclude: Optional[np.ndarray] = None) -> Dict[int, float]:
+    """
+    Top-N of a score vector as an ordered {vehicle_id: score} dict.
+    argpartition picks the candidates in O(V); only those N are sorted.
+    """
+    if exclude is not None and exclude.any():
+        scores = np.where(exclude, -np.inf, scores)
+        available = int(scores.size - np.count_nonzero(exclude))
+    else:
+        available = int(scores.size)
+
+    k = min(top_n, available)
+    if k <= 0:
+        return {}
+    top_idx = np.argpartition(scores, scores.size - k)[-k:] if k < scores.size else np.arange(scores.size)
+    top_idx = top_idx[np.argsort(-scores[top_idx], kind="stable")]
+    return dict(zip(vehicle_ids[top_idx].tolist(), scores[top_idx].tolist()))
+
 class CollaborativeBasedRecommender:
-    def __init__(self, model_serving: ModelServingService):
+    """
+    Scores vehicles from the collaborative user/vehicle factors. With a `user_repo`, users
+    missing from the model, or whose interactions changed since training, are folded in
+    at request time from their current weighted interactions - those the caller already
+    fetched, else one query for the queried users. Folded-in vectors are kept in a bounded
+    LRU until the user's interactions or the served model change.
+    """
+
+    def __init__(
+        self,
+        model_serving: ModelServingService,
+        user_repo=None,
+        interaction_weights: Optional[Dict[str, float]] = None,
+        fold_in_cache_size: int = 10000,
+    ):
         self.model_serving = model_serving
+        self.user_repo = user_repo
+        self.interaction_weights = dict(interaction_weights or {})
+        self.fold_in_cache_size = fold_in_cache_size
+        self._fold_in_cache: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._fold_in_model = None
+        self._fold_in_gram: Optional[np.ndarray] = None
 
-    async def get_collaborative_recommendations(self, user_id: int, top_n: int):
-        collaborative_model = await self.model_serving.load_model("collaborative")
+    @staticmethod
+    def _unpack(collaborative_model):
         if collaborative_model is None:
             raise ModelNotAvailableError("Collaborative model is loading, try again later")
 
-        interaction_matrix = collaborative_model.get("interaction_matrix")
+        collaborative_model = upgrade_collaborative_model(collaborative_model)
+        interactions = collaborative_model.get("interactions")
+        user_ids = collaborative_model.get("user_ids")
+        vehicle_ids = collaborative_model.get("vehicle_ids")
         user_features = collaborative_model.get("user_features")
         vehicle_features = collaborative_model.get("vehicle_features")
 
         if (
-        interaction_matrix is None
+            interactions is None
+            or user_ids is None
+            or vehicle_ids is None
             or user_features is None
             or vehicle_features is None
         ):
             raise ModelNotAvailableError("Collaborative model is not available or corrupted")
+        return interactions, np.asarray(user_ids), np.asarray(vehicle_ids), user_features, np.asarray(vehicle_features)
+
+    @staticmethod
+    def _user_rows(user_ids: np.ndarray, queried) -> np.ndarray:
+        """Row of each queried user in the sorted `user_ids` (binary search), -1 if unknown."""
+        keys = np.asarray(queried, dtype=np.int64)
+        if len(user_ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(user_ids, keys), len(user_ids) - 1)
+        return np.where(user_ids[pos] == keys, pos, -1)
+
+    @staticmethod
+    def _training_row(interactions, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The user's training-time (column indices, weighted counts), zeros dropped, sorted by column."""
+        start, stop = interactions.indptr[row], interactions.indptr[row + 1]
+        indices = np.asarray(interactions.indices[start:stop], dtype=np.int64)
+        values = np.asarray(interactions.data[start:stop], dtype=np.float64)
+        keep = values != 0
+        order = np.argsort(indices[keep], kind="stable")
+        return indices[keep][order], values[keep][order]
+
+    def _weighted_row(self, vehicle_ids: np.ndarray, rows: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Collapse per-type interaction counts into the model's weighted counts, as
+        (column indices, values) sorted by column. Vehicles the model has never seen are dropped.
+        """
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        columns = self._user_rows(vehicle_ids, [row["vehicle_id"] for row in rows])
+        weights = np.array(
+            [float(row["count"]) * float(self.interaction_weights.get(row["interaction_type"], 0.0)) for row in rows],
+            dtype=np.float64,
+        )
+        known = columns >= 0
+        indices, inverse = np.unique(columns[known], return_inverse=True)
+        values = np.bincount(inverse, weights=weights[known], minlength=len(indices))
+        keep = values != 0
+        return indices[keep], values[keep]
+
+    def _sync_fold_in(self, collaborative_model) -> None:
+        # Folded-in vectors live in the served model's factor space; a swap invalidates them all.
+        if collaborative_model is not self._fold_in_model:
+            self._fold_in_cache.clear()
+            self._fold_in_gram = None
+            self._fold_in_model = collaborative_model
+
+    def _fold_in(self, collaborative_model, vehicle_features: np.ndarray,
+                 indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Project one user's weighted interactions into the model's factor space: r @ components_.T
+        for SVD (vehicle_features holds components_.T), an exact row solve for ALS.
+        """
+        if collaborative_model.get("algorithm") == "als":
+            params = collaborative_model.get("als") or {}
+            if self._fold_in_gram is None:
+                self._fold_in_gram = item_gram(vehicle_features, float(params.get("regularization", 0.1)))
+            return fold_in_user(vehicle_features, indices, values, float(params.get("alpha", 1.0)), self._fold_in_gram)
+        return values @ vehicle_features[indices]
+
+    def _folded_vector(self, collaborative_model, vehicle_features: np.ndarray, user_id: int,
+                       indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        cached = self._fold_in_cache.get(user_id)
+        if cached is not None and np.array_equal(cached[0], indices) and np.array_equal(cached[1], values):
+            self._fold_in_cache.move_to_end(user_id)
+            return cached[2]
+
+        vector = self._fold_in(collaborative_model, vehicle_features, indices, values)
+        self._fold_in_cache[user_id] = (indices, values, vector)
+        self._fold_in_cache.move_to_end(user_id)
+        while len(self._fold_in_cache) > self.fold_in_cache_size:
+            self._fold_in_cache.popitem(last=False)
+        return vector
+
+    async def _current_interactions(
+        self, user_ids: List[int], interactions: Optional[Dict[int, List[Dict[str, Any]]]]
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Current typed interactions of the queried users: the caller's, else one query."""
+        if self.user_repo is None or not user_ids:
+            return {}
+        if interactions is not None:
+            return {uid: interactions[uid] for uid in user_ids if uid in interactions}
+        return await self.user_repo.get_typed_interactions(user_ids)
+
+    async def _resolve_users(self, collaborative_model, queried: List[int],
+                             interactions: Optional[Dict[int, List[Dict[str, Any]]]] = None):
+        """
+        User vectors and seen columns for the queried users. The trained vector is used while
+        the user's interactions still match training; otherwise the user is folded in.
+        Users with neither a trained vector nor any interaction the model knows are omitted.
+        """
+        matrix, user_ids, vehicle_ids, user_features, vehicle_features = self._unpack(collaborative_model)
+        self._sync_fold_in(collaborative_model)
+        current = await self._current_interactions(list(queried), interactions)
+
+        found, vectors, seen = [], [], []
+        for user_id, row in zip(queried, self._user_rows(user_ids, queried).tolist()):
+            indices, values = self._training_row(matrix, row) if row >= 0 else (None, None)
+            vector = user_features[row] if row >= 0 else None
+
+            if user_id in current:
+                live_indices, live_values = self._weighted_row(vehicle_ids, current[user_id])
+                unchanged = (
+                    indices is not None
+                    and np.array_equal(indices, live_indices)
+                    and np.allclose(values, live_values)
+                )
+                if len(live_indices) and not unchanged:
+                    indices, values = live_indices, live_values
+                    vector = self._folded_vector(collaborative_model, vehicle_features, int(user_id), indices, values)
+
+            if vector is None:
+                continue
+            found.append(user_id)
+            vectors.append(vector)
+            seen.append(indices[values > 0])
+        return found, vectors, seen, vehicle_ids, vehicle_features
+
+    @staticmethod
+    def _seen_masks(n_vehicles: int, seen: List[np.ndarray]) -> np.ndarray:
+        masks = np.zeros((len(seen), n_vehicles), dtype=bool)
+        for i, columns in enumerate(seen):
+            masks[i, columns] = True
+        return masks
+
+    async def get_collaborative_recommendations(
+        self, user_id: int, top_n: int, exclude_seen: bool = False,
+        interactions: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+    ) -> Dict[int, float]:
+        """
+        Min-max normalized collaborative scores for the user's top-N vehicles.
+        With `exclude_seen`, vehicles the user already interacted with are never returned.
+        `interactions` are the caller's typed interactions, reused for fold-in.
+        """
+        async with self.model_serving.use_model("collaborative") as collaborative_model:
+            found, vectors, seen, vehicle_ids, vehicle_features = await self._resolve_users(
+                collaborative_model, [user_id], interactions
+            )
+            if not found:
+                raise UserNotFoundError(user_id)
+
+            scores = vehicle_features @ vectors[0]
 
-        if user_id not in interaction_matrix.index:
-            raise UserNotFoundError(user_id)
+            min_score, max_score = scores.min(), scores.max()
+            norm_scores = (scores - min_score) / ((max_score - min_score) or 1.0)
 
-        user_index = interaction_matrix.index.get_loc(user_id)
-        user_vector = user_features[user_index]
+            mask = self._seen_masks(len(vehicle_ids), seen)[0] if exclude_seen else None
+            return select_top_n(norm_scores, vehicle_ids, top_n, exclude=mask)
 
-        scores = np.dot(vehicle_features, user_vector)
-        vehicle_ids = interaction_matrix.columns.values
+    async def get_batch_collaborative_recommendations(
+        self, user_ids: List[int], top_n: int, exclude_seen: bool = False,
+        interactions: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+    ) -> Dict[int, Dict[int, float]]:
+        """
+        Collaborative top-N for many users from a single user_vectors @ vehicle_features.T GEMM.
+        Users that can be neither found nor folded in are omitted from the result. The GEMM
+        and per-user top-N run in a worker thread, off the event loop.
+        """
+        async with self.model_serving.use_model("collaborative") as collaborative_model:
+            found, vectors, seen, vehicle_ids, vehicle_features = await self._resolve_users(
+                collaborative_model, list(user_ids), interactions
+            )
+            if not found:
+                return {}
+            return await asyncio.to_thread(
+                self._batch_top_n, found, vectors, seen, vehicle_ids, vehicle_features, top_n, exclude_seen
+            )
 
-        min_score, max_score = scores.min(), scores.max()
-        norm_scores = (scores - min_score) / ((max_score - min_score) or 1.0)
+    @classmethod
+    def _batch_top_n(cls, found: List[int], vectors: List[np.ndarray], seen: List[np.ndarray],
+                     vehicle_ids: np.ndarray, vehicle_features: np.ndarray, top_n: int,
+                     exclude_seen: bool) -> Dict[int, Dict[int, float]]:
+        scores = np.vstack(vectors) @ vehicle_features.T
+        mins = scores.min(axis=1, keepdims=True)
+        ranges = scores.max(axis=1, keepdims=True) - mins
+        ranges[ranges == 0] = 1.0
+        norm_scores = (scores - mins) / ranges
 
-        result = {
-            int(v_id): float(norm_scores[i]) for i, v_id in enumerate(vehicle_ids)
+        masks = cls._seen_masks(len(vehicle_ids), seen) if exclude_seen else None
+        return {
+            int(uid): select_top_n(norm_scores[i], vehicle_ids, top_n, exclude=masks[i] if masks is not None else None)
+            for i, uid in enumerate(found)
         }
-        return dict(sorted(result.items(), key=lambda kv: kv[1], reverse=True)[:top_n])
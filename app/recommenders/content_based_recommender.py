@@ -1,9 +1,13 @@
-from typing import List, Dict, TYPE_CHECKING
+from typing import List, Dict, Optional, TYPE_CHECKING
+import numpy as np
 from app.schemas import schemas
+from app.models.topk_index import TopKSimilarityIndex
 from app.repositories.vehicle_repository import VehicleRepository
 from app.services.caching_service import CachingService
 from app.services.model_serving_service import ModelServingService
-from app.exceptions.recommendation_exceptions import VehicleNotFoundError, ModelNotAvailableError
+from app.exceptions.recommendation_exceptions import (
+    InvalidWeightProfileError, VehicleNotFoundError, ModelNotAvailableError
+)
 
 class ContentBasedRecommender: 
     """
@@ -11,12 +15,20 @@ class ContentBasedRecommender:
     Loads similarity models via MLModelService, applies caching, enriches results with vehicle features.
     """
 
-    def __init__(self, vehicle_repository: VehicleRepository, model_service: ModelServingService, caching_service: CachingService):
+    def __init__(self, vehicle_repository: VehicleRepository, model_service: ModelServingService, caching_service: CachingService,
+                 weight_profiles: Optional[Dict[str, Dict[str, float]]] = None):
         self.vehicle_repository = vehicle_repository
         self.model_serving = model_service
         self.cache = caching_service
+        self.weight_profiles = weight_profiles or {}
+
+    async def get_similar_vehicles(self, vehicle_id: int, top_n: int, profile: Optional[str] = None,
+                                   weights: Optional[Dict[str, float]] = None) -> schemas.SimilarVehiclesResponse:
+        if profile is not None or weights:
+            # One mat-vec over the resident catalog per request, so not cached.
+            similar_raw = await self._compute_weighted_similar_vehicles(vehicle_id, top_n, self._profile_weights(profile, weights))
+            return self._similar_response(vehicle_id, similar_raw)
 
-    async def get_similar_vehicles(self, vehicle_id: int, top_n: int) -> schemas.SimilarVehiclesResponse:
         # Check cache first
         cached = await self.cache.get_cached_vehicle_similarity(vehicle_id, top_n)
         if cached:
@@ -24,7 +36,9 @@ class ContentBasedRecommender:
         else:
             similar_raw = await self._compute_similar_vehicles(vehicle_id, top_n)
             await self.cache.set_cached_vehicle_similarity(vehicle_id, top_n, similar_raw)
+        return self._similar_response(vehicle_id, similar_raw)
 
+    def _similar_response(self, vehicle_id: int, similar_raw: List[Dict]) -> schemas.SimilarVehiclesResponse:
         similar: List[schemas.SimilarVehicle] = []
         for sv in similar_raw:
             srow = self.vehicle_repository.get_vehicle_by_id(sv["vehicle_id"])
@@ -46,13 +60,37 @@ class ContentBasedRecommender:
         )
 
     async def _compute_similar_vehicles(self, vehicle_id: int, top_n: int, model_name="vehicle_similarity") -> List[Dict]:
-        model = await self.model_serving.load_model(model_name)
-        if model is None:
-            raise ModelNotAvailableError("content-based model not available")
-        if vehicle_id not in model:
-            raise VehicleNotFoundError(vehicle_id)
+        async with self.model_serving.use_model(model_name) as model:
+            if model is None:
+                raise ModelNotAvailableError("content-based model not available")
+            if isinstance(model, TopKSimilarityIndex):
+                # Falls back to the ANN index past the precomputed depth or for unlisted vehicles.
+                sims = model.similar(vehicle_id, top_n)
+                if sims is None:
+                    raise VehicleNotFoundError(vehicle_id)
+            else:
+                if vehicle_id not in model:
+                    raise VehicleNotFoundError(vehicle_id)
+                sims = model[vehicle_id][:top_n]
+        return [{"vehicle_id": vid, "similarity_score": score} for vid, score in sims]
 
-        sims = model[vehicle_id][:top_n]
+    def _profile_weights(self, profile: Optional[str], weights: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """The named profile's overrides, then the explicit ones on top."""
+        if profile is not None and profile not in self.weight_profiles:
+            raise InvalidWeightProfileError(f"Unknown weight profile '{profile}'")
+        return {**self.weight_profiles.get(profile, {}), **(weights or {})}
+
+    async def _compute_weighted_similar_vehicles(self, vehicle_id: int, top_n: int, weights: Dict[str, float]) -> List[Dict]:
+        async with self.model_serving.use_model("vehicle_similarity") as model:
+            weighted = getattr(model, "weighted", None)
+            if weighted is None:
+                raise ModelNotAvailableError("weighted vehicle similarity")
+            try:
+                sims = weighted.similar(vehicle_id, top_n, weights)
+            except ValueError as e:
+                raise InvalidWeightProfileError(str(e))
+        if sims is None:
+            raise VehicleNotFoundError(vehicle_id)
         return [{"vehicle_id": vid, "similarity_score": score} for vid, score in sims]
 
     async def get_similar_vehicles_scores(self, vehicle_id: int, top_n: int, model_name="user_similarity") -> List[Dict]:
@@ -70,3 +108,28 @@ class ContentBasedRecommender:
         )
         await self.cache.set_cached_vehicle_similarity(vehicle_id, top_n, similar_raw)
         return similar_raw
+
+    async def get_content_scores(self, interactions: List[Dict], top_n: int, model_name="user_similarity") -> Dict[int, float]:
+        """
+        Aggregate content scores for a user's interactions in one step: the weighted
+        interaction vector times the top-k similarity matrix (first `top_n` neighbours per row).
+        Interacted vehicles missing from the model are skipped.
+        """
+        vehicle_ids = np.array([int(inter.get("vehicle_id") or 0) for inter in interactions], dtype=np.int64)
+        weights = np.array([float(inter.get("weight", 1.0)) for inter in interactions], dtype=np.float64)
+        keep = vehicle_ids != 0
+        vehicle_ids, weights = vehicle_ids[keep], weights[keep]
+
+        async with self.model_serving.use_model(model_name) as model:
+            if model is None:
+                raise ModelNotAvailableError("content-based model not available")
+
+            if isinstance(model, TopKSimilarityIndex):
+                neighbor_ids, scores = model.weighted_scores(vehicle_ids, weights, per_row=top_n)
+                return dict(zip(neighbor_ids.tolist(), scores.tolist()))
+
+            content_scores: Dict[int, float] = {}
+            for vid, weight in zip(vehicle_ids.tolist(), weights.tolist()):
+                for sid, sim in model.get(vid, [])[:top_n]:
+                    content_scores[int(sid)] = content_scores.get(int(sid), 0.0) + float(sim) * weight
+            return content_scores
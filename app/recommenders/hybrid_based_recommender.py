@@ -1,9 +1,13 @@
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import AsyncIterator, Dict, List, Optional, Tuple, TYPE_CHECKING
 from app.schemas.schemas import RecommendationResponse, VehicleRecommendation
-from app.exceptions.recommendation_exceptions import InsufficientDataError
+from app.exceptions.recommendation_exceptions import (
+    InsufficientDataError,
+    RecommendationServiceError,
+    UserNotFoundError,
+)
 from app.repositories.vehicle_repository import VehicleRepository
 from app.repositories.user_repository import UserRepository
-from app.services.score_combiner import ScoreCombiner
+from app.interfaces.recommendation_interfaces import IScoreCombiner
 import asyncio
 if TYPE_CHECKING:
     from app.interfaces.recommendation_interfaces import (
@@ -23,7 +27,7 @@ class HybridRecommender:
         vehicle_repo: VehicleRepository,
         content_recommender: "IContentBasedRecommender",
         collab_recommender: "ICollaborativeRecommender",
-        score_combiner: ScoreCombiner,
+        score_combiner: IScoreCombiner,
     ):
         self.user_repo = user_repo
         self.vehicle_repo = vehicle_repo
@@ -32,61 +36,101 @@ class HybridRecommender:
         self.score_combiner = score_combiner
 
     async def get_recommendations(self, user_id: int, top_n: int = 10) -> RecommendationResponse:
-        user_interactions = await self.user_repo.get_user_interactions(user_id)
+        # One query serves both recommenders: typed rows for collaborative fold-in,
+        # collapsed to per-vehicle weights for the content scores.
+        typed = await self.user_repo.get_typed_interactions([user_id])
+        user_interactions = self._vehicle_weights(typed.get(user_id, []))
 
         if not user_interactions or len(user_interactions) <= 10:
-            return await self._handle_cold_start(user_id, user_interactions, top_n)
+            return await self._handle_cold_start(user_id, user_interactions, top_n, typed)
 
-        return await self._compute_hybrid_scores(user_id, user_interactions, top_n, 0.5, 0.5)
+        return await self._compute_hybrid_scores(user_id, user_interactions, top_n, 0.5, 0.5, typed)
     
     async def _handle_cold_start(
-        self, user_id: int, user_interactions: Optional[List[dict]], top_n: int
+        self, user_id: int, user_interactions: Optional[List[dict]], top_n: int,
+        typed: Optional[Dict[int, List[dict]]] = None,
     ) -> RecommendationResponse:
         if not user_interactions:
             raise InsufficientDataError(user_id)
 
-        interaction_count = len(user_interactions)
-        if interaction_count <= 3:
-            content_weight, collab_weight = 0.9, 0.1
-        else:
-            content_weight, collab_weight = 0.7, 0.3
-
+        content_weight, collab_weight = self._blend_weights(len(user_interactions))
         return await self._compute_hybrid_scores(
-            user_id, user_interactions, top_n, content_weight, collab_weight
+            user_id, user_interactions, top_n, content_weight, collab_weight, typed
         )
 
+    @staticmethod
+    def _vehicle_weights(typed_interactions: List[dict]) -> List[dict]:
+        """Per-type interaction counts summed per vehicle, in the get_user_interactions shape."""
+        weights: Dict[int, int] = {}
+        for row in typed_interactions:
+            weights[row["vehicle_id"]] = weights.get(row["vehicle_id"], 0) + row["count"]
+        return [{"vehicle_id": vid, "weight": weight} for vid, weight in weights.items()]
+
+    async def get_batch_recommendations(
+        self, user_ids: List[int], top_n: int = 10, chunk_size: int = 512
+    ) -> AsyncIterator[Tuple[int, Optional[RecommendationResponse], Optional[RecommendationServiceError]]]:
+        """
+        Hybrid recommendations for many users, yielded per user as (user_id, response, error).
+        Interactions come from one query; collaborative scores from one GEMM per chunk of users.
+        """
+        await asyncio.gather(self.content_recommender.model_serving.load_model("user_similarity"), self.collab_recommender.model_serving.load_model("collaborative"))
+
+        typed = await self.user_repo.get_typed_interactions(user_ids)
+
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            collab_scores = await self.collab_recommender.get_batch_collaborative_recommendations(
+                chunk, top_n * 3, exclude_seen=True, interactions=typed
+            )
+            for user_id in chunk:
+                user_interactions = self._vehicle_weights(typed.get(user_id, []))
+                if not user_interactions:
+                    yield user_id, None, InsufficientDataError(user_id)
+                elif user_id not in collab_scores:
+                    yield user_id, None, UserNotFoundError(user_id)
+                else:
+                    content_weight, collab_weight = self._blend_weights(len(user_interactions))
+                    response = await self._rank_hybrid(
+                        user_interactions, collab_scores[user_id], top_n, content_weight, collab_weight
+                    )
+                    yield user_id, response, None
+                # Let other requests run between users of a large batch.
+                await asyncio.sleep(0)
+
+    @staticmethod
+    def _blend_weights(interaction_count: int) -> Tuple[float, float]:
+        if interaction_count <= 3:
+            return 0.9, 0.1
+        if interaction_count <= 10:
+            return 0.7, 0.3
+        return 0.5, 0.5
+
     async def _compute_hybrid_scores(
         self, user_id: int, user_interactions: List[dict], top_n: int,
-        content_weight: float, collab_weight: float
+        content_weight: float, collab_weight: float, typed: Optional[Dict[int, List[dict]]] = None,
     ) -> RecommendationResponse:
         await asyncio.gather(self.content_recommender.model_serving.load_model("user_similarity"), self.collab_recommender.model_serving.load_model("collaborative"))        
 
         collab_scores: Dict[int, float] = await self.collab_recommender.get_collaborative_recommendations(
-            user_id, top_n * 3
+            user_id, top_n * 3, exclude_seen=True, interactions=typed
         ) or {}
 
-        content_scores: Dict[int, float] = {}
-        for inter in user_interactions:
-            vid = int(inter.get("vehicle_id"))
-            weight = float(inter.get("weight", 1.0))
-            if not vid:
-                continue
-            similar_list = await self.content_recommender.get_similar_vehicles_scores(
-                vid, top_n * 3, "user_similarity"
-            ) or []
-            for sv in similar_list:
-                sid = int(sv["vehicle_id"])
-                sim = float(sv["similarity_score"])
-                content_scores[sid] = content_scores.get(sid, 0.0) + sim * weight
+        return await self._rank_hybrid(user_interactions, collab_scores, top_n, content_weight, collab_weight)
+
+    async def _rank_hybrid(
+        self, user_interactions: List[dict], collab_scores: Dict[int, float], top_n: int,
+        content_weight: float, collab_weight: float
+    ) -> RecommendationResponse:
+        content_scores: Dict[int, float] = await self.content_recommender.get_content_scores(
+            user_interactions, top_n * 3, "user_similarity"
+        )
 
         if content_scores:
             max_c = max(content_scores.values()) or 1.0
             for k in list(content_scores.keys()):
                 content_scores[k] = content_scores[k] / max_c
 
-        hybrid_scores = self.score_combiner.combine(content_scores, collab_scores, content_weight, collab_weight)
-
-        ranked = sorted(hybrid_scores.items(), key=lambda kv: kv[1], reverse=True)[:top_n]
+        ranked = self.score_combiner.combine_top_n(content_scores, collab_scores, content_weight, collab_weight, top_n)
 
         recommendations: List[VehicleRecommendation] = []
         for vid, score in ranked:
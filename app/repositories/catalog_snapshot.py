@@ -0,0 +1,113 @@
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+SNAPSHOT_FORMAT_VERSION = 1
+HEADER_KEY = b"catalog_header"
+SNAPSHOT_FILE = "vehicle_catalog.arrow"
+
+# Columnar vehicle catalog snapshot: an Arrow IPC file whose schema metadata carries a
+# JSON header ({format_version, watermark, ...}). Columns that were Python objects in
+# pandas (e.g. enrichment columns mixing ints and None) are listed in the header and
+# restored as object columns so values round-trip exactly.
+
+
+def _to_arrow(df: pd.DataFrame) -> Tuple[pa.Table, list]:
+    arrays, names, object_columns = [], [], []
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            object_columns.append(str(col))
+        try:
+            array = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array([None if v is None else str(v) for v in series.tolist()], type=pa.string())
+        arrays.append(array)
+        names.append(str(col))
+    return pa.Table.from_arrays(arrays, names=names), object_columns
+
+
+def _from_arrow(table: pa.Table, header: Dict[str, Any]) -> pd.DataFrame:
+    object_columns = set(header.get("object_columns", ()))
+    df = table.drop_columns([c for c in table.column_names if c in object_columns]).to_pandas(split_blocks=True)
+    for col in object_columns:
+        if col in table.column_names:
+            df[col] = pd.Series(table.column(col).to_pylist(), dtype=object)
+    return df[table.column_names]
+
+
+def _with_header(table: pa.Table, header: Dict[str, Any]) -> pa.Table:
+    return table.replace_schema_metadata({HEADER_KEY: json.dumps(header, default=str).encode("utf-8")})
+
+
+def _header_of(schema: pa.Schema) -> Optional[Dict[str, Any]]:
+    raw = (schema.metadata or {}).get(HEADER_KEY)
+    if raw is None:
+        return None
+    header = json.loads(raw)
+    if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return header
+
+
+def build_header(watermark: Optional[Dict[str, Any]], **extra) -> Dict[str, Any]:
+    return {"format_version": SNAPSHOT_FORMAT_VERSION, "watermark": watermark or {}, **extra}
+
+
+def serialize(df: pd.DataFrame, header: Dict[str, Any]) -> bytes:
+    """Catalog -> Arrow IPC bytes, header embedded in the schema metadata."""
+    table, object_columns = _to_arrow(df)
+    table = _with_header(table, {**header, "object_columns": object_columns})
+    sink = pa.BufferOutputStream()
+    with ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize(data: bytes) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
+    reader = ipc.open_file(pa.py_buffer(data))
+    header = _header_of(reader.schema)
+    if header is None:
+        return None, None
+    return _from_arrow(reader.read_all(), header), header
+
+
+def snapshot_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, SNAPSHOT_FILE)
+
+
+def write_snapshot(cache_dir: str, df: pd.DataFrame, header: Dict[str, Any]) -> str:
+    """Atomically write the snapshot file (tmp file + os.replace)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = snapshot_path(cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(serialize(df, header))
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot_header(cache_dir: str) -> Optional[Dict[str, Any]]:
+    """Header only; the record batches are not read."""
+    path = snapshot_path(cache_dir)
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        return _header_of(ipc.open_file(source).schema)
+
+
+def read_snapshot(cache_dir: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
+    """Memory-map the snapshot file; numeric columns are converted without extra copies."""
+    path = snapshot_path(cache_dir)
+    if not os.path.exists(path):
+        return None, None
+    with pa.memory_map(path, "r") as source:
+        reader = ipc.open_file(source)
+        header = _header_of(reader.schema)
+        if header is None:
+            return None, None
+        return _from_arrow(reader.read_all(), header), header
@@ -1,19 +1,49 @@
 import pandas as pd
-from typing import List, Dict
+from typing import Any, List, Dict, Iterable, Optional
 
 class UserRepository:
     def __init__(self, pool):
         self.pool = pool
-        self._interactions_df: pd.DataFrame | None = None 
+        self._interactions_df: pd.DataFrame | None = None
+        self._interactions_watermark: Optional[Dict[str, Any]] = None
 
     async def user_exists(self, user_id: int) -> bool:
         query = 'SELECT EXISTS (SELECT 1 FROM "Users" WHERE "Id" = $1)'
         async with self.pool.acquire() as conn:
             return await conn.fetchval(query, user_id)
 
+    async def get_interaction_stamps(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Per-user fingerprint of their interactions ("<count>-<max Id>") in one round trip.
+        Users that do not exist are absent from the result, so this doubles as user_exists.
+        """
+        query = """
+            SELECT u."Id" AS user_id, COUNT(i."Id") AS count, MAX(i."Id") AS max_id
+            FROM "Users" u
+            LEFT JOIN "UserInteractions" i ON i."UserId" = u."Id"
+            WHERE u."Id" = ANY($1::int[])
+            GROUP BY u."Id"
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(query, list(user_ids))
+        return {row["user_id"]: f'{row["count"]}-{row["max_id"] or 0}' for row in rows}
+
+    async def fetch_interaction_watermark(self) -> Dict[str, Any]:
+        """Cheap fingerprint of UserInteractions: row count and max Id."""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow('SELECT COUNT(*) AS count, MAX("Id") AS max_id FROM "UserInteractions"')
+        return {
+            "count": int(row["count"]),
+            "max_id": int(row["max_id"]) if row["max_id"] is not None else None,
+        }
+
     async def load_interactions_summary(self) -> pd.DataFrame:
-        """Load all user interactions into a DataFrame (async DB)."""
-        if self._interactions_df is not None:
+        """
+        Load all user interactions into a DataFrame (async DB). The aggregate is reused
+        only while the table's watermark is unchanged, so a retrain always sees new rows.
+        """
+        watermark = await self.fetch_interaction_watermark()
+        if self._interactions_df is not None and watermark == self._interactions_watermark:
             return self._interactions_df
 
         query = """
@@ -30,6 +60,7 @@ class UserRepository:
 
         df = pd.DataFrame(rows_list)
         self._interactions_df = df
+        self._interactions_watermark = watermark
         return df
 
     async def get_user_interactions(self, user_id: int) -> List[Dict[str, float]]:
@@ -44,4 +75,26 @@ class UserRepository:
         """
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(query, user_id)
-        return [dict(row) for row in rows]
\ No newline at end of file
+        return [dict(row) for row in rows]
+
+    async def get_typed_interactions(self, user_ids: Iterable[int]) -> Dict[int, List[Dict[str, object]]]:
+        """
+        Current per-type interaction counts for many users in one round trip, keyed by
+        user ID, in the same shape `load_interactions_summary` aggregates for training.
+        """
+        query = """
+            SELECT "UserId" AS user_id, "VehicleId" AS vehicle_id,
+                   "InteractionType" AS interaction_type, COUNT(*) AS count
+            FROM "UserInteractions"
+            WHERE "UserId" = ANY($1::int[])
+            GROUP BY "UserId", "VehicleId", "InteractionType"
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(query, list(user_ids))
+
+        interactions: Dict[int, List[Dict[str, object]]] = {}
+        for row in rows:
+            interactions.setdefault(row["user_id"], []).append(
+                {"vehicle_id": row["vehicle_id"], "interaction_type": row["interaction_type"], "count": row["count"]}
+            )
+        return interactions
@@ -1,27 +1,62 @@
+import numpy as np
 import pandas as pd
 import asyncpg
+import hashlib
 import json
 import asyncio
-from typing import List, Dict, Optional, Any
-import pickle
+from datetime import datetime
+from typing import List, Dict, Mapping, Optional, Any, Sequence
+from app.repositories import catalog_snapshot
+from app.repositories.vehicle_store import VehicleRow, VehicleStore, render_features
+
+CAR_FEATURES_PATH = "app/data/car-features.json"
 
 
 class VehicleRepository:
     """
     Encapsulates all vehicle-related DB access and in-memory caching.
+
+    The enriched catalog is snapshotted as Arrow IPC (see catalog_snapshot) to a local
+    disk cache and, when a binary Redis client is given, to Redis. A snapshot is served
+    when its watermark matches the database, or when it can be caught up by polling the
+    rows changed since; otherwise the catalog is rebuilt. Once loaded, `refresh_changes`
+    patches rows changed since the last poll in place, and the snapshot is rewritten only
+    every `snapshot_every` ticks with changes or once `snapshot_min_changes` rows changed.
+
+    The catalog is streamed from a server-side cursor in `chunk_size` batches, selecting
+    only CATALOG_COLUMNS; `vehicle_limit` is optional and unbounded by default. Lookups on
+    the request path go through a compact VehicleStore built from the loaded frame.
     """
-    VEHICLE_CACHE_KEY = 'vehicle_features'
-    def __init__(self, pool: asyncpg.Pool, vehicle_limit: int = 20000, redis = None):
+    SNAPSHOT_KEY = 'vehicle_catalog:arrow'
+    SNAPSHOT_HEADER_KEY = 'vehicle_catalog:header'
+    ENRICHMENT_KEYS = ("Make", "Model", "Year")
+    ENRICHMENT_COLUMNS = ("CO2Emissions", "CityMPG", "Horsepower", "TorqueFtLbs",
+                          "EngineSize", "ZeroTo60MPH", "DrivetrainType")
+    CATALOG_COLUMNS = ("Id", "Make", "Model", "Year", "Price", "Mileage", "Color",
+                       "FuelType", "Transmission", "Status")
+    def __init__(self, pool: asyncpg.Pool, vehicle_limit: Optional[int] = None, redis = None,
+                 snapshot_dir: Optional[str] = "catalog_cache", chunk_size: int = 5000,
+                 snapshot_every: int = 20, snapshot_min_changes: int = 1000):
         self.pool = pool
         self.vehicle_limit = vehicle_limit
+        self.chunk_size = chunk_size
         self.redis = redis
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_every = snapshot_every
+        self.snapshot_min_changes = snapshot_min_changes
+        self.catalog_watermark: Optional[Dict[str, Any]] = None
+        self._car_features: Optional[pd.DataFrame] = None
+        self._change_cursor: Optional[Dict[str, Any]] = None
         self._vehicle_cache: Optional[pd.DataFrame] = None
-        self._vehicle_lookup: Dict[int, Dict[str, Any]] = {}
+        self._vehicle_store: VehicleStore = VehicleStore(pd.DataFrame())
         self._lock = asyncio.Lock()
+        self._table_columns: Optional[set] = None
+        self._unsaved_changes = 0
+        self._ticks_since_snapshot = 0
 
     async def _read_car_features_json(self) -> List[Dict[str, Any]]:
         def _read():
-            with open("app/data/car-features.json", "r", encoding="utf-8") as f:
+            with open(CAR_FEATURES_PATH, "r", encoding="utf-8") as f:
                 return json.load(f)
         try:
             return await asyncio.to_thread(_read)
@@ -29,101 +64,448 @@ class VehicleRepository:
             print(f"[WARN] Error loading car-features.json: {e}")
             return []
 
+    @staticmethod
+    def _car_features_checksum() -> Optional[str]:
+        try:
+            with open(CAR_FEATURES_PATH, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    async def fetch_watermark(self) -> Dict[str, Any]:
+        """
+        Cheap fingerprint of the catalog source: row count, max Id and, when the table
+        has one, max "UpdatedAt"; plus the vehicle limit and car-features.json checksum.
+        """
+        async with self.pool.acquire() as conn:
+            has_updated_at = "UpdatedAt" in await self._get_table_columns(conn)
+            updated_at = 'MAX("UpdatedAt")' if has_updated_at else 'NULL'
+            row = await conn.fetchrow(
+                f'SELECT COUNT(*) AS count, MAX("Id") AS max_id, {updated_at} AS updated_at FROM "Vehicles"'
+            )
+        return {
+            "count": int(row["count"]),
+            "max_id": int(row["max_id"]) if row["max_id"] is not None else None,
+            "updated_at": row["updated_at"].isoformat() if row["updated_at"] is not None else None,
+            "vehicle_limit": self.vehicle_limit,
+            "car_features": await asyncio.to_thread(self._car_features_checksum),
+        }
+
+    async def count_changed_since(self, watermark: Dict[str, Any]) -> int:
+        """
+        Vehicles added (Id above the watermark's max_id) or, when the table tracks it,
+        updated after its "UpdatedAt" - the size of the catalog delta since `watermark`.
+        """
+        max_id = watermark.get("max_id") or 0
+        updated_at = watermark.get("updated_at")
+        async with self.pool.acquire() as conn:
+            if updated_at and "UpdatedAt" in await self._get_table_columns(conn):
+                count = await conn.fetchval(
+                    'SELECT COUNT(*) FROM "Vehicles" WHERE "Id" > $1 OR "UpdatedAt" > $2',
+                    max_id, datetime.fromisoformat(updated_at)
+                )
+            else:
+                count = await conn.fetchval('SELECT COUNT(*) FROM "Vehicles" WHERE "Id" > $1', max_id)
+        return int(count or 0)
+
     async def load_vehicle_features(self) -> pd.DataFrame:
         async with self._lock:
             if self._vehicle_cache is not None:
                 return self._vehicle_cache
 
-            # Try Redis first
-            redis = getattr(self, "redis", None)
-            if redis:
-                data = await redis.get(self.VEHICLE_CACHE_KEY)
-                if data:
-                    try:
-                        df = pickle.loads(data)
-                        self._vehicle_cache = df
-                        self._vehicle_lookup = {int(row["Id"]): dict(row) for _, row in df.iterrows()}
-                        return df
-                    except Exception as e:
-                        print(f"[WARN] Failed to load vehicles from Redis: {e}")
-
-            # Fallback: query DB 
+            try:
+                watermark = await self.fetch_watermark()
+            except Exception as e:
+                print(f"[WARN] Could not read catalog watermark, accepting any snapshot: {e}")
+                watermark = None
+
+            df, header = await self._load_snapshot(watermark)
+            if df is not None:
+                self._set_catalog(df, header.get("watermark"))
+                print(f"[LOAD] Vehicle catalog loaded from snapshot ({len(df)} rows)")
+                if watermark is not None and header.get("watermark") != watermark:
+                    changed = await self._catch_up(watermark)
+                    print(f"[LOAD] Vehicle catalog caught up with {len(changed)} changed rows")
+                return self._vehicle_cache
+
+            # Fallback: stream from DB
             async with self.pool.acquire() as conn:
-                print("[DEBUG] starting DB fetch")
+                df = await self._stream_catalog(conn, expected_rows=(watermark or {}).get("count"))
+
+            # Enrich with car-features.json 
+            df = self.enrich_vehicle_features(df, await self._get_car_features())
+
+            # Save in memory
+            self._set_catalog(df, watermark)
+            await self._save_snapshot(df, watermark)
+
+            return df
+
+    async def _get_table_columns(self, conn) -> set:
+        if self._table_columns is None:
+            rows = await conn.fetch(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'Vehicles'"
+            )
+            self._table_columns = {r["column_name"] for r in rows}
+        return self._table_columns
+
+    async def _catalog_select(self, conn, extra: Sequence[str] = ()) -> str:
+        available = await self._get_table_columns(conn)
+        columns = [c for c in (*self.CATALOG_COLUMNS, *extra) if c in available]
+        return ", ".join(f'"{c}"' for c in columns) or "*"
+
+    async def _stream_catalog(self, conn, expected_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read the catalog through a server-side cursor, `chunk_size` rows at a time, into
+        per-column numpy buffers sized from the watermark row count: int64 or float64 for
+        numeric columns, object only for the rest. Each chunk is copied into the buffers
+        by slice and released, so the full result is never held twice.
+        """
+        limit = f" LIMIT {int(self.vehicle_limit)}" if self.vehicle_limit else ""
+        query = f'SELECT {await self._catalog_select(conn)} FROM "Vehicles" ORDER BY "Id"{limit}'
+        capacity = int(expected_rows or self.chunk_size)
+        if self.vehicle_limit:
+            capacity = min(capacity, int(self.vehicle_limit))
+
+        columns: Optional[List[str]] = None
+        buffers: Dict[str, np.ndarray] = {}
+        size = 0
+        async with conn.transaction():
+            cursor = await conn.cursor(query)
+            while True:
+                records = await cursor.fetch(self.chunk_size)
+                if not records:
+                    break
+                if columns is None:
+                    columns = list(records[0].keys())
+                end = size + len(records)
+                capacity = max(end, capacity * 2) if end > capacity else capacity
+                for i, col in enumerate(columns):
+                    values = [r[i] for r in records]
+                    buffer = buffers.get(col)
+                    dtype = self._buffer_dtype(values)
+                    if dtype is None:
+                        dtype = np.float64 if buffer is not None and buffer.dtype != object else object
+                    if buffer is None:
+                        buffer = np.empty(capacity, dtype=dtype)
+                    elif np.result_type(buffer.dtype, dtype) != buffer.dtype or len(buffer) < capacity:
+                        grown = np.empty(capacity, dtype=np.result_type(buffer.dtype, dtype))
+                        grown[:size] = buffer[:size]
+                        buffer = grown
+                    if buffer.dtype == object:
+                        buffer[size:end] = values
+                    else:
+                        buffer[size:end] = np.array(values, dtype=buffer.dtype)
+                    buffers[col] = buffer
+                size = end
+
+        if columns is None:
+            return pd.DataFrame()
+        # dtype is explicit so string columns stay object (pandas 3 would infer StringDtype).
+        return pd.DataFrame({
+            col: pd.Series(buffer[:size].copy(), dtype=buffer.dtype)
+            for col, buffer in ((col, buffers.pop(col)) for col in columns)
+        })
+
+    @staticmethod
+    def _buffer_dtype(values: List[Any]):
+        """int64 for ints, float64 for floats or ints with NULLs, None if all NULL, else object."""
+        present = [v for v in values if v is not None]
+        if not present:
+            return None
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            return object
+        if len(present) == len(values) and all(isinstance(v, int) for v in present):
+            return np.int64
+        return np.float64
+
+    async def _get_car_features(self) -> pd.DataFrame:
+        if self._car_features is None:
+            self._car_features = self.flatten_car_features(await self._read_car_features_json())
+        return self._car_features
+
+    def _set_catalog(self, df: pd.DataFrame, watermark: Optional[Dict[str, Any]]) -> None:
+        self._vehicle_store = self._build_lookup(df)
+        self._vehicle_cache = df
+        self.catalog_watermark = watermark
+        updated_at = (watermark or {}).get("updated_at")
+        self._change_cursor = self._cursor_of(df, {
+            "max_id": 0,
+            "updated_at": datetime.fromisoformat(updated_at) if updated_at else None,
+        })
+
+    @staticmethod
+    def _cursor_of(df: pd.DataFrame, cursor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Highest Id and "UpdatedAt" seen so far; the next poll asks for anything newer.
+        The catalog itself does not keep "UpdatedAt", so the initial value comes from the
+        watermark and later values from the changed rows.
+        """
+        cursor = dict(cursor or {"max_id": 0, "updated_at": None})
+        if df.empty:
+            return cursor
+        if "Id" in df.columns:
+            cursor["max_id"] = max(cursor["max_id"], int(df["Id"].max()))
+        if "UpdatedAt" in df.columns and df["UpdatedAt"].notna().any():
+            latest = df["UpdatedAt"].max()
+            latest = latest.to_pydatetime() if isinstance(latest, pd.Timestamp) else latest
+            if cursor["updated_at"] is None or latest > cursor["updated_at"]:
+                cursor["updated_at"] = latest
+        return cursor
+
+    async def fetch_changes(self) -> pd.DataFrame:
+        """
+        Rows inserted (Id above the cursor) or, when the table has "UpdatedAt", modified
+        since the last poll. Rows are returned raw, i.e. not yet enriched.
+        """
+        cursor = self._change_cursor or {"max_id": 0, "updated_at": None}
+        async with self.pool.acquire() as conn:
+            select = await self._catalog_select(conn, extra=("UpdatedAt",))
+            if cursor["updated_at"] is not None:
+                rows = await conn.fetch(
+                    f'SELECT {select} FROM "Vehicles" WHERE "UpdatedAt" > $1 OR "Id" > $2 ORDER BY "Id"',
+                    cursor["updated_at"], cursor["max_id"]
+                )
+            else:
                 rows = await conn.fetch(
-                    f'SELECT * FROM "Vehicles" ORDER BY "Id" LIMIT {self.vehicle_limit}'
+                    f'SELECT {select} FROM "Vehicles" WHERE "Id" > $1 ORDER BY "Id"', cursor["max_id"]
                 )
-                print("[DEBUG] fetched rows: ", len(rows))
+        return pd.DataFrame([dict(r) for r in rows])
 
-            print("[DEBUG] building DataFrame")
-            df = pd.DataFrame([dict(r) for r in rows])
-            print("[DEBUG] built DataFrame")
+    async def refresh_changes(self) -> List[int]:
+        """
+        Patch the loaded catalog with rows changed since the last poll: existing vehicles
+        are updated in place, new ones appended while under `vehicle_limit`. Returns the
+        IDs that changed. The snapshot is rewritten every `snapshot_every` ticks with changes
+        or once `snapshot_min_changes` rows are unsaved; a restart replays the rest from the
+        change cursor.
+        """
+        if self._vehicle_cache is None:
+            return []
+        try:
+            watermark = await self.fetch_watermark()
+        except Exception as e:
+            print(f"[WARN] Could not read catalog watermark: {e}")
+            watermark = None
+        changes, cursor = await self._poll_changes()
+        if changes is None:
+            return []
 
+        async with self._lock:
+            changed = await self._merge_changes(changes, cursor, watermark)
+        if not changed:
+            return []
 
-            # Enrich with car-features.json 
-            car_features_list = await self._read_car_features_json()
-            feature_lookup = {
-                (item['make'], item['model'], item['year']): item for item in car_features_list
-            }
-
-            # Add missing columns
-            for col in ["CO2Emissions", "CityMPG", "Horsepower", "TorqueFtLbs",
-                        "EngineSize", "ZeroTo60MPH", "DrivetrainType"]:
-                df[col] = None
+        self._ticks_since_snapshot += 1
+        if self._ticks_since_snapshot >= self.snapshot_every or self._unsaved_changes >= self.snapshot_min_changes:
+            await self._save_snapshot(self._vehicle_cache, self.catalog_watermark)
+        return changed
 
-            print("[DEBUG] enrichment start")
-            for i, row in df.iterrows():
-                key = (row.get("Make"), row.get("Model"), row.get("Year"))
-                feature_data = feature_lookup.get(key)
-                if feature_data:
-                    fuel = feature_data.get("features", {}).get("fuelEconomy", {})
-                    engine = feature_data.get("features", {}).get("engine", {})
-                    perf = feature_data.get("features", {}).get("performance", {})
-                    drivetrain = feature_data.get("features", {}).get("drivetrain", {})
-
-                    df.at[i, "CO2Emissions"] = fuel.get("CO2Emissions")
-                    df.at[i, "CityMPG"] = fuel.get("cityMPG")
-                    df.at[i, "Horsepower"] = engine.get("horsepower")
-                    df.at[i, "TorqueFtLbs"] = engine.get("torqueFtLBS")
-                    df.at[i, "EngineSize"] = engine.get("size")
-                    df.at[i, "ZeroTo60MPH"] = perf.get("ZeroTo60MPH")
-                    df.at[i, "DrivetrainType"] = drivetrain.get("type")
-
-            print("[DEBUG] enrichment end")
-            # Save in memory
-            self._vehicle_lookup = {int(row["Id"]): dict(row) for _, row in df.iterrows()}
-            self._vehicle_cache = df
+    async def _poll_changes(self):
+        """Enriched rows changed since the cursor and the cursor past them; (None, None) if none."""
+        changes = await self.fetch_changes()
+        if changes.empty:
+            return None, None
+        cursor = self._cursor_of(changes, self._change_cursor)
+        changes = changes.drop(columns=[c for c in ("UpdatedAt",) if c in changes.columns])
+        return self.enrich_vehicle_features(changes, await self._get_car_features()), cursor
 
-            # Save to Redis 
-            if redis:
+    async def _merge_changes(self, changes: pd.DataFrame, cursor: Dict[str, Any],
+                             watermark: Optional[Dict[str, Any]]) -> List[int]:
+        """Apply polled changes to the catalog and its store; the caller holds the lock."""
+        df, changed = self.apply_changes(self._vehicle_cache, changes, self.vehicle_limit)
+        self._change_cursor = cursor
+        if not changed:
+            return []
+        if self._vehicle_store is not None and self._vehicle_store.has_ids:
+            self._vehicle_store.apply(df[df["Id"].isin(changed)])
+        else:
+            self._vehicle_store = await asyncio.to_thread(self._build_lookup, df)
+        self._vehicle_cache = df
+        self.catalog_watermark = watermark
+        self._unsaved_changes += len(changed)
+        return changed
+
+    async def _catch_up(self, watermark: Dict[str, Any]) -> List[int]:
+        """
+        Bring a catalog loaded from an older snapshot up to `watermark` and rewrite the
+        snapshot, so the next start is served as is. The caller holds the lock.
+        """
+        changes, cursor = await self._poll_changes()
+        changed = await self._merge_changes(changes, cursor, watermark) if changes is not None else []
+        self.catalog_watermark = watermark
+        await self._save_snapshot(self._vehicle_cache, watermark)
+        return changed
+
+    @staticmethod
+    def _can_catch_up(snapshot: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> bool:
+        """
+        Whether polling changes turns a snapshot taken at `snapshot` into the catalog at
+        `current`: same limit and car features, "UpdatedAt" tracked, and no deletions.
+        """
+        if not snapshot or not current:
+            return False
+        return (snapshot.get("vehicle_limit") == current.get("vehicle_limit")
+                and snapshot.get("car_features") == current.get("car_features")
+                and snapshot.get("updated_at") is not None and current.get("updated_at") is not None
+                and int(current.get("count") or 0) >= int(snapshot.get("count") or 0))
+
+    @staticmethod
+    def apply_changes(df: pd.DataFrame, changes: pd.DataFrame, vehicle_limit: Optional[int] = None):
+        """
+        Merge enriched changed rows into the catalog by Id. Updates are written into the
+        existing frame column by column; only inserts grow it. Returns (catalog, changed IDs).
+        """
+        if changes.empty or "Id" not in changes.columns:
+            return df, []
+        changes = changes.drop_duplicates(subset=["Id"], keep="last")
+        positions = pd.Index(df["Id"].astype(int)).get_indexer(changes["Id"].astype(int))
+        is_update = positions >= 0
+
+        updates = changes[is_update]
+        if not updates.empty:
+            rows = df.index[positions[is_update]]
+            for col in updates.columns.intersection(df.columns):
+                values = updates[col].to_numpy()
                 try:
-                    await redis.set(self.VEHICLE_CACHE_KEY, pickle.dumps(df))
-                except Exception as e:
-                    print(f"[WARN] Failed to store vehicles in Redis: {e}")
+                    df.loc[rows, col] = values
+                except (TypeError, ValueError):
+                    df[col] = df[col].astype(object)
+                    df.loc[rows, col] = values
+
+        inserts = changes[~is_update]
+        if vehicle_limit is not None:
+            inserts = inserts.head(max(vehicle_limit - len(df), 0))
+        if not inserts.empty:
+            df = pd.concat([df, inserts.reindex(columns=df.columns)], ignore_index=True)
+
+        changed = updates["Id"].astype(int).tolist() + inserts["Id"].astype(int).tolist()
+        return df, changed
 
+    async def _load_snapshot(self, watermark: Optional[Dict[str, Any]]):
+        """
+        Usable snapshot from disk, then Redis: fresh, or stale but catchable up (see
+        `_can_catch_up`). (None, None) if both are missing or too far behind.
+        """
+        def is_fresh(header: Optional[Dict[str, Any]]) -> bool:
+            return header is not None and (watermark is None or header.get("watermark") == watermark
+                                           or self._can_catch_up(header.get("watermark"), watermark))
+
+        if self.snapshot_dir:
+            try:
+                header = await asyncio.to_thread(catalog_snapshot.read_snapshot_header, self.snapshot_dir)
+                if is_fresh(header):
+                    df, header = await asyncio.to_thread(catalog_snapshot.read_snapshot, self.snapshot_dir)
+                    if df is not None:
+                        return df, header
+            except Exception as e:
+                print(f"[WARN] Failed to read local catalog snapshot: {e}")
+
+        if self.redis:
+            try:
+                raw_header = await self.redis.get(self.SNAPSHOT_HEADER_KEY)
+                if raw_header and is_fresh(json.loads(raw_header)):
+                    data = await self.redis.get(self.SNAPSHOT_KEY)
+                    if data:
+                        df, header = await asyncio.to_thread(catalog_snapshot.deserialize, data)
+                        if df is not None and is_fresh(header):
+                            if self.snapshot_dir:
+                                await asyncio.to_thread(catalog_snapshot.write_snapshot, self.snapshot_dir, df, header)
+                            return df, header
+            except Exception as e:
+                print(f"[WARN] Failed to load vehicle catalog snapshot from Redis: {e}")
+
+        return None, None
+
+    async def _save_snapshot(self, df: pd.DataFrame, watermark: Optional[Dict[str, Any]]) -> None:
+        if watermark is None:
+            return
+        header = catalog_snapshot.build_header(watermark, rows=len(df))
+        self._unsaved_changes = 0
+        self._ticks_since_snapshot = 0
+
+        if self.snapshot_dir:
+            try:
+                await asyncio.to_thread(catalog_snapshot.write_snapshot, self.snapshot_dir, df, header)
+            except Exception as e:
+                print(f"[WARN] Failed to write local catalog snapshot: {e}")
+
+        if self.redis:
+            try:
+                data = await asyncio.to_thread(catalog_snapshot.serialize, df, header)
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.set(self.SNAPSHOT_KEY, data)
+                    pipe.set(self.SNAPSHOT_HEADER_KEY, json.dumps(header, default=str))
+                    await pipe.execute()
+            except Exception as e:
+                print(f"[WARN] Failed to store vehicle catalog snapshot in Redis: {e}")
+
+    @classmethod
+    def flatten_car_features(cls, car_features_list: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Flatten car-features.json into one row per (Make, Model, Year) with the
+        enrichment columns; later duplicates win, as with a dict keyed on the triple.
+        """
+        records = []
+        for item in car_features_list:
+            features = item.get("features") or {}
+            fuel = features.get("fuelEconomy") or {}
+            engine = features.get("engine") or {}
+            perf = features.get("performance") or {}
+            drivetrain = features.get("drivetrain") or {}
+            records.append((
+                item.get("make"), item.get("model"), item.get("year"),
+                fuel.get("CO2Emissions"), fuel.get("cityMPG"),
+                engine.get("horsepower"), engine.get("torqueFtLBS"), engine.get("size"),
+                perf.get("ZeroTo60MPH"), drivetrain.get("type"),
+            ))
+        flat = pd.DataFrame.from_records(records, columns=[*cls.ENRICHMENT_KEYS, *cls.ENRICHMENT_COLUMNS])
+        return flat.drop_duplicates(subset=list(cls.ENRICHMENT_KEYS), keep="last")
+
+    @classmethod
+    def enrich_vehicle_features(cls, df: pd.DataFrame, car_features: pd.DataFrame) -> pd.DataFrame:
+        """
+        Left-join the flattened car features onto the catalog on (Make, Model, Year).
+        Unmatched vehicles get None in every enrichment column; row order is preserved.
+        """
+        df = df.drop(columns=[c for c in cls.ENRICHMENT_COLUMNS if c in df.columns])
+        if df.empty or not all(k in df.columns for k in cls.ENRICHMENT_KEYS):
+            for col in cls.ENRICHMENT_COLUMNS:
+                df[col] = None
             return df
 
-    def get_vehicle_by_id(self, vehicle_id: int) -> Optional[Dict[str, Any]]:
-        return self._vehicle_lookup.get(int(vehicle_id))
+        car_features = car_features.copy()
+        for key in cls.ENRICHMENT_KEYS:
+            if car_features[key].dtype != df[key].dtype:
+                try:
+                    car_features[key] = car_features[key].astype(df[key].dtype)
+                except (TypeError, ValueError):
+                    car_features[key] = car_features[key].astype(object)
+                    df[key] = df[key].astype(object)
+
+        enriched = df.merge(car_features, on=list(cls.ENRICHMENT_KEYS), how="left", sort=False)
+        enriched.index = df.index
+        for col in cls.ENRICHMENT_COLUMNS:
+            values = enriched[col].astype(object)
+            enriched[col] = values.where(values.notna(), None)
+        return enriched
 
     @staticmethod
-    def extract_vehicle_features(row: pd.Series | Dict[str, Any]) -> Dict[str, str]:
-        getv = row.get if isinstance(row, dict) else row.get
-        return {
-            "Make": str(getv("Make", "")),
-            "Model": str(getv("Model", "")),
-            "Year": str(getv("Year", "")),
-            "Price": str(getv("Price", "")),
-            "Mileage": str(getv("Mileage", "")),
-            "Color": str(getv("Color", "")),
-            "FuelType": str(getv("FuelType", "")),
-            "Transmission": str(getv("Transmission", "")),
-            "Status": str(getv("Status", "")),
-            "CO2Emissions": str(getv("CO2Emissions", "")),
-            "CityMPG": str(getv("CityMPG", "")),
-            "Horsepower": str(getv("Horsepower", "")),
-            "TorqueFtLbs": str(getv("TorqueFtLbs", "")),
-            "EngineSize": str(getv("EngineSize", "")),
-            "ZeroTo60MPH": str(getv("ZeroTo60MPH", "")),
-            "DrivetrainType": str(getv("DrivetrainType", "")),
-        }
\ No newline at end of file
+    def _build_lookup(df: pd.DataFrame) -> VehicleStore:
+        if "Id" not in df.columns:
+            df = pd.DataFrame()
+        return VehicleStore(df)
+
+    @property
+    def vehicle_ids(self) -> np.ndarray:
+        """Sorted IDs of the loaded catalog (empty until it is loaded)."""
+        return self._vehicle_store.ids
+
+    def get_vehicle_by_id(self, vehicle_id: int) -> Optional[VehicleRow]:
+        return self._vehicle_store.get(int(vehicle_id))
+
+    @staticmethod
+    def extract_vehicle_features(row: pd.Series | Mapping[str, Any]) -> Dict[str, str]:
+        if isinstance(row, VehicleRow):
+            return row.features()
+        return render_features(row.get)
\ No newline at end of file
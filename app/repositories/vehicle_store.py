@@ -0,0 +1,220 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FEATURE_FIELDS = ("Make", "Model", "Year", "Price", "Mileage", "Color", "FuelType", "Transmission",
+                  "Status", "CO2Emissions", "CityMPG", "Horsepower", "TorqueFtLbs", "EngineSize",
+                  "ZeroTo60MPH", "DrivetrainType")
+
+
+def render_features(get) -> Dict[str, str]:
+    """The response `features` block: every FEATURE_FIELDS value as str, "" when missing."""
+    return {field: str(get(field, "")) for field in FEATURE_FIELDS}
+
+
+class VehicleRow(Mapping):
+    """
+    Read-only view of one catalog row; values are decoded from the store on access.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "VehicleStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, column: str) -> Any:
+        return self._store.value(column, self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.columns)
+
+    def __len__(self) -> int:
+        return len(self._store.columns)
+
+    def features(self) -> Dict[str, str]:
+        return self._store.features(self._row)
+
+
+class VehicleStore(Mapping):
+    """
+    Struct-of-arrays catalog: numeric columns stay NumPy arrays, everything else is
+    factorized into int32 codes over its distinct values, and vehicles are found by
+    binary search over the sorted IDs. The `features` payload of every vehicle is
+    rendered once into an (N, len(FEATURE_FIELDS)) array of shared strings.
+
+    `apply` patches changed vehicles and appends new ones in place; row arrays grow by
+    doubling, so only the touched rows are written.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns: List[str] = [str(c) for c in df.columns]
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._coded: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        n = len(df)
+        ids = df["Id"].astype(np.int64).to_numpy() if "Id" in df.columns else np.empty(0, dtype=np.int64)
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted_ids = ids[self._order]
+
+        rendered: Dict[str, np.ndarray] = {}
+        for col in self.columns:
+            series = df[col]
+            numeric = series.dtype.kind in "biuf"
+            codes, uniques = pd.factorize(series)
+            uniques = uniques.tolist()
+            if numeric:
+                # Owned copy: `apply` writes in place, and the frame's buffers may be shared or read-only.
+                self._numeric[col] = np.array(series.to_numpy(), copy=True)
+            else:
+                values = np.empty(len(uniques) + 1, dtype=object)
+                values[:len(uniques)] = uniques
+                values[-1] = None
+                self._coded[col] = (codes.astype(np.int32), values)
+            if col in FEATURE_FIELDS:
+                labels = np.array([str(v) for v in uniques] + ["nan" if numeric else "None"], dtype=object)
+                rendered[col] = labels[codes]
+
+        self._features = np.empty((n, len(FEATURE_FIELDS)), dtype=object)
+        for j, field in enumerate(FEATURE_FIELDS):
+            self._features[:, j] = rendered.get(field, "")
+        self._size = n
+        self._code_of: Dict[str, Dict[Any, int]] = {}
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Vehicle IDs, sorted."""
+        return self._sorted_ids
+
+    @property
+    def has_ids(self) -> bool:
+        return "Id" in self.columns
+
+    def apply(self, rows: pd.DataFrame) -> None:
+        """
+        Write whole catalog rows (with "Id") into the store: known vehicles are patched
+        at their position, new ones appended and merged into the sorted ID index.
+        """
+        if rows.empty or "Id" not in rows.columns or not self.has_ids:
+            return
+        rows = rows.drop_duplicates(subset=["Id"], keep="last")
+        ids = rows["Id"].astype(np.int64).to_numpy()
+        positions = np.array([-1 if (row := self._position(int(v))) is None else row for v in ids.tolist()],
+                             dtype=np.int64)
+
+        new = positions < 0
+        if new.any():
+            count = int(new.sum())
+            self._reserve(self._size + count)
+            positions[new] = np.arange(self._size, self._size + count)
+            self._size += count
+            new_order = np.argsort(ids[new], kind="stable")
+            new_ids, new_positions = ids[new][new_order], positions[new][new_order]
+            at = np.searchsorted(self._sorted_ids, new_ids)
+            self._sorted_ids = np.insert(self._sorted_ids, at, new_ids)
+            self._order = np.insert(self._order, at, new_positions)
+
+        for col in self.columns:
+            values = rows[col].tolist() if col in rows.columns else [None] * len(rows)
+            for row, value in zip(positions.tolist(), values):
+                self._write(col, row, value)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._features)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+
+        def grown(array: np.ndarray, fill) -> np.ndarray:
+            out = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+            out[:self._size] = array[:self._size]
+            return out
+
+        for col, array in self._numeric.items():
+            self._numeric[col] = grown(array, 0)
+        for col, (codes, values) in self._coded.items():
+            self._coded[col] = (grown(codes, -1), values)
+        self._features = grown(self._features, "")
+
+    def _write(self, column: str, row: int, value: Any) -> None:
+        missing = value is None or (isinstance(value, float) and np.isnan(value))
+        if column in self._numeric and not (missing or isinstance(value, (int, float, np.number))):
+            self._to_coded(column)
+
+        if column in self._numeric:
+            array = self._numeric[column]
+            if array.dtype.kind in "biu" and (missing or isinstance(value, float)):
+                array = self._numeric[column] = array.astype(np.float64)
+            array[row] = np.nan if missing else value
+            label = "nan" if missing else str(array[row].item())
+        else:
+            codes, values = self._coded[column]
+            if missing:
+                codes[row] = -1
+                label = "None"
+            else:
+                code_of = self._codes(column)
+                code = code_of.get(value)
+                if code is None:
+                    code = code_of[value] = len(values) - 1
+                    tail = np.empty(2, dtype=object)
+                    tail[0] = value
+                    values = np.concatenate([values[:-1], tail])
+                    self._coded[column] = (codes, values)
+                codes[row] = code
+                label = str(value)
+
+        if column in FEATURE_FIELDS:
+            self._features[row, FEATURE_FIELDS.index(column)] = label
+
+    def _codes(self, column: str) -> Dict[Any, int]:
+        if column not in self._code_of:
+            self._code_of[column] = {value: i for i, value in enumerate(self._coded[column][1][:-1].tolist())}
+        return self._code_of[column]
+
+    def _to_coded(self, column: str) -> None:
+        array = self._numeric.pop(column)
+        codes, uniques = pd.factorize(pd.Series(array[:self._size]))
+        values = np.empty(len(uniques) + 1, dtype=object)
+        values[:len(uniques)] = uniques.tolist()
+        values[-1] = None
+        out = np.full(len(array), -1, dtype=np.int32)
+        out[:self._size] = codes
+        self._coded[column] = (out, values)
+
+    def _position(self, vehicle_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self._sorted_ids, vehicle_id))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == vehicle_id:
+            return int(self._order[i])
+        return None
+
+    def get(self, vehicle_id: int, default=None) -> Optional[VehicleRow]:
+        row = self._position(int(vehicle_id))
+        return default if row is None else VehicleRow(self, row)
+
+    def __getitem__(self, vehicle_id: int) -> VehicleRow:
+        row = self.get(vehicle_id)
+        if row is None:
+            raise KeyError(vehicle_id)
+        return row
+
+    def __contains__(self, vehicle_id) -> bool:
+        return self._position(int(vehicle_id)) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._sorted_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def value(self, column: str, row: int) -> Any:
+        if column in self._numeric:
+            return self._numeric[column][row].item()
+        if column in self._coded:
+            codes, values = self._coded[column]
+            return values[codes[row]]
+        raise KeyError(column)
+
+    def features(self, row: int) -> Dict[str, str]:
+        return dict(zip(FEATURE_FIELDS, self._features[row].tolist()))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response, status
 from app.db import DatabaseManager
 from config.app_config import settings
 from fastapi import Depends
@@ -7,15 +7,17 @@ from app.dependencies.dependency_container import DependencyContainer
 router = APIRouter()
 
 @router.get("/health")
-async def health(request: Request):
+async def health(request: Request, response: Response):
     """
-    Health check for database, ML service, and orchestrator readiness
+    Health check for database, ML service, and orchestrator readiness.
+    Responds 503 until every registered model is resident so load balancers skip cold instances.
     """
     container = getattr(request.app.state, 'container', None)
     db_manager: DatabaseManager = container.db_manager if container else None
 
     orchestrator_ready = False
-    ml_ready = False
+    models_ready = False
+    models = {}
 
     if container:
         try:
@@ -24,15 +26,22 @@ async def health(request: Request):
             pass
 
         try:
-            ml_service = getattr(container, "ml_service", None)
-            ml_ready = getattr(ml_service, "models_loaded", False) if ml_service else False
+            model_serving = container.model_serving_service
+            models_ready = model_serving.is_ready
+            models = {name: name in model_serving.models for name in model_serving.model_registry}
         except Exception:
             pass
 
+    ready = bool(container) and orchestrator_ready and models_ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
     return {
         "db": db_manager.pool is not None if db_manager else False,
-        "ml_models_loaded": ml_ready,
+        "ml_models_loaded": models_ready,
+        "models": models,
         "orchestrator_ready": orchestrator_ready,
+        "ready": ready,
         "version": request.app.version,
-        "status": "ready" if container else "initializing"
+        "status": "ready" if ready else "initializing"
     }
@@ -1,17 +1,27 @@
-from typing import List
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Path, Request
+from fastapi.responses import StreamingResponse
 from app.middleware.rate_limit_middleware import limiter
-from app.schemas.schemas import RecommendationResponse, SimilarVehiclesResponse
+from app.schemas.schemas import (
+    RecommendationResponse,
+    SimilarVehiclesResponse,
+    ModelReloadResponse,
+    BatchRecommendationRequest,
+    WeightedSimilarRequest,
+)
 from app.interfaces.recommendation_interfaces import IRecommendationOrchestrator
 from app.exceptions.recommendation_exceptions import (
     UserNotFoundError,
     RecommendationServiceError,
     InsufficientDataError,
+    InvalidWeightProfileError,
     ModelNotAvailableError,
     VehicleNotFoundError,
 )
 from app.security.auth_middleware import AuthService
+from app.services.model_serving_service import ModelServingService
 from config.app_config import settings
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,6 +46,16 @@ def get_orchestrator(request: Request) -> IRecommendationOrchestrator:
     return container.orchestrator
 
 
+def get_model_serving(request: Request) -> ModelServingService:
+    container = getattr(request.app.state, 'container', None)
+    if container is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is initializing. Please try again in a moment."
+        )
+    return container.model_serving_service
+
+
 @router.get("/user/{user_id}", response_model=RecommendationResponse)
 @limiter.limit("10/minute")
 async def get_recommendations(
@@ -64,18 +84,65 @@ async def get_recommendations(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/batch")
+@limiter.limit("30/minute")
+async def get_batch_recommendations(
+    request: Request,
+    payload: BatchRecommendationRequest,
+    current_user: dict = Depends(auth_service.verify_token),
+    orchestrator: IRecommendationOrchestrator = Depends(get_orchestrator),
+):
+    """
+    Hybrid recommendations for many users, streamed as NDJSON (one BatchRecommendationItem per line).
+    """
+    if not current_user.get("is_admin", False):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    async def stream():
+        try:
+            async for item in orchestrator.get_batch_recommendations(payload.user_ids, payload.top_n):
+                yield item.model_dump_json() + "\n"
+        except RecommendationServiceError as e:
+            logger.error(f"Batch recommendation stream aborted: {e}")
+            yield json.dumps({"error": {"code": e.error_code, "message": e.message}}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/similar/{vehicle_id}", response_model=SimilarVehiclesResponse)
 @limiter.limit("10/minute")
 async def get_similar_vehicles(
     request: Request,
     vehicle_id: int,
-    top_n: int = Query(default=5, ge=1, le=50),
+    top_n: int = Query(default=5, ge=1, le=settings.MAX_SIMILAR_VEHICLES),
+    profile: Optional[str] = Query(default=None, description="Named feature-weight profile (SIMILARITY_WEIGHT_PROFILES)"),
     orchestrator: IRecommendationOrchestrator = Depends(get_orchestrator),
 ):
+    return await _similar_vehicles(orchestrator, vehicle_id, top_n, profile=profile)
+
+
+@router.post("/similar/{vehicle_id}", response_model=SimilarVehiclesResponse)
+@limiter.limit("10/minute")
+async def get_weighted_similar_vehicles(
+    request: Request,
+    vehicle_id: int,
+    payload: WeightedSimilarRequest,
+    orchestrator: IRecommendationOrchestrator = Depends(get_orchestrator),
+):
+    """
+    Similar vehicles under per-request feature weights, layered over the optional named profile.
+    """
+    return await _similar_vehicles(orchestrator, vehicle_id, payload.top_n, profile=payload.profile, weights=payload.weights)
+
+
+async def _similar_vehicles(orchestrator: IRecommendationOrchestrator, vehicle_id: int, top_n: int,
+                            profile: Optional[str] = None, weights: Optional[Dict[str, float]] = None):
     try:
-        return await orchestrator.get_similar_vehicles(vehicle_id, top_n)
+        return await orchestrator.get_similar_vehicles(vehicle_id, top_n, profile=profile, weights=weights)
     except VehicleNotFoundError:
         raise HTTPException(status_code=404, detail="Vehicle not found")
+    except InvalidWeightProfileError as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except ModelNotAvailableError as e:
         raise HTTPException(status_code=503, detail=e.message)
     except RecommendationServiceError as e:
@@ -84,3 +151,34 @@ async def get_similar_vehicles(
     except Exception as e:
         logger.exception(f"Unhandled error in similar vehicles endpoint: {e}")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+
+@router.post("/admin/models/reload", response_model=ModelReloadResponse)
+async def reload_models(
+    model_name: Optional[str] = Query(default=None),
+    current_user: dict = Depends(auth_service.verify_token),
+    model_serving: ModelServingService = Depends(get_model_serving),
+):
+    """
+    Hot-swap models to the latest published on-disk version without a restart.
+    In-flight requests finish on the version they started with.
+    """
+    if not current_user.get("is_admin", False):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    names = [model_name] if model_name else list(model_serving.model_registry)
+    if any(name not in model_serving.model_registry for name in names):
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+
+    previous = dict(model_serving.versions)
+    try:
+        for name in names:
+            await model_serving.reload_model(name)
+    except ValueError as e:
+        logger.error(f"Model reload failed: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return ModelReloadResponse(
+        versions={name: model_serving.versions.get(name) for name in model_serving.model_registry},
+        reloaded=[name for name in names if model_serving.versions.get(name) != previous.get(name)],
+    )
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 from datetime import datetime
+from config.app_config import settings
 
 class VehicleRecommendation(BaseModel):
     vehicle_id: int
@@ -11,6 +12,17 @@ class RecommendationResponse(BaseModel):
     recommendations: List[VehicleRecommendation]
     model_type: str 
 
+MAX_BATCH_USERS = 5000
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_USERS)
+    top_n: int = Field(default=5, ge=1, le=50)
+
+class WeightedSimilarRequest(BaseModel):
+    top_n: int = Field(default=5, ge=1, le=settings.MAX_SIMILAR_VEHICLES)
+    profile: Optional[str] = None
+    weights: Dict[str, float] = Field(default_factory=dict)
+
 class SimilarVehicle(BaseModel):
     vehicle_id: int
     similarity_score: float
@@ -21,11 +33,21 @@ class SimilarVehiclesResponse(BaseModel):
     similar_vehicles: List[SimilarVehicle]
     source: str
 
+class ModelReloadResponse(BaseModel):
+    versions: Dict[str, Optional[str]]
+    reloaded: List[str]
+
 class ErrorDetail(BaseModel):
     code: str
     message: str
     field: Optional[str] = None
 
+class BatchRecommendationItem(BaseModel):
+    user_id: int
+    recommendations: List[VehicleRecommendation] = []
+    model_type: Optional[str] = None
+    error: Optional[ErrorDetail] = None
+
 class ErrorResponse(BaseModel):
     error: ErrorDetail
     request_id: str
@@ -1,6 +1,6 @@
 import json
 from redis.asyncio import Redis
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 from app.schemas.schemas import RecommendationResponse
 class CachingService:
     """
@@ -48,6 +48,20 @@ class CachingService:
         key = self._key_recommendations(user_id, top_n, model_type)
         await self.redis.setex(key, ttl or self.default_ttl, recommendations.json())
 
+    async def set_many_cached_recommendations(self, items: Iterable[Tuple[int, str, RecommendationResponse]], top_n: int, ttl: Optional[int] = None) -> int:
+        """
+        `set_cached_recommendations` for many (user_id, model_type, recommendations) in one
+        pipelined round trip. Returns the number of entries written.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        count = 0
+        for user_id, model_type, recommendations in items:
+            pipe.setex(self._key_recommendations(user_id, top_n, model_type), ttl or self.default_ttl, recommendations.json())
+            count += 1
+        if count:
+            await pipe.execute()
+        return count
+
     async def invalidate_user_cache(self, user_id: int) -> int:
         """
         Invalidate all recommendation keys for a user. Returns number of deleted keys.
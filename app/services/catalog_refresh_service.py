@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, TYPE_CHECKING
+
+from app.observability.metrics import CATALOG_CHANGES_APPLIED, CATALOG_REFRESH_LAG
+from app.repositories.vehicle_repository import VehicleRepository
+from app.services.caching_service import CachingService
+
+if TYPE_CHECKING:
+    from app.services.ml_service import MLModelService
+
+logger = logging.getLogger(__name__)
+
+class CatalogRefresher:
+    """
+    Polls the Vehicles table for rows changed since the last watermark, patches them into
+    the repository's in-memory catalog and drops the affected `rec:vehicle:*` cache entries,
+    so price, listing and status changes show up without a restart or a full reload.
+    With an `ml_service`, changed vehicles are also folded into the similarity models.
+    """
+
+    def __init__(self, vehicle_repo: VehicleRepository, caching_service: CachingService, interval: float = 30.0,
+                 ml_service: Optional["MLModelService"] = None):
+        self.vehicle_repo = vehicle_repo
+        self.cache = caching_service
+        self.ml_service = ml_service
+        self.interval = interval
+        self.last_refresh: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_once(self) -> List[int]:
+        """Apply one batch of changes and invalidate their caches. Returns the changed IDs."""
+        started = time.time()
+        changed = await self.vehicle_repo.refresh_changes()
+        if changed and self.ml_service is not None:
+            try:
+                await self.ml_service.fold_in_vehicles(changed)
+            except Exception as e:
+                logger.warning(f"Failed to fold changed vehicles into similarity models: {e}")
+        for vehicle_id in changed:
+            try:
+                await self.cache.invalidate_vehicle_cache(vehicle_id)
+            except Exception as e:
+                logger.warning(f"Failed to invalidate cache for vehicle {vehicle_id}: {e}")
+        if changed:
+            CATALOG_CHANGES_APPLIED.inc(len(changed))
+            logger.info(f"Catalog refresh applied {len(changed)} changed vehicles")
+        self.last_refresh = started
+        return changed
+
+    async def run(self) -> None:
+        self.last_refresh = time.time()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                logger.warning(f"Catalog refresh failed: {e}")
+            CATALOG_REFRESH_LAG.set(time.time() - self.last_refresh)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
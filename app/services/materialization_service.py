@@ -0,0 +1,100 @@
+import logging
+import time
+from typing import List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from app.repositories.user_repository import UserRepository
+from app.schemas.schemas import RecommendationResponse
+from app.services.caching_service import CachingService
+from app.services.model_serving_service import ModelServingService
+
+if TYPE_CHECKING:
+    from app.recommenders.hybrid_based_recommender import HybridRecommender
+
+logger = logging.getLogger(__name__)
+
+class RecommendationMaterializer:
+    """
+    Precomputes hybrid recommendations for every user known to the collaborative model
+    and stores them through the cached-recommendations keys, under a model type derived
+    from the served model versions and the user's interaction stamp (count and max Id).
+    A retrain or any new interaction of the user changes the key, so stale lists are
+    never served and old entries simply expire.
+
+    Lists are computed for exactly `top_n` (by default the route's default) through the
+    same batch path and candidate cap (top_n * 3) as live requests, and only served for
+    that `top_n`, so a hit always equals the live result.
+    """
+
+    MODELS = ("collaborative", "user_similarity")
+
+    def __init__(self, caching_service: CachingService, model_serving: ModelServingService,
+                 user_repo: UserRepository, top_n: int = 5, batch_size: int = 512, ttl: int = 86400):
+        self.cache = caching_service
+        self.model_serving = model_serving
+        self.user_repo = user_repo
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.ttl = ttl
+
+    def namespace(self) -> Optional[str]:
+        versions = [self.model_serving.versions.get(name) for name in self.MODELS]
+        if any(v is None for v in versions):
+            return None
+        return "+".join(versions)
+
+    @staticmethod
+    def model_type(namespace: str, stamp: str) -> str:
+        return f"hybrid:mat:{namespace}:{stamp}"
+
+    async def get(self, user_id: int, top_n: int, stamp: str) -> Optional[RecommendationResponse]:
+        """
+        Materialized recommendations for the live model versions and the user's current
+        interaction `stamp` (see UserRepository.get_interaction_stamps), or None on a miss.
+        """
+        namespace = self.namespace()
+        if namespace is None or top_n != self.top_n:
+            return None
+        try:
+            cached = await self.cache.get_cached_recommendations(user_id, self.top_n, self.model_type(namespace, stamp))
+        except Exception as e:
+            logger.warning(f"Materialized recommendation lookup failed for user {user_id}: {e}")
+            return None
+        return cached
+
+    async def materialize(self, recommender: "HybridRecommender") -> int:
+        """
+        Compute and store top-N for all users in vectorized batches. Returns users written.
+        """
+        namespace = self.namespace()
+        if namespace is None:
+            logger.warning("Skipping materialization: models are not loaded")
+            return 0
+
+        user_ids = await self._known_users()
+        start = time.time()
+        written = 0
+        for offset in range(0, len(user_ids), self.batch_size):
+            chunk = user_ids[offset:offset + self.batch_size]
+            # Stamped before computing: an interaction landing meanwhile makes the entry a miss.
+            stamps = await self.user_repo.get_interaction_stamps(chunk)
+            results = [
+                (user_id, self.model_type(namespace, stamps[user_id]), response)
+                async for user_id, response, error in recommender.get_batch_recommendations(chunk, self.top_n)
+                if error is None and user_id in stamps
+            ]
+            written += await self.cache.set_many_cached_recommendations(results, self.top_n, ttl=self.ttl)
+
+        logger.info(f"Materialized recommendations for {written}/{len(user_ids)} users "
+                    f"under '{namespace}' in {time.time() - start:.1f}s")
+        return written
+
+    async def _known_users(self) -> List[int]:
+        async with self.model_serving.use_model("collaborative") as collaborative_model:
+            if not collaborative_model:
+                return []
+            user_ids = collaborative_model.get("user_ids")
+            if user_ids is None:
+                return []
+            return np.asarray(user_ids).tolist()
@@ -1,5 +1,9 @@
 from __future__ import annotations
-from typing import List, Dict, Tuple
+import asyncio
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 import warnings
 
 import numpy as np
@@ -11,28 +15,54 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 
 from config.ml_config import MLConfig
 from app.models.model_persistance import (
+    SimilarityModel,
     save_collaborative_model,
     save_content_model,
     save_user_content_model,
 )
+from app.models.als import fit_implicit_als, refine_implicit_als
+from app.models.ann_index import IVFIndex
+from app.models.feature_store import FeatureEncoder, FeatureSet, fingerprint, load_feature_set, save_feature_set
+from app.models import model_persistance
+from app.models.topk_index import NeighborList, TopKSimilarityIndex
+from app.models.weighted_similarity import WeightedFeatureIndex
 from app.repositories.user_repository import UserRepository
 from app.repositories.vehicle_repository import VehicleRepository
 from app.services.model_serving_service import ModelServingService
 
+CATEGORICAL_FEATURES = ["Make", "Model", "Color", "FuelType", "Transmission", "Status", "DrivetrainType"]
+NUMERIC_FEATURES = ["Year", "Price", "Mileage", "CO2Emissions", "CityMPG",
+                    "Horsepower", "TorqueFtLbs", "EngineSize", "ZeroTo60MPH"]
+MODEL_NAMES = ("vehicle_similarity", "user_similarity", "collaborative")
+
 class MLModelService():
     """
     Handles feature prep, model training, inference, and model persistence.
+
+    `prepare_features` is the shared feature-store stage: it encodes the catalog and
+    builds the sparse interaction matrix once per data fingerprint, persists them next
+    to the models, and every trainer accepts the resulting FeatureSet. The fitted encoder
+    travels with it, so `fold_in_vehicles` can embed new listings without retraining.
     """
+    FOLD_IN_MODELS = ("vehicle_similarity", "user_similarity")
+
     def __init__(self, user_repo: UserRepository, vehicle_repo: VehicleRepository,
-                 model_serving: ModelServingService, config: MLConfig = MLConfig()):
+                 model_serving: ModelServingService, config: MLConfig = MLConfig(), prune_versions: bool = True):
         self.user_repo = user_repo
+        # Off in the training worker: only the serving process knows which versions are leased.
+        self.prune_versions = prune_versions
         self.vehicle_repo = vehicle_repo
         self.model_serving = model_serving
         self.config = config
-        self.vehicle_similarity_topk: Dict[int, List[Tuple[int, float]]] | None = None
-        self.user_similarity_topk: Dict[int, List[Tuple[int, float]]] | None = None
+        self.vehicle_similarity_topk: SimilarityModel | None = None
+        self.user_similarity_topk: SimilarityModel | None = None
         self.collaborative_model: Dict[str, object] | None = None
         self.models_loaded: bool = False
+        self.data_watermark: Dict[str, object] = {}
+        self.feature_set: Optional[FeatureSet] = None
+        self._fold_in_states: Dict[str, Dict[str, object]] = {}
+        # Serializes fold-ins: they update the shared state in place and patch the live model.
+        self._fold_in_lock = asyncio.Lock()
 
     async def prepare_data(self):
         """
@@ -42,98 +72,402 @@ class MLModelService():
         """
         interactions_raw = await self.user_repo.load_interactions_summary()
         vehicle_df = await self.vehicle_repo.load_vehicle_features()
+        self.data_watermark = self._data_watermark(interactions_raw, vehicle_df)
+        return self._aggregate_interactions(interactions_raw), self._encode_features(vehicle_df)[0]
+
+    async def prepare_features(self) -> FeatureSet:
+        """
+        The encoded catalog and interaction matrix for the current data, reused from
+        memory or from the feature store when the data fingerprint is unchanged.
+        """
+        interactions_raw = await self.user_repo.load_interactions_summary()
+        vehicle_df = await self.vehicle_repo.load_vehicle_features()
+        self.data_watermark = self._data_watermark(interactions_raw, vehicle_df)
+
+        catalog_watermark = getattr(self.vehicle_repo, "catalog_watermark", None)
+        key = fingerprint(
+            self.data_watermark,
+            catalog_watermark if isinstance(catalog_watermark, dict) else None,
+            self._feature_weights(),
+            CATEGORICAL_FEATURES,
+            NUMERIC_FEATURES,
+        )
+        # Interaction weights are not part of the key: the store keeps per-type counts.
+        weights = self.config.interaction_weights
+        if self.feature_set is not None and self.feature_set.fingerprint == key:
+            self.feature_set = self.feature_set.reweighted(weights)
+            return self.feature_set
+
+        feature_set = await asyncio.to_thread(load_feature_set, key, weights)
+        if feature_set is None:
+            features_df, encoder = self._encode_features(vehicle_df)
+            encoder.feature_weights = self._feature_weights()
+            feature_set = FeatureSet.build(key, self.data_watermark, features_df, CATEGORICAL_FEATURES + NUMERIC_FEATURES,
+                                           self._typed_interactions(interactions_raw), weights, encoder)
+            try:
+                await asyncio.to_thread(save_feature_set, feature_set)
+            except OSError as e:
+                print(f"[WARN] Failed to persist feature set {key}: {e}")
+        self.feature_set = feature_set
+        return feature_set
+
+    def _feature_weights(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "vehicle_similarity": dict(self.config.vehicle_feature_weights),
+            "user_similarity": dict(self.config.user_feature_weights),
+        }
+
+    @staticmethod
+    def _data_watermark(interactions_raw: pd.DataFrame, vehicle_df: pd.DataFrame) -> Dict[str, object]:
+        return {
+            "interaction_events": int(interactions_raw["count"].sum()) if not interactions_raw.empty else 0,
+            "interaction_rows": int(len(interactions_raw)),
+            "vehicles": int(len(vehicle_df)),
+            "max_vehicle_id": int(vehicle_df["Id"].max()) if len(vehicle_df) and "Id" in vehicle_df.columns else None,
+        }
+
+    @staticmethod
+    def _typed_interactions(interactions_raw: pd.DataFrame) -> pd.DataFrame:
+        if interactions_raw.empty:
+            return pd.DataFrame({"user_id": [], "vehicle_id": [], "interaction_type": [], "count": []})
+        return interactions_raw[["user_id", "vehicle_id", "interaction_type", "count"]]
+
+    def _aggregate_interactions(self, interactions_raw: pd.DataFrame) -> pd.DataFrame:
+        if interactions_raw.empty:
+            return pd.DataFrame(columns=["user_id", "vehicle_id", "weighted_count"])
+        weights = self.config.interaction_weights
+        interactions_raw = interactions_raw.copy()
+        interactions_raw["weight"] = interactions_raw["interaction_type"].map(weights).fillna(0.0)
+        interactions_raw["weighted"] = interactions_raw["count"].astype(float) * interactions_raw["weight"].astype(float)
+        return (
+            interactions_raw.groupby(["user_id", "vehicle_id"], as_index=False)["weighted"].sum()
+            .rename(columns={"weighted": "weighted_count"})
+        )
+
+    @staticmethod
+    def _encode_features(vehicle_df: pd.DataFrame) -> Tuple[pd.DataFrame, FeatureEncoder]:
+        """Encode the catalog and return it with the fitted encoder (vocabularies, means, scales)."""
         features_df = vehicle_df.copy()
+        encoder = FeatureEncoder(categorical={}, means={}, scales={})
 
         if "Id" not in features_df.columns:
             features_df = features_df.reset_index()
 
-        weights = self.config.interaction_weights
-        if not interactions_raw.empty:
-            interactions_raw["weight"] = interactions_raw["interaction_type"].map(weights).fillna(0.0)
-            interactions_raw["weighted"] = interactions_raw["count"].astype(float) * interactions_raw["weight"].astype(float)
-            interactions_df = (
-                interactions_raw.groupby(["user_id", "vehicle_id"], as_index=False)["weighted"].sum()
-                .rename(columns={"weighted": "weighted_count"})
-            )
-        else:
-            interactions_df = pd.DataFrame(columns=["user_id", "vehicle_id", "weighted_count"])
-
-        cat_columns = ["Make", "Model", "Color", "FuelType", "Transmission", "Status", "DrivetrainType"]
-        for col in cat_columns:
+        for col in CATEGORICAL_FEATURES:
             if col not in features_df.columns:
                 features_df[col] = ""
             le = LabelEncoder()
             features_df[col] = le.fit_transform(features_df[col].astype(str))
+            encoder.categorical[col] = [str(c) for c in le.classes_]
 
         if "EngineSize" in features_df.columns:
             features_df["EngineSize"] = features_df["EngineSize"].astype(str).str.replace("L", "", regex=False)
             features_df["EngineSize"] = pd.to_numeric(features_df["EngineSize"], errors="coerce")
 
-        num_columns = ["Year", "Price", "Mileage", "CO2Emissions", "CityMPG",
-                       "Horsepower", "TorqueFtLbs", "EngineSize", "ZeroTo60MPH"]
-
-        for col in num_columns:
+        for col in NUMERIC_FEATURES:
             if col not in features_df.columns:
                 features_df[col] = np.nan
             features_df[col] = pd.to_numeric(features_df[col], errors="coerce")
             features_df[col] = features_df[col].fillna(features_df[col].mean())
             scaler = StandardScaler()
             features_df[col] = scaler.fit_transform(features_df[[col]])
+            encoder.means[col] = float(scaler.mean_[0])
+            encoder.scales[col] = float(scaler.scale_[0])
 
         if "Id" not in features_df.columns:
             raise ValueError('Expected "Id" column in Vehicles table.')
 
-        return interactions_df, features_df
+        return features_df, encoder
 
-    def _train_content_based_topk(self, features_df: pd.DataFrame, weights: Dict[str, float], top_k: int) -> Dict[int, List[Tuple[int, float]]]:
+    def _train_content_based_topk(self, features_df: pd.DataFrame, weights: Dict[str, float], top_k: int) -> SimilarityModel:
         vehicle_ids = features_df["Id"].values
         drop_cols = [c for c in ["Id", "Vin"] if c in features_df.columns]
-        feature_matrix = features_df.drop(columns=drop_cols).copy()
-
-        for col, w in (weights or {}).items():
-            if col in feature_matrix.columns:
-                feature_matrix[col] = feature_matrix[col] * float(w)
-
-        feature_np = feature_matrix.values
-        sim = cosine_similarity(feature_np).astype(np.float32)
-
-        top_k_similar: Dict[int, List[Tuple[int, float]]] = {}
-        for i, v_id in enumerate(vehicle_ids):
-            sim_scores = sim[i]
-            top_idx = np.argsort(sim_scores)[::-1]
-            top_idx = top_idx[top_idx != i][:top_k]
-            top_ids = vehicle_ids[top_idx]
-            top_vals = sim_scores[top_idx]
-            top_k_similar[int(v_id)] = [(int(oid), float(s)) for oid, s in zip(top_ids, top_vals)]
-        return top_k_similar
-
-    async def train_vehicle_similarity_model(self) -> None:
-        _, features_df = await self.prepare_data()
-        self.vehicle_similarity_topk = self._train_content_based_topk(features_df, self.config.vehicle_feature_weights, top_k=self.config.top_k_similar)
-        save_content_model(self.vehicle_similarity_topk)
+        feature_matrix = features_df.drop(columns=drop_cols)
+        return self._train_topk_from_matrix(vehicle_ids, feature_matrix.values, list(feature_matrix.columns), weights, top_k)
+
+    def _train_topk_from_matrix(self, vehicle_ids: np.ndarray, features: np.ndarray, columns: List[str],
+                                weights: Dict[str, float], top_k: int) -> SimilarityModel:
+        column_weights = np.array([float((weights or {}).get(col, 1.0)) for col in columns], dtype=np.float32)
+        # Weights keep the input precision: float32 from the feature store, float64 for frames.
+        feature_np = np.asarray(features) * column_weights
+
+        # IVF is opt-in: built only to train from it or to serve deep queries with it.
+        attach_ann = self.config.similarity_ann and self.config.similarity_artifact_format != "pickle"
+        ann = None
+        if attach_ann or self.config.similarity_training_mode == "ann":
+            ann = IVFIndex.build(vehicle_ids, feature_np, n_lists=self.config.ann_lists or None,
+                                 n_probe=self.config.ann_probe, random_state=self.config.random_state)
+
+        if self.config.similarity_training_mode == "ann":
+            # Neighbour lists from the IVF lists instead of an exhaustive N x N pass.
+            top_idx, top_vals = ann.topk_table(top_k)
+            vehicle_ids = ann.vehicle_ids
+        elif self.config.similarity_training_mode == "blocked":
+            top_idx, top_vals = self._blocked_topk(feature_np, top_k)
+        else:
+            sim = cosine_similarity(feature_np).astype(np.float32)
+            k = max(0, min(top_k, len(vehicle_ids) - 1))
+            top_idx = np.zeros((len(vehicle_ids), k), dtype=np.int32)
+            top_vals = np.zeros((len(vehicle_ids), k), dtype=np.float32)
+            for i in range(len(vehicle_ids)):
+                sim_scores = sim[i]
+                row_idx = np.argsort(sim_scores)[::-1]
+                row_idx = row_idx[row_idx != i][:k]
+                top_idx[i] = row_idx
+                top_vals[i] = sim_scores[row_idx]
+
+        index = TopKSimilarityIndex.from_topk(vehicle_ids, top_idx, top_vals, score_dtype=self.config.similarity_score_dtype)
+        if self.config.similarity_artifact_format == "pickle":
+            return index.to_dict()
+        if attach_ann:
+            index.ann = ann
+        return index
+
+    def _blocked_topk(self, feature_np: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact cosine top-k without materializing the N x N similarity matrix.
+        Rows are L2-normalized once, then multiplied against the catalog in row blocks;
+        peak memory is roughly similarity_workers x similarity_block_size x N floats.
+
+        Returns (indices, scores), both shaped (N, k), each row sorted by descending score.
+        """
+        normalized = np.ascontiguousarray(feature_np, dtype=np.float32)
+        norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        normalized /= norms
+
+        n_rows = normalized.shape[0]
+        k = max(0, min(top_k, n_rows - 1))
+        top_idx = np.zeros((n_rows, k), dtype=np.int32)
+        top_vals = np.zeros((n_rows, k), dtype=np.float32)
+        if k == 0:
+            return top_idx, top_vals
+
+        block_size = max(1, self.config.similarity_block_size)
+
+        def score_block(start: int) -> None:
+            stop = min(start + block_size, n_rows)
+            sim = normalized[start:stop] @ normalized.T
+            rows = np.arange(stop - start)
+            sim[rows, rows + start] = -np.inf
+
+            part = np.argpartition(sim, -k, axis=1)[:, -k:]
+            part_vals = np.take_along_axis(sim, part, axis=1)
+            order = np.argsort(-part_vals, axis=1, kind="stable")
+
+            top_idx[start:stop] = np.take_along_axis(part, order, axis=1)
+            top_vals[start:stop] = np.take_along_axis(part_vals, order, axis=1)
+
+        starts = range(0, n_rows, block_size)
+        workers = max(1, self.config.similarity_workers)
+        if workers == 1 or n_rows <= block_size:
+            for start in starts:
+                score_block(start)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(score_block, starts))
+
+        return top_idx, top_vals
+
+    @staticmethod
+    def _model_watermark(features: FeatureSet) -> Dict[str, object]:
+        return {**features.watermark, "feature_fingerprint": features.fingerprint}
+
+    async def train_all_models(self, models: Optional[Sequence[str]] = None) -> None:
+        """Train all three models, or just `models`, from a single feature-preparation pass."""
+        models = set(models or MODEL_NAMES)
+        features = await self.prepare_features()
+        if "vehicle_similarity" in models:
+            await self.train_vehicle_similarity_model(features)
+        if "user_similarity" in models:
+            await self.train_user_similarity_model(features)
+        if "collaborative" in models:
+            await self.train_collaborative_model(features)
+
+    async def train_vehicle_similarity_model(self, features: Optional[FeatureSet] = None) -> None:
+        features = features or await self.prepare_features()
+        self.vehicle_similarity_topk = self._train_topk_from_matrix(
+            features.vehicle_ids, features.features, features.feature_columns,
+            self.config.vehicle_feature_weights, top_k=self.config.top_k_similar)
+        if self.config.similarity_query_weighting and isinstance(self.vehicle_similarity_topk, TopKSimilarityIndex):
+            self.vehicle_similarity_topk.weighted = WeightedFeatureIndex(
+                features.vehicle_ids, features.features, features.feature_columns,
+                default_weights=self.config.vehicle_feature_weights)
+        save_content_model(self.vehicle_similarity_topk, watermark=self._model_watermark(features),
+                           protect=self.model_serving.protected_versions("vehicle_similarity"),
+                           prune=self.prune_versions)
         self.models_loaded = True
 
-    async def train_user_similarity_model(self) -> None:
-        _, features_df = await self.prepare_data()
-        self.user_similarity_topk = self._train_content_based_topk(features_df, self.config.user_feature_weights, top_k=self.config.top_k_similar)
-        save_user_content_model(self.user_similarity_topk)
+    async def train_user_similarity_model(self, features: Optional[FeatureSet] = None) -> None:
+        features = features or await self.prepare_features()
+        self.user_similarity_topk = self._train_topk_from_matrix(
+            features.vehicle_ids, features.features, features.feature_columns,
+            self.config.user_feature_weights, top_k=self.config.top_k_similar)
+        save_user_content_model(self.user_similarity_topk, watermark=self._model_watermark(features),
+                                protect=self.model_serving.protected_versions("user_similarity"),
+                                prune=self.prune_versions)
         self.models_loaded = True
 
-    async def train_collaborative_model(self) -> None:
-        interactions_df, _ = await self.prepare_data()
+    async def train_collaborative_model(self, features: Optional[FeatureSet] = None, full_refit: bool = False) -> None:
+        """
+        Fit the collaborative factors. In incremental training mode the previous model is
+        warm-started and only the changed interactions are applied; a full refit runs when
+        `full_refit` is set, on the COLLABORATIVE_FULL_REFIT_HOURS schedule, or as a fallback.
+        """
+        features = features or await self.prepare_features()
 
-        if interactions_df.empty:
+        if features.interactions.shape[0] == 0:
             self.collaborative_model = {
                 "svd": None,
                 "user_features": np.zeros((0, 0), dtype=np.float32),
                 "vehicle_features": np.zeros((0, 0), dtype=np.float32),
-                "interaction_matrix": pd.DataFrame(),
+                "interactions": csr_matrix((0, 0), dtype=np.float64),
+                "user_ids": np.zeros(0, dtype=np.int64),
+                "vehicle_ids": np.zeros(0, dtype=np.int64),
             }
             return
 
-        interaction_matrix: pd.DataFrame = interactions_df.pivot_table(index="user_id", columns="vehicle_id", values="weighted_count", fill_value=0.0)
-        sparse = csr_matrix(interaction_matrix.values)
+        sparse = features.interactions
+        fitted = None
+        if not full_refit and self.config.collaborative_training_mode == "incremental":
+            previous = await self._previous_collaborative_model()
+            if previous is not None:
+                fitted = await asyncio.to_thread(self._refine_collaborative, previous, features)
+
+        if fitted is None:
+            fit = self._fit_als if self.config.collaborative_algorithm == "als" else self._fit_svd
+            fitted = await asyncio.to_thread(fit, sparse)
+            fitted["training"] = "full"
+            fitted["full_refit_at"] = datetime.now(timezone.utc).isoformat()
 
+        self.collaborative_model = {
+            **fitted,
+            "interactions": sparse,
+            "user_ids": features.user_ids,
+            "vehicle_ids": features.item_ids,
+        }
+        save_collaborative_model(self.collaborative_model, watermark=self._model_watermark(features),
+                                 protect=self.model_serving.protected_versions("collaborative"),
+                                 prune=self.prune_versions)
+        self.models_loaded = True
+
+    async def _previous_collaborative_model(self) -> Optional[Dict[str, object]]:
+        if self.collaborative_model is not None:
+            return self.collaborative_model
+        try:
+            return await asyncio.to_thread(model_persistance.load_collaborative_model)
+        except Exception as e:
+            print(f"[WARN] Could not load the previous collaborative model, doing a full refit: {e}")
+            return None
+
+    def _refine_collaborative(self, previous: Dict[str, object], features: FeatureSet) -> Optional[Dict[str, object]]:
+        """
+        Warm-start from the previous factors and re-solve only the users and vehicles whose
+        interactions changed since it was trained. Returns None when a full refit is due:
+        on schedule, after a config change, or when the delta is too large to patch.
+        """
+        algorithm = self.config.collaborative_algorithm
+        full_refit_at = previous.get("full_refit_at")
+        if previous.get("algorithm", "svd") != algorithm or full_refit_at is None:
+            return None
+        age_hours = (datetime.now(timezone.utc) - datetime.fromisoformat(full_refit_at)).total_seconds() / 3600
+        if age_hours >= self.config.collaborative_full_refit_hours:
+            return None
+        if algorithm == "als" and previous.get("als") != self._als_params():
+            return None
+        if algorithm != "als" and previous.get("svd") is None:
+            return None
+
+        users, items, changed = self._interaction_delta(previous, features)
+        if changed > self.config.collaborative_max_delta_fraction * max(features.interactions.nnz, 1):
+            print(f"[TRAIN] {changed} changed interactions exceed the incremental limit, doing a full refit.")
+            return None
+
+        user_features = self._aligned_factors(previous["user_features"], previous["user_ids"], features.user_ids)
+        vehicle_features = self._aligned_factors(previous["vehicle_features"], previous["vehicle_ids"], features.item_ids)
+        print(f"[TRAIN] Incremental collaborative update: {changed} changed interactions, "
+              f"{len(users)} users, {len(items)} vehicles.")
+
+        if algorithm == "als":
+            params = self._als_params()
+            user_features, vehicle_features = refine_implicit_als(
+                features.interactions, user_features, vehicle_features, users, items,
+                regularization=params["regularization"], alpha=params["alpha"],
+                iterations=self.config.collaborative_refine_iterations,
+                cg_steps=self.config.als_cg_steps, workers=self.config.als_workers,
+            )
+            fitted = {"algorithm": "als", "svd": None, "als": params}
+        else:
+            svd = copy.deepcopy(previous["svd"])
+            vehicle_features, user_features = self._refine_svd(
+                svd, features.interactions, user_features, vehicle_features, users, items)
+            fitted = {"algorithm": "svd", "svd": svd}
+
+        return {
+            **fitted,
+            "user_features": user_features,
+            "vehicle_features": vehicle_features,
+            "training": "incremental",
+            "full_refit_at": full_refit_at,
+        }
+
+    @staticmethod
+    def _refine_svd(svd: TruncatedSVD, sparse: csr_matrix, user_features: np.ndarray, vehicle_features: np.ndarray,
+                    users: np.ndarray, items: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One fold-in pass against the fixed singular values: changed vehicles are projected
+        from their interaction columns (v = Σ^-2 (UΣ)^T x), then changed users through the
+        updated vehicles (u = r V). `svd.components_` is updated to match.
+        """
+        sigma2 = np.square(np.asarray(svd.singular_values_, dtype=np.float64))
+        sigma2[sigma2 == 0] = 1.0
+        if len(items):
+            vehicle_features[items] = (sparse[:, items].T @ user_features) / sigma2
+        if len(users):
+            user_features[users] = sparse[users] @ vehicle_features
+        svd.components_ = np.ascontiguousarray(vehicle_features.T)
+        return vehicle_features, user_features
+
+    @staticmethod
+    def _positions(sorted_ids: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """Index of each key in the sorted `sorted_ids`, -1 when absent."""
+        sorted_ids = np.asarray(sorted_ids, dtype=np.int64)
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(sorted_ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, keys), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == keys, pos, -1)
+
+    @classmethod
+    def _aligned_factors(cls, factors, old_ids, new_ids) -> np.ndarray:
+        """Previous factor rows re-indexed to `new_ids`; rows for new IDs start at zero."""
+        factors = np.asarray(factors)
+        aligned = np.zeros((len(new_ids), factors.shape[1]), dtype=factors.dtype)
+        pos = cls._positions(old_ids, new_ids)
+        known = pos >= 0
+        aligned[known] = factors[pos[known]]
+        return aligned
+
+    @classmethod
+    def _interaction_delta(cls, previous: Dict[str, object], features: FeatureSet) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Rows (users) and columns (vehicles) of the new interaction matrix whose weighted
+        counts differ from the ones the previous model was trained on, and how many cells changed.
+        """
+        old = previous["interactions"].tocoo()
+        user_pos = cls._positions(features.user_ids, previous["user_ids"])[old.row]
+        item_pos = cls._positions(features.item_ids, previous["vehicle_ids"])[old.col]
+        keep = (user_pos >= 0) & (item_pos >= 0)
+        aligned = csr_matrix((old.data[keep], (user_pos[keep], item_pos[keep])), shape=features.interactions.shape)
+
+        diff = (features.interactions - aligned).tocoo()
+        changed = diff.data != 0
+        # Cells whose user or vehicle disappeared leave the surviving side changed too.
+        users = np.union1d(diff.row[changed], user_pos[~keep & (user_pos >= 0)])
+        items = np.union1d(diff.col[changed], item_pos[~keep & (item_pos >= 0)])
+        return users.astype(np.int64), items.astype(np.int64), int(np.count_nonzero(changed) + np.count_nonzero(~keep))
+
+    def _fit_svd(self, sparse: csr_matrix) -> Dict[str, object]:
         n_users, n_items = sparse.shape
         max_components = max(1, min(n_users, n_items) - 1)
         n_components = min(self.config.svd_components, max_components)
@@ -144,13 +478,193 @@ class MLModelService():
             warnings.simplefilter("ignore", category=RuntimeWarning)
             user_features = svd.fit_transform(sparse)
 
-        vehicle_features = svd.components_.T
-
-        self.collaborative_model = {
+        return {
+            "algorithm": "svd",
             "svd": svd,
             "user_features": user_features,
+            "vehicle_features": svd.components_.T,
+        }
+
+    def _als_params(self) -> Dict[str, float]:
+        return {
+            "factors": self.config.als_factors,
+            "regularization": self.config.als_regularization,
+            "alpha": self.config.als_alpha,
+        }
+
+    def _fit_als(self, sparse: csr_matrix) -> Dict[str, object]:
+        """Implicit-feedback ALS; confidence grows with the interaction-weighted counts."""
+        params = self._als_params()
+        user_features, vehicle_features = fit_implicit_als(
+            sparse,
+            iterations=self.config.als_iterations,
+            cg_steps=self.config.als_cg_steps,
+            workers=self.config.als_workers,
+            random_state=self.config.random_state,
+            **params,
+        )
+        return {
+            "algorithm": "als",
+            "svd": None,
+            "als": params,
+            "user_features": user_features,
             "vehicle_features": vehicle_features,
-            "interaction_matrix": interaction_matrix,
         }
-        save_collaborative_model(self.collaborative_model)
-        self.models_loaded = True
+
+    async def fold_in_vehicles(self, vehicle_ids: List[int]) -> Dict[str, int]:
+        """
+        Embed new or changed catalog vehicles into the live similarity models without a
+        retrain: each is encoded with the model's persisted encoder and scored against
+        its normalized feature matrix in one mat-vec. The folded-in vehicles get their own
+        neighbour lists, and they are inserted into the existing lists they now rank in.
+        Returns the number of vehicles folded in per model.
+        """
+        rows = []
+        for vehicle_id in dict.fromkeys(int(v) for v in vehicle_ids):
+            row = self.vehicle_repo.get_vehicle_by_id(vehicle_id)
+            if row is not None:
+                rows.append((int(vehicle_id), row))
+        patched: Dict[str, int] = {}
+        if not rows:
+            return patched
+
+        async with self._fold_in_lock:
+            for model_name in self.FOLD_IN_MODELS:
+                version = self.model_serving.versions.get(model_name)
+                model = self.model_serving.models.get(model_name)
+                if model is None:
+                    continue
+                state = await self._fold_in_state(model_name, version)
+                if state is None:
+                    continue
+                updated = await asyncio.to_thread(self._fold_in, state, model, rows, self.config.top_k_similar)
+                if self.model_serving.replace_model(model_name, updated, version):
+                    patched[model_name] = len(rows)
+        return patched
+
+    async def _fold_in_state(self, model_name: str, version: Optional[str]) -> Optional[Dict[str, object]]:
+        """Encoder and normalized, weighted feature matrix matching the served model version."""
+        state = self._fold_in_states.get(model_name)
+        if state is not None and state["version"] == version:
+            return state
+
+        manifest = await asyncio.to_thread(model_persistance.read_manifest, model_name, version) or {}
+        key = (manifest.get("data_watermark") or {}).get("feature_fingerprint")
+        if key is None:
+            return None
+        feature_set = self.feature_set if self.feature_set and self.feature_set.fingerprint == key else None
+        feature_set = feature_set or await asyncio.to_thread(load_feature_set, key)
+        if feature_set is None or feature_set.encoder is None:
+            return None
+
+        weights = feature_set.encoder.weight_vector(model_name)
+        state = {
+            "version": version,
+            "encoder": feature_set.encoder,
+            "weights": weights,
+            "vehicle_ids": np.asarray(feature_set.vehicle_ids, dtype=np.int64),
+            "normalized": self._normalize(feature_set.features * weights),
+        }
+        self._fold_in_states[model_name] = state
+        return state
+
+    @staticmethod
+    def _neighbor_arrays(neighbors) -> Tuple[np.ndarray, np.ndarray]:
+        if neighbors is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if isinstance(neighbors, NeighborList):
+            return neighbors.ids.astype(np.int64), neighbors.scores.astype(np.float32)
+        return (np.array([oid for oid, _ in neighbors], dtype=np.int64),
+                np.array([score for _, score in neighbors], dtype=np.float32))
+
+    @staticmethod
+    def _list_tails(model: SimilarityModel, vehicle_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(length, lowest score) of each vehicle's neighbour list; length -1 if it has none."""
+        if isinstance(model, TopKSimilarityIndex):
+            return model.lists_tail(vehicle_ids)
+        lengths = np.full(len(vehicle_ids), -1, dtype=np.int64)
+        last = np.full(len(vehicle_ids), -np.inf, dtype=np.float32)
+        for i, vehicle_id in enumerate(vehicle_ids.tolist()):
+            neighbors = model.get(vehicle_id)
+            if neighbors is not None:
+                lengths[i] = len(neighbors)
+                last[i] = neighbors[-1][1] if neighbors else -np.inf
+        return lengths, last
+
+    @staticmethod
+    def _listing(model: SimilarityModel, vehicle_ids: np.ndarray) -> List[int]:
+        if isinstance(model, TopKSimilarityIndex):
+            return model.listing(vehicle_ids)
+        targets = set(vehicle_ids.tolist())
+        return [v for v, neighbors in model.items() if any(oid in targets for oid, _ in neighbors)]
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        normalized = np.array(matrix, dtype=np.float32)
+        norms = np.linalg.norm(normalized, axis=-1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        normalized /= norms
+        return normalized
+
+    def _fold_in(self, state: Dict[str, object], model: SimilarityModel, rows: List[Tuple[int, object]], top_k: int) -> SimilarityModel:
+        encoder: FeatureEncoder = state["encoder"]
+        ids = np.array([vehicle_id for vehicle_id, _ in rows], dtype=np.int64)
+        encoded = np.stack([encoder.encode_row(row.get) for _, row in rows])
+        queries = self._normalize(encoded * state["weights"])
+
+        # Replace re-encoded vehicles in place and append new ones, so later fold-ins see them.
+        catalog_ids: np.ndarray = state["vehicle_ids"]
+        existing = np.zeros(len(ids), dtype=bool)
+        if len(catalog_ids):
+            order = np.argsort(catalog_ids, kind="stable")
+            pos = np.minimum(np.searchsorted(catalog_ids[order], ids), len(catalog_ids) - 1)
+            existing = catalog_ids[order[pos]] == ids
+            state["normalized"][order[pos[existing]]] = queries[existing]
+        if (~existing).any():
+            state["normalized"] = np.vstack([state["normalized"], queries[~existing]])
+            state["vehicle_ids"] = np.concatenate([catalog_ids, ids[~existing]])
+        catalog_ids, normalized = state["vehicle_ids"], state["normalized"]
+        order = np.argsort(catalog_ids, kind="stable")
+        folded_pos = order[np.searchsorted(catalog_ids[order], ids)]
+
+        sims = normalized @ queries.T
+        sims[folded_pos, np.arange(len(ids))] = -np.inf
+        new_rows: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        k = max(0, min(top_k, len(catalog_ids) - 1))
+        for j, vehicle_id in enumerate(ids.tolist()):
+            column = sims[:, j]
+            top = np.argpartition(column, -k)[-k:] if k else np.zeros(0, dtype=np.int64)
+            top = top[np.argsort(-column[top], kind="stable")]
+            new_rows[vehicle_id] = (catalog_ids[top], column[top])
+
+        # Existing lists the folded vehicles now rank in (not full yet, or beaten at the tail),
+        # plus lists that hold a re-encoded vehicle under its old score.
+        lengths, last = self._list_tails(model, catalog_ids)
+        enters = (lengths >= 0)[:, None] & ((lengths < k)[:, None] | (sims > last[:, None]))
+        affected = set(catalog_ids[enters.any(axis=1)].tolist())
+        if existing.any():
+            affected.update(self._listing(model, ids[existing]))
+        affected.difference_update(new_rows)
+
+        for vehicle_id in affected:
+            pos = int(np.searchsorted(catalog_ids[order], vehicle_id))
+            if pos >= len(order) or catalog_ids[order[pos]] != vehicle_id:
+                continue
+            current_ids, current_scores = self._neighbor_arrays(model.get(vehicle_id))
+            keep = ~np.isin(current_ids, ids)
+            candidate_ids = np.concatenate([current_ids[keep], ids])
+            candidate_scores = np.concatenate([current_scores[keep], sims[order[pos]]])
+            best = np.argsort(-candidate_scores, kind="stable")[:k]
+            new_rows[vehicle_id] = (candidate_ids[best], candidate_scores[best])
+
+        if isinstance(model, TopKSimilarityIndex):
+            patched_index = model.with_rows(new_rows)
+            if model.ann is not None:
+                patched_index.ann = model.ann.with_vectors(ids, queries)
+            if model.weighted is not None:
+                patched_index.weighted = model.weighted.with_vectors(ids, encoded)
+            return patched_index
+        patched = dict(model)
+        for vehicle_id, (neighbor_ids, scores) in new_rows.items():
+            patched[vehicle_id] = list(zip(neighbor_ids.tolist(), scores.astype(np.float32).tolist()))
+        return patched
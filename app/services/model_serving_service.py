@@ -1,43 +1,187 @@
-
 import asyncio
+import logging
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Callable
+from contextlib import asynccontextmanager
+from typing import Dict, Callable, Optional, Set, Tuple
 from app.models import model_persistance
 
+logger = logging.getLogger(__name__)
+
 class ModelServingService:
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, load_timeout: float = 5.0):
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.load_timeout = load_timeout
         self.models: Dict[str, any] = {}
+        self.versions: Dict[str, Optional[str]] = {}
         self.loading_tasks: Dict[str, asyncio.Task] = {}
-        self.model_lock = asyncio.Lock()
+        self._refcounts: Dict[Tuple[str, Optional[str]], int] = defaultdict(int)
+        self._retired: Dict[str, Set[str]] = defaultdict(set)
+        self._reload_lock = asyncio.Lock()
 
-        self.model_registry: Dict[str, Callable[[], any]] = {
+        self.model_registry: Dict[str, Callable[[Optional[str]], any]] = {
             "collaborative": model_persistance.load_collaborative_model,
             "vehicle_similarity": model_persistance.load_content_model,
             "user_similarity": model_persistance.load_user_content_model,
         }
 
-    async def load_model(self, model_name: str):
-        if model_name in self.models:
-            return self.models[model_name]
+    @property
+    def is_ready(self) -> bool:
+        """True once every registered model is resident in memory."""
+        return all(name in self.models for name in self.model_registry)
+
+    async def load_model(self, model_name: str, timeout: Optional[float] = None):
+        """
+        Return the model, awaiting an in-flight load shared by all concurrent callers.
+        Returns None if the model is missing on disk or not loaded within the deadline
+        (`timeout`, defaulting to `load_timeout`); the load itself keeps running.
+        """
+        model, _ = await self._get(model_name, timeout)
+        return model
+
+    @asynccontextmanager
+    async def use_model(self, model_name: str, timeout: Optional[float] = None):
+        """
+        Lease the live model for the duration of a request. A reload swaps the reference
+        for new callers while leaseholders finish on the version they started with;
+        a retired version's files become collectable once its lease count drains.
+        """
+        model, version = await self._get(model_name, timeout)
+        key = (model_name, version)
+        self._refcounts[key] += 1
+        try:
+            yield model
+        finally:
+            self._refcounts[key] -= 1
+            if self._refcounts[key] <= 0:
+                del self._refcounts[key]
+                if version in self._retired[model_name]:
+                    await self._collect(model_name)
+
+    def protected_versions(self, model_name: str) -> Set[str]:
+        """Versions that must stay on disk: the one being served and any still leased."""
+        versions = {version for (name, version), count in self._refcounts.items() if name == model_name and count > 0}
+        versions.add(self.versions.get(model_name))
+        versions.discard(None)
+        return versions
 
-        if model_name in self.loading_tasks:
-            return None
+    async def preload_all(self) -> bool:
+        """Load every registered model without a deadline. Returns readiness."""
+        await asyncio.gather(*(self._ensure_loading(name) for name in self.model_registry if name not in self.models))
+        return self.is_ready
 
+    async def reload_model(self, model_name: str) -> Optional[str]:
+        """
+        Load the CURRENT on-disk version in the executor and atomically swap it in.
+        Returns the live version afterwards; a no-op if it is already being served.
+        """
         if model_name not in self.model_registry:
             raise ValueError(f"Unknown model: {model_name}")
 
-        async with self.model_lock:
-            if model_name not in self.loading_tasks:
-                loop = asyncio.get_event_loop()
-                task = loop.create_task(self._load_model_async(model_name))
-                self.loading_tasks[model_name] = task
+        async with self._reload_lock:
+            version = model_persistance.current_version(model_name)
+            if version is None or (model_name in self.models and version == self.versions.get(model_name)):
+                return self.versions.get(model_name)
 
-        return None
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(self.executor, model_persistance.verify_version, model_name, version):
+                raise ValueError(f"Checksum mismatch for model '{model_name}' version {version}")
 
-    async def _load_model_async(self, model_name: str):
-        loop = asyncio.get_event_loop()
-        loader = self.model_registry[model_name]
-        model = await loop.run_in_executor(self.executor, loader)
+            model = await loop.run_in_executor(self.executor, self.model_registry[model_name], version)
+            if model is None:
+                return self.versions.get(model_name)
+
+            old_version = self.versions.get(model_name)
+            self.models[model_name] = model
+            self.versions[model_name] = version
+            if old_version is not None:
+                self._retired[model_name].add(old_version)
+            logger.info(f"Model '{model_name}' swapped {old_version} -> {version}")
+
+        await self._collect(model_name)
+        await self._prune(model_name)
+        return version
+
+    def replace_model(self, model_name: str, model, version: Optional[str]) -> bool:
+        """
+        Serve an in-memory patch of the live model (e.g. folded-in vehicles) under the same
+        version. Refused if a reload swapped in a different version in the meantime.
+        """
+        if model_name not in self.models or self.versions.get(model_name) != version:
+            return False
         self.models[model_name] = model
-        self.loading_tasks.pop(model_name, None)
+        return True
+
+    async def reload_all(self) -> Dict[str, Optional[str]]:
+        return {name: await self.reload_model(name) for name in self.model_registry}
+
+    async def _collect(self, model_name: str) -> None:
+        """Delete on-disk files of retired versions whose leases have drained."""
+        drained = [
+            version for version in self._retired[model_name]
+            if self._refcounts.get((model_name, version), 0) <= 0
+        ]
+        if not drained:
+            return
+        self._retired[model_name].difference_update(drained)
+        loop = asyncio.get_running_loop()
+        for version in drained:
+            try:
+                if await loop.run_in_executor(self.executor, model_persistance.remove_version, model_name, version):
+                    logger.info(f"Garbage-collected model '{model_name}' version {version}")
+            except Exception as e:
+                logger.warning(f"Failed to garbage-collect '{model_name}' version {version}: {e}")
+
+    async def _prune(self, model_name: str) -> None:
+        """
+        Apply KEEP_VERSIONS retention to what publishers (e.g. the training worker) left
+        on disk, never removing the served version or any version still leased here.
+        """
+        loop = asyncio.get_running_loop()
+        protect = self.protected_versions(model_name)
+        try:
+            removed = await loop.run_in_executor(
+                self.executor, lambda: model_persistance.prune_versions(model_name, protect=protect)
+            )
+            if removed:
+                logger.info(f"Pruned model '{model_name}' versions {removed}")
+        except Exception as e:
+            logger.warning(f"Failed to prune '{model_name}' versions: {e}")
+
+    async def _get(self, model_name: str, timeout: Optional[float]) -> Tuple[any, Optional[str]]:
+        if model_name in self.models:
+            return self.models[model_name], self.versions.get(model_name)
+
+        task = self._ensure_loading(model_name)
+        deadline = self.load_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out after {deadline}s waiting for model '{model_name}'")
+            return None, None
+
+    def _ensure_loading(self, model_name: str) -> asyncio.Task:
+        if model_name not in self.model_registry:
+            raise ValueError(f"Unknown model: {model_name}")
+
+        task = self.loading_tasks.get(model_name)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load_model_async(model_name))
+            self.loading_tasks[model_name] = task
+        return task
+
+    async def _load_model_async(self, model_name: str) -> Tuple[any, Optional[str]]:
+        loop = asyncio.get_running_loop()
+        loader = self.model_registry[model_name]
+        try:
+            version = model_persistance.current_version(model_name)
+            model = await loop.run_in_executor(self.executor, loader, version)
+            if model is not None and model_name not in self.models:
+                self.models[model_name] = model
+                self.versions[model_name] = version
+            return self.models.get(model_name, model), self.versions.get(model_name, version)
+        except Exception as e:
+            logger.error(f"Failed to load model '{model_name}': {e}")
+            return None, None
+        finally:
+            self.loading_tasks.pop(model_name, None)
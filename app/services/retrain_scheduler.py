@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import random
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.observability.metrics import RETRAINS_TRIGGERED
+from app.repositories.user_repository import UserRepository
+from app.repositories.vehicle_repository import VehicleRepository
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-delete, so an instance never releases a lease that expired and was re-acquired.
+RELEASE_LEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+CATALOG_MODELS = ("vehicle_similarity", "user_similarity")
+INTERACTION_MODELS = ("collaborative",)
+
+
+class RetrainScheduler:
+    """
+    Periodically compares cheap source watermarks (UserInteractions count and max Id,
+    Vehicles count, max Id and max "UpdatedAt") with the ones the models were last trained
+    on, and retrains only the models whose inputs moved past their threshold.
+
+    Rounds are jittered, and a Redis lease makes sure a single replica retrains at a time.
+    The trained-on baseline lives in Redis too, so every replica shares it.
+    """
+    LEASE_KEY = "retrain:lease"
+    BASELINE_KEY = "retrain:baseline"
+
+    def __init__(self, vehicle_repo: VehicleRepository, user_repo: UserRepository, redis_client,
+                 retrain: Callable[[List[str]], Awaitable[bool]], interval: float = 3600.0,
+                 jitter: float = 0.1, min_new_interactions: int = 500, min_vehicle_changes: int = 50,
+                 lease_ttl: int = 1800):
+        self.vehicle_repo = vehicle_repo
+        self.user_repo = user_repo
+        self.redis = redis_client
+        self.retrain = retrain
+        self.interval = interval
+        self.jitter = jitter
+        self.min_new_interactions = min_new_interactions
+        self.min_vehicle_changes = min_vehicle_changes
+        self.lease_ttl = lease_ttl
+        self._task: Optional[asyncio.Task] = None
+
+    async def current_watermarks(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "interactions": await self.user_repo.fetch_interaction_watermark(),
+            "vehicles": await self.vehicle_repo.fetch_watermark(),
+        }
+
+    @staticmethod
+    def interaction_changes(old: Dict[str, Any], new: Dict[str, Any]) -> int:
+        """New rows since `old` (Ids only grow), or the net row-count change if larger."""
+        added = (new.get("max_id") or 0) - (old.get("max_id") or 0)
+        return max(added, abs(new.get("count", 0) - old.get("count", 0)))
+
+    async def vehicle_changes(self, old: Dict[str, Any], new: Dict[str, Any]) -> int:
+        if old == new:
+            return 0
+        if old.get("car_features") != new.get("car_features") or old.get("vehicle_limit") != new.get("vehicle_limit"):
+            # Enrichment data or the catalog window changed: every vehicle's features may differ.
+            return new.get("count", 0)
+        changed = await self.vehicle_repo.count_changed_since(old)
+        return max(changed, abs(new.get("count", 0) - old.get("count", 0)))
+
+    async def stale_models(self, baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+        stale: List[str] = []
+        if await self.vehicle_changes(baseline["vehicles"], current["vehicles"]) >= self.min_vehicle_changes:
+            stale.extend(CATALOG_MODELS)
+        if self.interaction_changes(baseline["interactions"], current["interactions"]) >= self.min_new_interactions:
+            stale.extend(INTERACTION_MODELS)
+        return stale
+
+    async def _acquire_lease(self) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if await self.redis.set(self.LEASE_KEY, token, nx=True, ex=self.lease_ttl):
+            return token
+        return None
+
+    async def _release_lease(self, token: str) -> None:
+        try:
+            await self.redis.eval(RELEASE_LEASE, 1, self.LEASE_KEY, token)
+        except Exception as e:
+            logger.warning(f"Failed to release retrain lease: {e}")
+
+    async def _load_baseline(self) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self.BASELINE_KEY)
+        return json.loads(raw) if raw else None
+
+    async def _save_baseline(self, baseline: Dict[str, Any]) -> None:
+        await self.redis.set(self.BASELINE_KEY, json.dumps(baseline, default=str))
+
+    async def check_once(self) -> List[str]:
+        """
+        One scheduling round. Returns the models that were retrained: none when nothing
+        changed enough, when another replica holds the lease, or when training failed.
+        """
+        token = await self._acquire_lease()
+        if token is None:
+            logger.info("Retrain check skipped, another instance holds the lease")
+            return []
+        try:
+            current = await self.current_watermarks()
+            baseline = await self._load_baseline()
+            if baseline is None:
+                # The models being served were trained on the data as it is now.
+                await self._save_baseline(current)
+                return []
+
+            stale = await self.stale_models(baseline, current)
+            if not stale:
+                return []
+            logger.info(f"Source data changed, retraining {stale}")
+            if not await self.retrain(stale):
+                return []
+
+            if any(name in stale for name in CATALOG_MODELS):
+                baseline["vehicles"] = current["vehicles"]
+            if any(name in stale for name in INTERACTION_MODELS):
+                baseline["interactions"] = current["interactions"]
+            await self._save_baseline(baseline)
+            for name in stale:
+                RETRAINS_TRIGGERED.labels(name).inc()
+            return stale
+        finally:
+            await self._release_lease(token)
+
+    def next_delay(self) -> float:
+        return max(0.0, self.interval * (1.0 + random.uniform(-self.jitter, self.jitter)))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.next_delay())
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.warning(f"Retrain check failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
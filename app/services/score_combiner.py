@@ -1,4 +1,5 @@
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
 from app.interfaces.recommendation_interfaces import IScoreCombiner
 
 class ScoreCombiner(IScoreCombiner):
@@ -15,3 +16,177 @@ class ScoreCombiner(IScoreCombiner):
                 + collaborative_weight * collaborative_scores.get(vid, 0.0)
             for vid in all_ids
         }
+
+class VehicleIdIndex:
+    """
+    Shared vehicle-ID -> row mapping (sorted IDs + searchsorted) for catalog membership.
+
+    With `source`, the IDs are a sorted array owned elsewhere (e.g. the vehicle store),
+    read by `current()` so catalog inserts are covered without rebuilding the index.
+    """
+    def __init__(self, vehicle_ids: Optional[np.ndarray] = None, source: Optional[Callable[[], np.ndarray]] = None):
+        self.source = source
+        self.ids = np.unique(np.asarray(vehicle_ids if vehicle_ids is not None else [], dtype=np.int64))
+
+    @classmethod
+    def from_sorted(cls, vehicle_ids: np.ndarray) -> "VehicleIdIndex":
+        """Wrap already sorted, unique IDs without copying them."""
+        index = cls.__new__(cls)
+        index.source = None
+        index.ids = np.asarray(vehicle_ids, dtype=np.int64)
+        return index
+
+    def current(self) -> "VehicleIdIndex":
+        """The index as of now, pinned for one request."""
+        return self if self.source is None else VehicleIdIndex.from_sorted(self.source())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, vehicle_ids: np.ndarray) -> np.ndarray:
+        """Row positions for vehicle IDs, -1 where the ID is unknown."""
+        keys = np.asarray(vehicle_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, keys), len(self.ids) - 1)
+        return np.where(self.ids[pos] == keys, pos, -1)
+
+class ArrayScoreCombiner(IScoreCombiner):
+    """
+    Combines scores as NumPy vectors over the candidate vehicles of a request.
+
+    fusion:        "weighted" (weighted sum) or "rrf" (weighted reciprocal rank fusion)
+    normalization: per-source "none", "max", "minmax" or "zscore", over present entries only
+
+    Dict inputs are aligned onto the sorted union of both key sets, so the vectors are
+    candidate-sized rather than catalog-sized. With a shared `vehicle_index` injected,
+    candidates missing from the catalog are dropped.
+    """
+    FUSIONS = ("weighted", "rrf")
+    NORMALIZATIONS = ("none", "max", "minmax", "zscore")
+
+    def __init__(self, fusion: str = "weighted", normalization: str = "none", rrf_k: float = 60.0,
+                 vehicle_index: Optional[VehicleIdIndex] = None):
+        if fusion not in self.FUSIONS:
+            raise ValueError(f"Unknown score fusion: {fusion}")
+        if normalization not in self.NORMALIZATIONS:
+            raise ValueError(f"Unknown score normalization: {normalization}")
+        self.fusion = fusion
+        self.normalization = normalization
+        self.rrf_k = rrf_k
+        self.vehicle_index = vehicle_index
+
+    def combine(
+        self,
+        content_scores: Dict[int, float],
+        collaborative_scores: Dict[int, float],
+        content_weight: float = 0.5,
+        collaborative_weight: float = 0.5,
+    ) -> Dict[int, float]:
+        ids, combined, present = self._combine_dicts(content_scores, collaborative_scores, content_weight, collaborative_weight)
+        return dict(zip(ids[present].tolist(), combined[present].tolist()))
+
+    def combine_top_n(
+        self,
+        content_scores: Dict[int, float],
+        collaborative_scores: Dict[int, float],
+        content_weight: float = 0.5,
+        collaborative_weight: float = 0.5,
+        top_n: int = 10,
+    ) -> List[Tuple[int, float]]:
+        ids, combined, present = self._combine_dicts(content_scores, collaborative_scores, content_weight, collaborative_weight)
+        rows = self.top_n_rows(combined, top_n, present)
+        return list(zip(ids[rows].tolist(), combined[rows].tolist()))
+
+    def combine_vectors(
+        self,
+        content: np.ndarray,
+        collaborative: np.ndarray,
+        content_weight: float = 0.5,
+        collaborative_weight: float = 0.5,
+        content_present: Optional[np.ndarray] = None,
+        collaborative_present: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Fuse two score vectors aligned to the same IDs (missing entries count as absent)."""
+        content_present = content_present if content_present is not None else content != 0
+        collaborative_present = collaborative_present if collaborative_present is not None else collaborative != 0
+
+        content = self._normalize(content, content_present)
+        collaborative = self._normalize(collaborative, collaborative_present)
+
+        if self.fusion == "rrf":
+            return (content_weight * self._reciprocal_ranks(content, content_present)
+                    + collaborative_weight * self._reciprocal_ranks(collaborative, collaborative_present))
+        return content_weight * content + collaborative_weight * collaborative
+
+    @staticmethod
+    def top_n_rows(scores: np.ndarray, top_n: int, present: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row positions of the `top_n` best scores (best first) via argpartition."""
+        candidates = np.flatnonzero(present) if present is not None else np.arange(scores.size)
+        k = min(top_n, candidates.size)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        values = scores[candidates]
+        if k < candidates.size:
+            part = np.argpartition(values, candidates.size - k)[-k:]
+        else:
+            part = np.arange(candidates.size)
+        return candidates[part[np.argsort(-values[part], kind="stable")]]
+
+    def _candidates(self, content_keys: np.ndarray, collaborative_keys: np.ndarray) -> np.ndarray:
+        ids = np.union1d(content_keys, collaborative_keys)
+        if self.vehicle_index is not None:
+            ids = ids[self.vehicle_index.current().rows(ids) >= 0]
+        return ids
+
+    @staticmethod
+    def _align(ids: np.ndarray, keys: np.ndarray, vals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(values, present-mask) vectors over sorted candidate `ids` for parallel keys/values."""
+        vector = np.zeros(ids.size, dtype=np.float64)
+        present = np.zeros(ids.size, dtype=bool)
+        if ids.size and keys.size:
+            pos = np.minimum(np.searchsorted(ids, keys), ids.size - 1)
+            hit = ids[pos] == keys
+            vector[pos[hit]] = vals[hit]
+            present[pos[hit]] = True
+        return vector, present
+
+    def _combine_dicts(self, content_scores, collaborative_scores, content_weight, collaborative_weight):
+        content_keys = np.fromiter(content_scores.keys(), dtype=np.int64, count=len(content_scores))
+        collaborative_keys = np.fromiter(collaborative_scores.keys(), dtype=np.int64, count=len(collaborative_scores))
+        ids = self._candidates(content_keys, collaborative_keys)
+        content, content_present = self._align(
+            ids, content_keys, np.fromiter(content_scores.values(), dtype=np.float64, count=len(content_scores))
+        )
+        collaborative, collaborative_present = self._align(
+            ids, collaborative_keys,
+            np.fromiter(collaborative_scores.values(), dtype=np.float64, count=len(collaborative_scores)),
+        )
+        combined = self.combine_vectors(
+            content, collaborative, content_weight, collaborative_weight, content_present, collaborative_present
+        )
+        return ids, combined, content_present | collaborative_present
+
+    def _normalize(self, scores: np.ndarray, present: np.ndarray) -> np.ndarray:
+        if self.normalization == "none" or not present.any():
+            return scores
+        values = scores[present]
+        if self.normalization == "max":
+            scale = np.abs(values).max() or 1.0
+            normalized = values / scale
+        elif self.normalization == "minmax":
+            low, high = values.min(), values.max()
+            normalized = (values - low) / ((high - low) or 1.0)
+        else:
+            normalized = (values - values.mean()) / (values.std() or 1.0)
+        out = np.zeros_like(scores)
+        out[present] = normalized
+        return out
+
+    def _reciprocal_ranks(self, scores: np.ndarray, present: np.ndarray) -> np.ndarray:
+        out = np.zeros(scores.size, dtype=np.float64)
+        rows = np.flatnonzero(present)
+        if rows.size:
+            order = rows[np.argsort(-scores[rows], kind="stable")]
+            out[order] = 1.0 / (self.rrf_k + np.arange(1, order.size + 1))
+        return out
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.observability.metrics import TRAINING_PHASE_SECONDS, TRAINING_RUNS
+from app.services.model_serving_service import ModelServingService
+from app.services.training_worker import MODEL_NAMES, parse_event
+
+logger = logging.getLogger(__name__)
+
+WORKER_MODULE = "app.services.training_worker"
+
+
+class TrainingRunner:
+    """
+    Runs `python -m app.services.training_worker` as a child process so training never
+    blocks the event loop. Progress events from the child are logged and exported as
+    metrics; once it exits successfully the newly published versions are hot-swapped in.
+    """
+
+    def __init__(self, model_serving: ModelServingService, notify_channel: Optional[str] = None,
+                 python: str = sys.executable):
+        self.model_serving = model_serving
+        self.notify_channel = notify_channel
+        self.python = python
+        self.last_event: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def command(self, models: Sequence[str], full_refit: bool = False) -> List[str]:
+        args = [self.python, "-m", WORKER_MODULE, "--models", *models]
+        if full_refit:
+            args.append("--full-refit")
+        if not self.notify_channel:
+            args.append("--no-notify")
+        return args
+
+    async def train(self, models: Optional[Sequence[str]] = None, full_refit: bool = False) -> bool:
+        """Train in a child process, one run at a time. Returns True when new versions are serving."""
+        models = list(models or MODEL_NAMES)
+        async with self._lock:
+            logger.info(f"Starting training worker for {models}")
+            process = await asyncio.create_subprocess_exec(
+                *self.command(models, full_refit),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            async for raw in process.stdout:
+                self._handle_line(raw.decode("utf-8", errors="replace").rstrip())
+            returncode = await process.wait()
+
+            if returncode != 0:
+                TRAINING_RUNS.labels("failed").inc()
+                logger.error(f"Training worker exited with code {returncode}")
+                return False
+            TRAINING_RUNS.labels("succeeded").inc()
+
+        versions = await self.model_serving.reload_all()
+        logger.info(f"Serving retrained models: {versions}")
+        return True
+
+    def _handle_line(self, line: str) -> None:
+        event = parse_event(line)
+        if event is None:
+            if line:
+                logger.info(f"[trainer] {line}")
+            return
+        self.last_event = event
+        kind = event.get("event")
+        if kind == "phase_started":
+            logger.info(f"Training phase {event.get('phase')} started")
+        elif kind == "phase_finished":
+            TRAINING_PHASE_SECONDS.labels(event.get("phase")).set(float(event.get("seconds", 0.0)))
+            logger.info(f"Training phase {event.get('phase')} finished in {float(event.get('seconds', 0.0)):.2f}s")
+        elif kind == "failed":
+            logger.error(f"Training failed in phase {event.get('phase')}: {event.get('error')}")
+        elif kind == "finished":
+            logger.info(f"Training finished, published {event.get('versions')}")
+
+
+class ModelUpdateListener:
+    """
+    Subscribes to the trainer's notification channel and reloads published models, so
+    every replica picks up a retrain no matter which process ran it.
+    """
+
+    def __init__(self, redis_client, model_serving: ModelServingService, channel: str, retry_delay: float = 5.0):
+        self.redis = redis_client
+        self.model_serving = model_serving
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def handle_message(self, message: Dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+        try:
+            versions = await self.model_serving.reload_all()
+            logger.info(f"Model update notification received, serving {versions}")
+        except Exception as e:
+            logger.warning(f"Failed to reload models after update notification: {e}")
+
+    async def run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    await self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Model update listener disconnected: {e}")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,172 @@
+"""
+Standalone model trainer, run as `python -m app.services.training_worker`.
+
+Training is CPU-bound pandas/sklearn/NumPy work, so it runs in its own process and never
+on the API event loop. The only outputs are the versioned artifacts published under
+MODEL_DIR and a notification on TRAINING_NOTIFY_CHANNEL; the API hot-swaps from there.
+Progress is reported as `@training {json}` lines on stdout and in MODEL_DIR/training_status.json.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+from redis.asyncio import Redis
+
+from app.db import DatabaseManager
+from app.models import model_persistance
+from app.repositories.user_repository import UserRepository
+from app.repositories.vehicle_repository import VehicleRepository
+from app.services.ml_service import MODEL_NAMES, MLModelService
+from app.services.model_serving_service import ModelServingService
+from config.app_config import settings
+from config.ml_config import MLConfig
+
+logger = logging.getLogger(__name__)
+
+STATUS_FILE = "training_status.json"
+EVENT_PREFIX = "@training "
+
+
+def emit(event: str, **fields: Any) -> None:
+    """Write one progress event as a JSON line on stdout for the launching process."""
+    print(EVENT_PREFIX + json.dumps({"event": event, **fields}, default=str), flush=True)
+
+
+def parse_event(line: str) -> Optional[Dict[str, Any]]:
+    """The event carried by a trainer output line, or None for ordinary log output."""
+    if not line.startswith(EVENT_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(EVENT_PREFIX):])
+    except ValueError:
+        return None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def write_status(status: Dict[str, Any]) -> None:
+    os.makedirs(model_persistance.MODEL_DIR, exist_ok=True)
+    path = os.path.join(model_persistance.MODEL_DIR, STATUS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def read_status() -> Optional[Dict[str, Any]]:
+    path = os.path.join(model_persistance.MODEL_DIR, STATUS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def run_phases(ml_service: MLModelService, models: Sequence[str] = MODEL_NAMES,
+                     full_refit: bool = False) -> Dict[str, Optional[str]]:
+    """
+    Prepare features once, train the requested models and return their published versions.
+    Every phase is timed and reported as it starts and finishes.
+    """
+    trainers = {
+        "vehicle_similarity": ml_service.train_vehicle_similarity_model,
+        "user_similarity": ml_service.train_user_similarity_model,
+        "collaborative": lambda features: ml_service.train_collaborative_model(features, full_refit=full_refit),
+    }
+    status: Dict[str, Any] = {"state": "running", "models": list(models), "started_at": _now(), "phases": {}}
+    features = None
+    phase = "prepare_features"
+    try:
+        for phase in ("prepare_features", *models):
+            emit("phase_started", phase=phase)
+            status["phase"] = phase
+            write_status(status)
+
+            started = time.perf_counter()
+            if phase == "prepare_features":
+                features = await ml_service.prepare_features()
+            else:
+                await trainers[phase](features)
+            seconds = time.perf_counter() - started
+
+            status["phases"][phase] = round(seconds, 3)
+            emit("phase_finished", phase=phase, seconds=seconds)
+    except Exception as e:
+        status.update(state="failed", error=str(e), finished_at=_now())
+        write_status(status)
+        emit("failed", phase=phase, error=str(e))
+        raise
+
+    versions = {name: model_persistance.current_version(name) for name in models}
+    status.update(state="finished", phase=None, versions=versions, finished_at=_now())
+    write_status(status)
+    emit("finished", versions=versions, phases=status["phases"])
+    return versions
+
+
+async def notify(versions: Dict[str, Optional[str]], channel: str) -> None:
+    """Tell every API replica that new versions were published."""
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, decode_responses=True)
+    try:
+        await redis.publish(channel, json.dumps({"versions": versions}))
+    except Exception as e:
+        logger.warning(f"Failed to publish model update notification: {e}")
+    finally:
+        await redis.aclose()
+
+
+async def train(models: Sequence[str] = MODEL_NAMES, full_refit: bool = False,
+                notify_channel: Optional[str] = None) -> Dict[str, Optional[str]]:
+    db_manager = DatabaseManager()
+    await db_manager.initialize()
+    try:
+        vehicle_repo = VehicleRepository(
+            pool=db_manager.pool,
+            vehicle_limit=settings.VEHICLE_LIMIT,
+            chunk_size=settings.CATALOG_CHUNK_SIZE,
+            snapshot_dir=settings.CATALOG_SNAPSHOT_DIR,
+            snapshot_every=settings.CATALOG_SNAPSHOT_EVERY,
+            snapshot_min_changes=settings.CATALOG_SNAPSHOT_MIN_CHANGES,
+        )
+        ml_service = MLModelService(
+            user_repo=UserRepository(pool=db_manager.pool),
+            vehicle_repo=vehicle_repo,
+            model_serving=ModelServingService(max_workers=1),
+            config=MLConfig(),
+            prune_versions=False,
+        )
+        versions = await run_phases(ml_service, models, full_refit)
+    finally:
+        await db_manager.close()
+
+    if notify_channel:
+        await notify(versions, notify_channel)
+    return versions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train recommendation models and publish them to the model directory.")
+    parser.add_argument("--models", nargs="+", choices=MODEL_NAMES, default=list(MODEL_NAMES))
+    parser.add_argument("--full-refit", action="store_true", help="Refit the collaborative model from scratch.")
+    parser.add_argument("--no-notify", action="store_true", help="Do not publish a model update notification.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    channel = None if args.no_notify else settings.TRAINING_NOTIFY_CHANNEL
+    try:
+        asyncio.run(train(args.models, args.full_refit, channel))
+    except Exception as e:
+        logger.exception(f"Model training failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
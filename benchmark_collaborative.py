@@ -0,0 +1,72 @@
+"""
+Benchmark the collaborative trainers: TruncatedSVD vs implicit ALS.
+Reports fit time and peak traced memory on a synthetic power-law interaction matrix.
+
+Usage: python benchmark_collaborative.py [--users 20000] [--vehicles 5000] [--density 0.002] [--factors 50]
+"""
+
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.decomposition import TruncatedSVD
+
+from app.models.als import fit_implicit_als
+
+
+def synthetic_interactions(users: int, vehicles: int, density: float, seed: int = 0) -> csr_matrix:
+    """Weighted counts with popularity-skewed vehicles, one entry per (user, vehicle)."""
+    rng = np.random.default_rng(seed)
+    nnz = int(users * vehicles * density)
+    popularity = rng.zipf(1.3, size=vehicles).astype(np.float64)
+    popularity /= popularity.sum()
+    rows = rng.integers(0, users, size=nnz)
+    cols = rng.choice(vehicles, size=nnz, p=popularity)
+    weights = rng.choice([1.0, 3.0, 4.0, 5.0], size=nnz, p=[0.7, 0.1, 0.1, 0.1])
+    matrix = csr_matrix((weights, (rows, cols)), shape=(users, vehicles))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def measure(label: str, fit):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fit()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} fit {elapsed:8.2f}s   peak {peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--density", type=float, default=0.002)
+    parser.add_argument("--factors", type=int, default=50)
+    parser.add_argument("--svd-iter", type=int, default=300, help="TruncatedSVD n_iter (MLConfig.max_iter)")
+    parser.add_argument("--als-iterations", type=int, default=15)
+    parser.add_argument("--als-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    interactions = synthetic_interactions(args.users, args.vehicles, args.density)
+    print(f"{args.users} users x {args.vehicles} vehicles, {interactions.nnz} interactions, {args.factors} factors\n")
+
+    def fit_svd():
+        svd = TruncatedSVD(n_components=args.factors, random_state=42, n_iter=args.svd_iter)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            svd.fit_transform(interactions)
+
+    measure("TruncatedSVD", fit_svd)
+    measure("ALS (1 worker)", lambda: fit_implicit_als(
+        interactions, factors=args.factors, iterations=args.als_iterations, workers=1))
+    measure(f"ALS ({args.als_workers} workers)", lambda: fit_implicit_als(
+        interactions, factors=args.factors, iterations=args.als_iterations, workers=args.als_workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark query-time weighted similarity: one vehicle against the resident catalog under
+a feature-weight profile. Reports per-query latency percentiles for a few cached A/B
+profiles and for a new profile on every request (row norms recomputed).
+
+Usage: python benchmark_weighted_similarity.py [--vehicles 100000] [--queries 2000] [--top-n 10] [--budget-ms 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.models.weighted_similarity import WeightedFeatureIndex
+from app.services.ml_service import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from config.ml_config import DEFAULT_VEHICLE_FEATURE_WEIGHTS
+
+COLUMNS = CATEGORICAL_FEATURES + NUMERIC_FEATURES
+
+
+def synthetic_catalog(vehicles: int, seed: int = 0) -> np.ndarray:
+    """Label-encoded categoricals and standardized numerics, as the feature store holds them."""
+    rng = np.random.default_rng(seed)
+    categorical = rng.integers(0, 40, size=(vehicles, len(CATEGORICAL_FEATURES))).astype(np.float32)
+    numeric = rng.standard_normal((vehicles, len(NUMERIC_FEATURES)), dtype=np.float32)
+    return np.hstack([categorical, numeric])
+
+
+def random_profile(rng: np.random.Generator) -> dict:
+    return {col: float(w) for col, w in zip(COLUMNS, rng.uniform(0.0, 5.0, size=len(COLUMNS)))}
+
+
+def measure(label: str, index: WeightedFeatureIndex, queries: np.ndarray, profiles, top_n: int, budget_ms: float) -> bool:
+    latencies = np.empty(len(queries))
+    for i, vehicle_id in enumerate(queries):
+        profile = profiles(i)
+        start = time.perf_counter()
+        index.similar(vehicle_id, top_n, profile)
+        latencies[i] = (time.perf_counter() - start) * 1000.0
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    passed = p99 < budget_ms
+    print(f"{label:<28} p50 {p50:6.2f}ms   p95 {p95:6.2f}ms   p99 {p99:6.2f}ms   {'OK' if passed else 'OVER BUDGET'}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--profiles", type=int, default=4, help="cached A/B profiles to rotate through")
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    index = WeightedFeatureIndex(np.arange(args.vehicles), synthetic_catalog(args.vehicles), COLUMNS,
+                                 default_weights=DEFAULT_VEHICLE_FEATURE_WEIGHTS)
+    queries = rng.integers(0, args.vehicles, size=args.queries)
+    ab_profiles = [random_profile(rng) for _ in range(args.profiles)]
+    print(f"{args.vehicles} vehicles x {len(COLUMNS)} features, {args.queries} queries, top {args.top_n}\n")
+
+    # Warm up BLAS and the profile norm cache.
+    for profile in [None, *ab_profiles]:
+        index.similar(0, args.top_n, profile)
+
+    results = [
+        measure("default weights", index, queries, lambda i: None, args.top_n, args.budget_ms),
+        measure(f"{args.profiles} cached profiles", index, queries, lambda i: ab_profiles[i % args.profiles],
+                args.top_n, args.budget_ms),
+        measure("new profile per request", index, queries, lambda i: random_profile(rng), args.top_n, args.budget_ms),
+    ]
+    raise SystemExit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
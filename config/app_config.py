@@ -31,6 +31,28 @@ class Settings(BaseSettings):
     # ML Model
     MODEL_PATH: str = Field(default="trained_models")
     MAX_RECOMMENDATIONS: PositiveInt = Field(default=10)
+    MAX_SIMILAR_VEHICLES: PositiveInt = Field(default=500)
+    VEHICLE_LIMIT: Optional[PositiveInt] = Field(default=None)
+    CATALOG_CHUNK_SIZE: PositiveInt = Field(default=5000)
+    CATALOG_SNAPSHOT_DIR: str = Field(default="catalog_cache")
+    CATALOG_SNAPSHOT_REDIS: bool = Field(default=True)
+    CATALOG_REFRESH_INTERVAL: float = Field(default=30.0, ge=0)
+    CATALOG_SNAPSHOT_EVERY: PositiveInt = Field(default=20)
+    CATALOG_SNAPSHOT_MIN_CHANGES: PositiveInt = Field(default=1000)
+    MODEL_LOAD_TIMEOUT: float = Field(default=5.0, gt=0)
+    COLLABORATIVE_FOLD_IN: bool = Field(default=True)
+    SIMILARITY_ANN: bool = Field(default=False)
+    SIMILARITY_QUERY_WEIGHTING: bool = Field(default=True)
+    MATERIALIZE_RECOMMENDATIONS: bool = Field(default=True)
+    MATERIALIZED_TOP_N: PositiveInt = Field(default=5)
+    MATERIALIZED_TTL: PositiveInt = Field(default=86400)
+    TRAINING_WORKER: bool = Field(default=True)
+    TRAINING_NOTIFY_CHANNEL: str = Field(default="models:published")
+    RETRAIN_INTERVAL: float = Field(default=3600.0, ge=0)
+    RETRAIN_JITTER: float = Field(default=0.1, ge=0, lt=1)
+    RETRAIN_MIN_NEW_INTERACTIONS: PositiveInt = Field(default=500)
+    RETRAIN_MIN_VEHICLE_CHANGES: PositiveInt = Field(default=50)
+    RETRAIN_LEASE_TTL: PositiveInt = Field(default=1800)
 
     # Server
     ENVIRONMENT: str = Field(default="production")
@@ -44,17 +44,57 @@ def validate_weights(weights: Dict[str, float], name: str) -> Dict[str, float]:
     return weights
 
 
+def load_weight_profiles(config_value: str) -> Dict[str, Dict[str, float]]:
+    """Named vehicle feature-weight overrides from a JSON object of objects; {} on error."""
+    try:
+        parsed = json.loads(config_value) if config_value else {}
+    except Exception:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        str(name): validate_weights(weights, f"Profile '{name}'")
+        for name, weights in parsed.items() if isinstance(weights, dict)
+    }
+
+
 @dataclass
 class MLConfig:
     svd_components: int = int(getattr(settings, "SVD_COMPONENTS", 50))
+    collaborative_algorithm: str = str(getattr(settings, "COLLABORATIVE_ALGORITHM", "svd"))
+    als_factors: int = int(getattr(settings, "ALS_FACTORS", 50))
+    als_regularization: float = float(getattr(settings, "ALS_REGULARIZATION", 0.1))
+    als_alpha: float = float(getattr(settings, "ALS_ALPHA", 1.0))
+    als_iterations: int = int(getattr(settings, "ALS_ITERATIONS", 15))
+    als_cg_steps: int = int(getattr(settings, "ALS_CG_STEPS", 3))
+    als_workers: int = int(getattr(settings, "ALS_WORKERS", 4))
+    collaborative_training_mode: str = str(getattr(settings, "COLLABORATIVE_TRAINING_MODE", "incremental"))
+    collaborative_full_refit_hours: float = float(getattr(settings, "COLLABORATIVE_FULL_REFIT_HOURS", 168.0))
+    collaborative_refine_iterations: int = int(getattr(settings, "COLLABORATIVE_REFINE_ITERATIONS", 2))
+    collaborative_max_delta_fraction: float = float(getattr(settings, "COLLABORATIVE_MAX_DELTA_FRACTION", 0.25))
+    collaborative_fold_in: bool = bool(getattr(settings, "COLLABORATIVE_FOLD_IN", True))
+    fold_in_cache_size: int = int(getattr(settings, "FOLD_IN_CACHE_SIZE", 10000))
     random_state: int = int(getattr(settings, "RANDOM_STATE", 42))
     max_iter: int = int(getattr(settings, "MAX_ITER", 300))
 
     content_similarity_threshold: float = float(getattr(settings, "CONTENT_SIMILARITY_THRESHOLD", 0.1))
     top_k_similar: int = int(getattr(settings, "TOP_K_SIMILAR", 200))
+    similarity_training_mode: str = str(getattr(settings, "SIMILARITY_TRAINING_MODE", "blocked"))
+    similarity_ann: bool = bool(getattr(settings, "SIMILARITY_ANN", False))
+    ann_lists: int = int(getattr(settings, "ANN_LISTS", 0))
+    ann_probe: int = int(getattr(settings, "ANN_PROBE", 8))
+    similarity_query_weighting: bool = bool(getattr(settings, "SIMILARITY_QUERY_WEIGHTING", True))
+    similarity_block_size: int = int(getattr(settings, "SIMILARITY_BLOCK_SIZE", 256))
+    similarity_workers: int = int(getattr(settings, "SIMILARITY_WORKERS", 4))
+    similarity_artifact_format: str = str(getattr(settings, "SIMILARITY_ARTIFACT_FORMAT", "csr"))
+    similarity_score_dtype: str = str(getattr(settings, "SIMILARITY_SCORE_DTYPE", "float32"))
 
     hybrid_content_weight: float = float(getattr(settings, "HYBRID_CONTENT_WEIGHT", 0.5))
     hybrid_collaborative_weight: float = float(getattr(settings, "HYBRID_COLLABORATIVE_WEIGHT", 0.5))
+    score_combiner: str = str(getattr(settings, "SCORE_COMBINER", "array"))
+    score_fusion: str = str(getattr(settings, "SCORE_FUSION", "weighted"))
+    score_normalization: str = str(getattr(settings, "SCORE_NORMALIZATION", "none"))
+    rrf_k: float = float(getattr(settings, "RRF_K", 60.0))
 
     vehicle_feature_weights: Dict[str, float] = field(
         default_factory=lambda: validate_weights(
@@ -68,6 +108,9 @@ class MLConfig:
             "User"
         )
     )
+    similarity_weight_profiles: Dict[str, Dict[str, float]] = field(
+        default_factory=lambda: load_weight_profiles(getattr(settings, "SIMILARITY_WEIGHT_PROFILES", None))
+    )
     interaction_weights: Dict[str, float] = field(
         default_factory=lambda: validate_weights(
             load_weights(getattr(settings, "INTERACTION_WEIGHTS", None), DEFAULT_INTERACTION_WEIGHTS),
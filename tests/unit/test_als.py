@@ -0,0 +1,60 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.models.als import fit_implicit_als, fold_in_user, item_gram, refine_implicit_als
+
+
+def block_interactions():
+    dense = np.zeros((6, 6))
+    dense[:3, :3] = [[3, 1, 0], [2, 0, 4], [0, 5, 1]]
+    dense[3:, 3:] = [[1, 2, 0], [0, 3, 3], [4, 0, 1]]
+    return csr_matrix(dense)
+
+
+def test_als_recovers_block_structure():
+    user_factors, item_factors = fit_implicit_als(block_interactions(), factors=4, iterations=20, cg_steps=4, workers=1)
+
+    assert user_factors.shape == (6, 4) and item_factors.shape == (6, 4)
+    assert user_factors.dtype == np.float32
+    scores = user_factors @ item_factors.T
+    liked = block_interactions().toarray() > 0
+    for user in range(6):
+        other = slice(3, 6) if user < 3 else slice(0, 3)
+        assert scores[user, liked[user]].min() > scores[user, other].max()
+
+
+def test_threaded_fit_matches_serial():
+    serial = fit_implicit_als(block_interactions(), factors=4, iterations=5, workers=1, block_size=2)
+    threaded = fit_implicit_als(block_interactions(), factors=4, iterations=5, workers=3, block_size=2)
+
+    for a, b in zip(serial, threaded):
+        assert np.allclose(a, b, atol=1e-5)
+
+
+def test_fold_in_matches_dense_normal_equations():
+    item_factors = np.random.default_rng(0).standard_normal((6, 3))
+    indices, values = np.array([1, 4]), np.array([2.0, 0.5])
+
+    vector = fold_in_user(item_factors, indices, values, alpha=2.0, gram=item_gram(item_factors, 0.1))
+
+    counts = np.zeros(6)
+    counts[indices] = values
+    confidence = np.diag(1.0 + 2.0 * counts)
+    expected = np.linalg.solve(
+        item_factors.T @ confidence @ item_factors + 0.1 * np.eye(3),
+        item_factors.T @ confidence @ (counts > 0),
+    )
+    assert np.allclose(vector, expected)
+
+
+def test_refine_only_resolves_given_rows():
+    interactions = block_interactions()
+    user_factors, item_factors = fit_implicit_als(interactions, factors=4, iterations=5, workers=1)
+
+    refined_users, refined_items = refine_implicit_als(
+        interactions, user_factors, item_factors, users=np.array([0]), items=np.array([5]), workers=1
+    )
+
+    assert np.array_equal(refined_users[1:], user_factors[1:])
+    assert np.array_equal(refined_items[:5], item_factors[:5])
+    assert not np.array_equal(refined_users[0], user_factors[0])
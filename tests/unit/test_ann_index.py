@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from app.models import model_persistance
+from app.models.ann_index import IVFIndex
+from app.models.topk_index import TopKSimilarityIndex
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    # Clustered data, as catalog features are: a few makes/segments with local spread.
+    centers = rng.normal(size=(20, 8))
+    return (centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.normal(size=(2000, 8))).astype(np.float32)
+
+
+def _exact_topk(vectors, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = normalized @ normalized.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def test_topk_table_recall_against_exact_search(vectors):
+    vehicle_ids = np.arange(len(vectors)) + 100
+    ann = IVFIndex.build(vehicle_ids, vectors, n_probe=8)
+    exact = vehicle_ids[_exact_topk(vectors, 10)]
+
+    top_idx, top_vals = ann.topk_table(10)
+    approx = ann.vehicle_ids[top_idx]
+    by_id = dict(zip(ann.vehicle_ids.tolist(), approx))
+    recall = np.mean([len(set(by_id[v].tolist()) & set(row.tolist())) / 10 for v, row in zip(vehicle_ids.tolist(), exact)])
+
+    assert recall > 0.9
+    assert np.all(np.diff(top_vals, axis=1) <= 0)
+    assert not np.any(approx == ann.vehicle_ids[:, None])
+
+
+def test_search_widens_probe_for_deep_queries(vectors):
+    ann = IVFIndex.build(np.arange(len(vectors)), vectors, n_probe=1)
+
+    ids, scores = ann.search(vectors[0], top_n=500)
+    assert len(ids) == 500
+    assert np.all(np.diff(scores) <= 0)
+
+    neighbors = ann.neighbors(0, 5)
+    assert len(neighbors) == 5 and 0 not in [vid for vid, _ in neighbors]
+    assert ann.neighbors(10 ** 6, 5) is None
+
+
+def test_with_vectors_adds_and_replaces_vehicles(vectors):
+    ann = IVFIndex.build(np.arange(100), vectors[:100])
+    patched = ann.with_vectors(np.array([5, 1000]), vectors[[0, 1]])
+
+    assert len(patched) == 101 and 1000 in patched and 1000 not in ann
+    assert patched.neighbors(1000, 1)[0][0] == 1
+    # Vehicle 5 now carries vehicle 0's vector.
+    assert patched.neighbors(5, 1)[0] == (0, pytest.approx(1.0, abs=1e-5))
+
+
+def test_with_vectors_shares_built_arrays_until_compacted(vectors):
+    ann = IVFIndex.build(np.arange(300), vectors[:300])
+    patched = ann.with_vectors(np.array([5]), vectors[[0]]).with_vectors(np.array([1000]), vectors[[1]])
+
+    assert patched.vectors is ann.vectors and len(patched.overlay_ids) == 2
+    compacted = patched.compact()
+    assert len(compacted) == len(patched) == 301 and len(compacted.overlay_ids) == 0
+    assert [vid for vid, _ in compacted.neighbors(5, 10, n_probe=compacted.n_lists)] == \
+        [vid for vid, _ in patched.neighbors(5, 10, n_probe=patched.n_lists)]
+
+
+def test_similar_falls_back_to_ann_past_precomputed_depth(vectors):
+    vehicle_ids = np.arange(200)
+    ann = IVFIndex.build(vehicle_ids, vectors[:200])
+    top_idx, top_vals = ann.topk_table(3)
+    index = TopKSimilarityIndex.from_topk(ann.vehicle_ids, top_idx, top_vals)
+
+    assert index.similar(7, 3) == index[7][:3]
+    assert len(index.similar(7, 50)) == 3
+    assert index.similar(999, 3) is None
+
+    index.ann = ann
+    deep = index.similar(7, 50)
+    assert len(deep) == 50
+    assert [vid for vid, _ in deep[:3]] == [vid for vid, _ in index[7][:3]]
+
+
+def test_ann_is_persisted_with_content_model(tmp_path, monkeypatch, vectors):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    ann = IVFIndex.build(np.arange(300), vectors[:300], n_probe=4)
+    index = TopKSimilarityIndex.from_topk(ann.vehicle_ids, *ann.topk_table(5))
+    index.ann = ann
+
+    model_persistance.save_content_model(index)
+    loaded = model_persistance.load_content_model()
+
+    assert loaded.ann is not None and loaded.ann.n_probe == 4
+    assert isinstance(loaded.ann.vectors, np.memmap)
+    assert loaded.ann.neighbors(3, 20) == ann.neighbors(3, 20)
+    assert model_persistance.read_manifest("vehicle_similarity")["ann"]["n_lists"] == ann.n_lists
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+
+from app.repositories import catalog_snapshot
+from app.repositories.vehicle_repository import VehicleRepository
+
+
+def catalog():
+    return pd.DataFrame({
+        "Id": [1, 2, 3],
+        "Make": ["Acura", "Honda", None],
+        "Price": [Decimal("40000.00"), Decimal("20000.50"), None],
+        "CreatedAt": [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)],
+        "Horsepower": pd.Series([330, None, 158], dtype=object),
+        "EngineSize": pd.Series(["3.0L", None, None], dtype=object),
+    })
+
+
+def test_snapshot_round_trip_preserves_object_values(tmp_path):
+    header = catalog_snapshot.build_header({"count": 3, "max_id": 3})
+    catalog_snapshot.write_snapshot(str(tmp_path), catalog(), header)
+
+    assert catalog_snapshot.read_snapshot_header(str(tmp_path))["watermark"] == {"count": 3, "max_id": 3}
+    df, loaded_header = catalog_snapshot.read_snapshot(str(tmp_path))
+
+    assert df.columns.tolist() == catalog().columns.tolist()
+    assert df["Id"].tolist() == [1, 2, 3]
+    assert df["Horsepower"].tolist() == [330, None, 158]
+    assert df["EngineSize"].tolist() == ["3.0L", None, None]
+    assert df["Price"].tolist()[:2] == [Decimal("40000.00"), Decimal("20000.50")]
+    assert loaded_header["format_version"] == catalog_snapshot.SNAPSHOT_FORMAT_VERSION
+
+
+def test_serialize_deserialize_bytes():
+    data = catalog_snapshot.serialize(catalog(), catalog_snapshot.build_header({"count": 3}))
+    df, header = catalog_snapshot.deserialize(data)
+
+    assert header["watermark"] == {"count": 3}
+    assert VehicleRepository._build_lookup(df)[1]["Horsepower"] == 330
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    catalog_snapshot.write_snapshot(str(tmp_path), catalog(), catalog_snapshot.build_header({"count": 3}))
+    repo = VehicleRepository(pool=None, snapshot_dir=str(tmp_path))
+
+    df, _ = asyncio.run(repo._load_snapshot({"count": 3}))
+    assert df is not None and len(df) == 3
+
+    df, header = asyncio.run(repo._load_snapshot({"count": 4}))
+    assert df is None and header is None
@@ -0,0 +1,196 @@
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.exceptions.recommendation_exceptions import UserNotFoundError
+from app.recommenders.collaborative_based_recommender import CollaborativeBasedRecommender, select_top_n
+
+
+class FakeServing:
+    def __init__(self, model):
+        self.model = model
+
+    @asynccontextmanager
+    async def use_model(self, model_name, timeout=None):
+        yield self.model
+
+
+class FakeUserRepo:
+    def __init__(self, interactions):
+        self.interactions = interactions
+        self.queried = []
+
+    async def get_typed_interactions(self, user_ids):
+        self.queried.append(list(user_ids))
+        return {uid: self.interactions[uid] for uid in user_ids if uid in self.interactions}
+
+
+def sparse_model():
+    from scipy.sparse import csr_matrix
+
+    return {
+        "interactions": csr_matrix(np.array([[3.0, 0.0, 0.0, 1.0], [0.0, 2.0, 0.0, 0.0]])),
+        "user_ids": np.array([1, 2]),
+        "vehicle_ids": np.array([10, 20, 30, 40]),
+        "user_features": np.array([[1.0, 0.0], [0.0, 1.0]]),
+        "vehicle_features": np.array([[0.9, 0.1], [0.1, 0.9], [0.5, 0.5], [0.8, 0.2]]),
+    }
+
+
+@pytest.fixture
+def recommender():
+    interaction_matrix = pd.DataFrame(
+        [[3.0, 0.0, 0.0, 1.0], [0.0, 2.0, 0.0, 0.0]],
+        index=[1, 2],
+        columns=[10, 20, 30, 40],
+    )
+    model = {
+        "interaction_matrix": interaction_matrix,
+        "user_features": np.array([[1.0, 0.0], [0.0, 1.0]]),
+        "vehicle_features": np.array([[0.9, 0.1], [0.1, 0.9], [0.5, 0.5], [0.8, 0.2]]),
+    }
+    return CollaborativeBasedRecommender(model_serving=FakeServing(model))
+
+
+def test_select_top_n_orders_and_excludes():
+    scores = np.array([0.2, 0.9, 0.5, 0.7])
+    ids = np.array([1, 2, 3, 4])
+
+    assert list(select_top_n(scores, ids, 2)) == [2, 4]
+    assert list(select_top_n(scores, ids, 3, exclude=np.array([False, True, False, False]))) == [4, 3, 1]
+    assert select_top_n(scores, ids, 10, exclude=np.ones(4, dtype=bool)) == {}
+
+
+@pytest.mark.asyncio
+async def test_collaborative_top_n_masks_seen_vehicles(recommender):
+    all_scores = await recommender.get_collaborative_recommendations(1, 4)
+    unseen = await recommender.get_collaborative_recommendations(1, 4, exclude_seen=True)
+
+    assert list(all_scores) == [10, 40, 30, 20]
+    assert all_scores[10] == pytest.approx(1.0)
+    assert list(unseen) == [30, 20]
+
+    with pytest.raises(UserNotFoundError):
+        await recommender.get_collaborative_recommendations(99, 4)
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_single_user_scores(recommender):
+    batch = await recommender.get_batch_collaborative_recommendations([2, 99, 1], 3, exclude_seen=True)
+
+    assert set(batch) == {1, 2}
+    for user_id in (1, 2):
+        single = await recommender.get_collaborative_recommendations(user_id, 3, exclude_seen=True)
+        assert list(batch[user_id]) == list(single)
+        assert batch[user_id] == pytest.approx(single)
+
+
+@pytest.mark.asyncio
+async def test_sparse_model_matches_legacy_dense_model(recommender):
+    from scipy.sparse import csr_matrix
+
+    sparse_model = {
+        "interactions": csr_matrix(np.array([[3.0, 0.0, 0.0, 1.0], [0.0, 2.0, 0.0, 0.0]])),
+        "user_ids": np.array([1, 2]),
+        "vehicle_ids": np.array([10, 20, 30, 40]),
+        "user_features": np.array([[1.0, 0.0], [0.0, 1.0]]),
+        "vehicle_features": np.array([[0.9, 0.1], [0.1, 0.9], [0.5, 0.5], [0.8, 0.2]]),
+    }
+    sparse = CollaborativeBasedRecommender(model_serving=FakeServing(sparse_model))
+
+    for user_id in (1, 2):
+        assert await sparse.get_collaborative_recommendations(user_id, 4, exclude_seen=True) == \
+            await recommender.get_collaborative_recommendations(user_id, 4, exclude_seen=True)
+
+
+def test_upgrade_sorts_legacy_interaction_matrix():
+    from app.models.model_persistance import upgrade_collaborative_model
+
+    legacy = {
+        "interaction_matrix": pd.DataFrame([[0.0, 2.0], [1.0, 0.0]], index=[5, 3], columns=[20, 10]),
+        "user_features": np.array([[5.0], [3.0]]),
+        "vehicle_features": np.array([[20.0], [10.0]]),
+    }
+    model = upgrade_collaborative_model(legacy)
+
+    assert "interaction_matrix" not in model
+    assert model["user_ids"].tolist() == [3, 5] and model["vehicle_ids"].tolist() == [10, 20]
+    assert model["interactions"].toarray().tolist() == [[0.0, 1.0], [2.0, 0.0]]
+    assert model["user_features"].ravel().tolist() == [3.0, 5.0]
+    assert model["vehicle_features"].ravel().tolist() == [10.0, 20.0]
+
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_folded_in_from_current_interactions():
+    repo = FakeUserRepo({99: [
+        {"vehicle_id": 20, "interaction_type": "view", "count": 2},
+        {"vehicle_id": 20, "interaction_type": "favorite", "count": 1},
+        {"vehicle_id": 77, "interaction_type": "view", "count": 5},
+    ]})
+    recommender = CollaborativeBasedRecommender(
+        FakeServing(sparse_model()), user_repo=repo, interaction_weights={"view": 1.0, "favorite": 3.0}
+    )
+
+    scores = await recommender.get_collaborative_recommendations(99, 4, exclude_seen=True)
+    batch = await recommender.get_batch_collaborative_recommendations([99, 1], 4, exclude_seen=True)
+
+    # r = 5.0 on vehicle 20 only, so the folded-in vector is 5 * vehicle_features[20].
+    cached_vector = recommender._fold_in_cache[99][2]
+    assert np.allclose(cached_vector, [0.5, 4.5])
+    assert 20 not in scores and list(scores)[0] == 30
+    assert batch[99] == pytest.approx(scores)
+    assert set(batch) == {1, 99}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_user_keeps_trained_vector_and_changes_refold(recommender):
+    repo = FakeUserRepo({1: [
+        {"vehicle_id": 10, "interaction_type": "view", "count": 3},
+        {"vehicle_id": 40, "interaction_type": "view", "count": 1},
+    ]})
+    live = CollaborativeBasedRecommender(FakeServing(sparse_model()), user_repo=repo, interaction_weights={"view": 1.0})
+
+    # Interactions still matching training keep the trained vector.
+    assert await live.get_collaborative_recommendations(1, 4) == await recommender.get_collaborative_recommendations(1, 4)
+    assert 1 not in live._fold_in_cache
+
+    # New activity folds the known user in; the vector is cached until it changes again.
+    repo.interactions[1].append({"vehicle_id": 20, "interaction_type": "view", "count": 4})
+    await live.get_collaborative_recommendations(1, 4)
+    first = live._fold_in_cache[1][2]
+    await live.get_collaborative_recommendations(1, 4)
+    assert live._fold_in_cache[1][2] is first
+
+    repo.interactions[1].append({"vehicle_id": 30, "interaction_type": "view", "count": 1})
+    await live.get_collaborative_recommendations(1, 4)
+    assert live._fold_in_cache[1][2] is not first
+
+
+@pytest.mark.asyncio
+async def test_caller_interactions_are_reused_for_fold_in():
+    repo = FakeUserRepo({})
+    live = CollaborativeBasedRecommender(FakeServing(sparse_model()), user_repo=repo, interaction_weights={"view": 1.0})
+
+    given = {99: [{"vehicle_id": 20, "interaction_type": "view", "count": 5}]}
+    batch = await live.get_batch_collaborative_recommendations([1, 99], 4, interactions=given)
+    assert repo.queried == [] and set(batch) == {1, 99}
+    assert np.allclose(live._fold_in_cache[99][2], [0.5, 4.5])
+
+    await live.get_batch_collaborative_recommendations([1, 98], 4)
+    assert repo.queried == [[1, 98]]
+
+
+@pytest.mark.asyncio
+async def test_fold_in_cache_is_bounded_and_reset_on_model_swap():
+    repo = FakeUserRepo({uid: [{"vehicle_id": 30, "interaction_type": "view", "count": uid}] for uid in (100, 101, 102)})
+    serving = FakeServing(sparse_model())
+    recommender = CollaborativeBasedRecommender(serving, user_repo=repo, interaction_weights={"view": 1.0}, fold_in_cache_size=2)
+
+    await recommender.get_batch_collaborative_recommendations([100, 101, 102], 2)
+    assert list(recommender._fold_in_cache) == [101, 102]
+
+    serving.model = sparse_model()
+    await recommender.get_collaborative_recommendations(100, 2)
+    assert list(recommender._fold_in_cache) == [100]
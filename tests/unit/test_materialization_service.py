@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.schemas.schemas import RecommendationResponse, VehicleRecommendation
+from app.services.caching_service import CachingService
+from app.services.materialization_service import RecommendationMaterializer
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.pending = []
+
+    def setex(self, key, ttl, value):
+        self.pending.append((key, value))
+
+    async def execute(self):
+        self.store.update(self.pending)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+
+class FakeServing:
+    versions = {"collaborative": "v1", "user_similarity": "v2"}
+
+
+class FakeUserRepo:
+    def __init__(self, stamps):
+        self.stamps = stamps
+
+    async def get_interaction_stamps(self, user_ids):
+        return {uid: self.stamps[uid] for uid in user_ids if uid in self.stamps}
+
+
+class FakeRecommender:
+    async def get_batch_recommendations(self, user_ids, top_n):
+        for user_id in user_ids:
+            recs = [VehicleRecommendation(vehicle_id=v, score=1.0 / v, features={}) for v in range(1, top_n + 1)]
+            yield user_id, RecommendationResponse(recommendations=recs, model_type="hybrid"), None
+
+
+@pytest.mark.asyncio
+async def test_entries_are_keyed_by_interaction_stamp(monkeypatch):
+    redis = FakeRedis()
+    repo = FakeUserRepo({1: "3-10", 2: "0-0"})
+    materializer = RecommendationMaterializer(CachingService(redis), FakeServing(), repo, top_n=5)
+    monkeypatch.setattr(materializer, "_known_users", lambda: _async([1, 2, 3]))
+
+    assert await materializer.materialize(FakeRecommender()) == 2
+
+    cached = await materializer.get(1, 5, "3-10")
+    assert [r.vehicle_id for r in cached.recommendations] == [1, 2, 3, 4, 5]
+    # Other sizes go to the live path: their candidate cap (top_n * 3) differs.
+    assert await materializer.get(1, 3, "3-10") is None
+    assert all(key.startswith("rec:user:") for key in redis.store)
+    assert json.loads(redis.store["rec:user:2:top:5:model:hybrid:mat:v1+v2:0-0"])["model_type"] == "hybrid"
+
+    # A new interaction changes the stamp, so the materialized list is no longer served.
+    assert await materializer.get(1, 5, "4-11") is None
+
+
+async def _async(value):
+    return value
@@ -0,0 +1,36 @@
+import importlib
+
+import pytest
+
+import config.app_config as app_config
+import config.ml_config as ml_config
+
+
+@pytest.fixture
+def load_config(monkeypatch):
+    """MLConfig as it would be built from the given environment."""
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.setattr(app_config, "settings", app_config.Settings())
+        return importlib.reload(ml_config).MLConfig()
+
+    yield load
+    monkeypatch.undo()
+    importlib.reload(ml_config)
+
+
+@pytest.mark.parametrize("env_name, attribute", [
+    ("COLLABORATIVE_FOLD_IN", "collaborative_fold_in"),
+    ("SIMILARITY_QUERY_WEIGHTING", "similarity_query_weighting"),
+])
+def test_boolean_flags_can_be_turned_off(load_config, env_name, attribute):
+    assert getattr(load_config(), attribute) is True
+    assert getattr(load_config(**{env_name: "false"}), attribute) is False
+
+
+def test_similarity_training_stays_exact_unless_ann_is_opted_in(load_config):
+    config = load_config()
+    assert config.similarity_training_mode == "blocked"
+    assert config.similarity_ann is False
+    assert load_config(SIMILARITY_ANN="true").similarity_ann is True
@@ -1,11 +1,20 @@
+import threading
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 import pandas as pd
 import numpy as np
 
+from app.models import model_persistance
 from app.services.ml_service import MLModelService
 from config.ml_config import MLConfig
 
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    return tmp_path
+
 @pytest.fixture
 def mock_rec_service():
     service = MagicMock()
@@ -59,6 +68,7 @@ async def test_prepare_data(ml_service):
 @pytest.mark.asyncio
 @patch("app.models.model_persistance.joblib.dump")
 async def test_train_vehicle_similarity_model(mock_dump, ml_service):
+    ml_service.config.similarity_artifact_format = "pickle"
     await ml_service.train_vehicle_similarity_model()
     sim = ml_service.vehicle_similarity_topk
     assert isinstance(sim, dict)
@@ -69,6 +79,7 @@ async def test_train_vehicle_similarity_model(mock_dump, ml_service):
 @pytest.mark.asyncio
 @patch("app.models.model_persistance.joblib.dump")
 async def test_train_user_similarity_model(mock_dump, ml_service):
+    ml_service.config.similarity_artifact_format = "pickle"
     await ml_service.train_user_similarity_model()
     sim = ml_service.user_similarity_topk
     assert isinstance(sim, dict)
@@ -79,10 +90,161 @@ async def test_train_user_similarity_model(mock_dump, ml_service):
 @pytest.mark.asyncio
 @patch("app.models.model_persistance.joblib.dump")
 async def test_train_collaborative_model(mock_dump, ml_service):
+    fit_svd, fit_threads = ml_service._fit_svd, []
+
+    def record_fit(sparse):
+        fit_threads.append(threading.current_thread())
+        return fit_svd(sparse)
+
+    ml_service._fit_svd = record_fit
     await ml_service.train_collaborative_model()
+    # The fit runs in a worker thread, never on the event loop.
+    assert fit_threads and fit_threads[0] is not threading.main_thread()
     model = ml_service.collaborative_model
     assert model is not None
     assert "svd" in model
     assert model["user_features"].shape[0] == 2
     assert model["vehicle_features"].shape[0] == 2
+    assert model["user_ids"].tolist() == [1, 2] and model["vehicle_ids"].tolist() == [101, 102]
+    assert model["interactions"].shape == (2, 2) and "interaction_matrix" not in model
+    mock_dump.assert_called_once()
+
+
+
+@pytest.mark.asyncio
+@patch("app.models.model_persistance.joblib.dump")
+async def test_train_collaborative_model_with_als(mock_dump, ml_service):
+    ml_service.config.collaborative_algorithm = "als"
+    ml_service.config.als_factors = 2
+    await ml_service.train_collaborative_model()
+    model = ml_service.collaborative_model
+    assert model["algorithm"] == "als" and model["svd"] is None
+    assert model["user_features"].shape == (2, 2)
+    assert model["vehicle_features"].shape == (2, 2)
     mock_dump.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_incremental_collaborative_training_only_touches_changed_rows(ml_service, mock_rec_service):
+    ml_service.config.collaborative_max_delta_fraction = 0.5
+    await ml_service.train_collaborative_model()
+    first = ml_service.collaborative_model
+    assert first["training"] == "full"
+
+    mock_rec_service.load_interactions_summary.return_value = pd.DataFrame({
+        "user_id": [1, 1, 2, 3],
+        "vehicle_id": [101, 102, 101, 101],
+        "interaction_type": ["view", "click", "view", "view"],
+        "count": [5, 3, 2, 4]
+    })
+    await ml_service.train_collaborative_model()
+    second = ml_service.collaborative_model
+
+    assert second["training"] == "incremental"
+    assert second["full_refit_at"] == first["full_refit_at"]
+    assert second["user_ids"].tolist() == [1, 2, 3]
+    assert np.allclose(second["user_features"][:2], first["user_features"])
+    assert np.allclose(second["vehicle_features"][1], first["vehicle_features"][1])
+    assert np.abs(second["user_features"][2]).sum() > 0
+
+    ml_service.config.collaborative_full_refit_hours = 0
+    await ml_service.train_collaborative_model()
+    assert ml_service.collaborative_model["training"] == "full"
+
+
+def test_blocked_topk_matches_exact(ml_service):
+    rng = np.random.default_rng(0)
+    features_df = pd.DataFrame(rng.normal(size=(300, 6)), columns=list("abcdef"))
+    features_df["Id"] = np.arange(300) + 1000
+
+    ml_service.config.similarity_training_mode = "exact"
+    exact = ml_service._train_content_based_topk(features_df, {"a": 2.0}, top_k=10)
+
+    ml_service.config.similarity_training_mode = "blocked"
+    ml_service.config.similarity_block_size = 32
+    blocked = ml_service._train_content_based_topk(features_df, {"a": 2.0}, top_k=10)
+
+    assert exact.keys() == blocked.keys()
+    for vid in exact:
+        assert [oid for oid, _ in blocked[vid]] == [oid for oid, _ in exact[vid]]
+        assert np.allclose([s for _, s in blocked[vid]], [s for _, s in exact[vid]], atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_prepare_features_runs_once_per_fingerprint(ml_service, model_dir):
+    features = await ml_service.prepare_features()
+
+    assert features.features.dtype == np.float32
+    assert features.features.shape == (2, len(features.feature_columns))
+    assert features.user_ids.tolist() == [1, 2] and features.item_ids.tolist() == [101, 102]
+    assert features.interactions[0, 0] == 5.0
+    assert (model_dir / "feature_store" / features.fingerprint).is_dir()
+
+    assert await ml_service.prepare_features() is features
+    ml_service.feature_set = None
+    reloaded = await ml_service.prepare_features()
+    assert reloaded.fingerprint == features.fingerprint
+    assert np.array_equal(reloaded.features, features.features)
+
+
+@pytest.mark.asyncio
+async def test_reweighting_interactions_reuses_stored_counts(ml_service, model_dir):
+    features = await ml_service.prepare_features()
+    assert set(features.typed_interactions) == {"click", "view"}
+
+    ml_service.config.interaction_weights = {"view": 2.0, "click": 1.0}
+    ml_service.feature_set = None
+    with patch.object(ml_service, "_encode_features") as encode:
+        reweighted = await ml_service.prepare_features()
+
+    encode.assert_not_called()
+    assert reweighted.fingerprint == features.fingerprint
+    assert reweighted.interactions[0, 0] == 10.0 and reweighted.interactions[0, 1] == 3.0
+    # Zero-weight types keep their (user, vehicle) entry, as the aggregated counts did.
+    unweighted_click = reweighted.reweighted({"view": 1.0}).interactions
+    assert unweighted_click.nnz == 3 and unweighted_click[0, 1] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_train_all_models_prepares_features_once(ml_service):
+    with patch.object(ml_service, "_encode_features", wraps=ml_service._encode_features) as encode:
+        await ml_service.train_all_models()
+
+    encode.assert_called_once()
+    assert ml_service.vehicle_similarity_topk is not None
+    assert ml_service.user_similarity_topk is not None
+    assert ml_service.collaborative_model["user_features"].shape[0] == 2
+
+
+@pytest.mark.asyncio
+async def test_encoder_reproduces_training_rows(ml_service, mock_rec_service):
+    features = await ml_service.prepare_features()
+    catalog = await mock_rec_service.load_vehicle_features()
+
+    for i, row in enumerate(catalog.to_dict("records")):
+        assert np.allclose(features.encoder.encode_row(row.get), features.features[i], atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_fold_in_new_vehicle_into_serving_model(ml_service, mock_rec_service):
+    from app.services.model_serving_service import ModelServingService
+
+    await ml_service.train_all_models()
+    serving = ModelServingService(max_workers=1)
+    await serving.reload_all()
+    ml_service.model_serving = serving
+
+    catalog = await mock_rec_service.load_vehicle_features()
+    new_vehicle = {**catalog.iloc[0].to_dict(), "Id": 103}
+    mock_rec_service.get_vehicle_by_id = MagicMock(side_effect=lambda vid: new_vehicle if vid == 103 else None)
+
+    base = serving.models["vehicle_similarity"]
+    patched = await ml_service.fold_in_vehicles([103])
+
+    assert patched == {"vehicle_similarity": 1, "user_similarity": 1}
+    model = serving.models["vehicle_similarity"]
+    neighbour, score = model[103][0]
+    assert neighbour == 101 and score == pytest.approx(1.0, abs=1e-3)
+    # The new listing also enters the existing lists it ranks in, over the shared arrays.
+    assert model[101][0][0] == 103
+    assert 103 in [vid for vid, _ in model[102]]
+    assert model.neighbor_ids is base.neighbor_ids
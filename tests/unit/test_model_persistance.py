@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from app.models import model_persistance
+from app.models.topk_index import TopKSimilarityIndex
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_topk_index_matches_dict_contract():
+    similarity = {
+        7: [(3, 0.9), (5, 0.4)],
+        3: [(7, 0.9), (5, 0.2)],
+        5: [(7, 0.4), (3, 0.2)],
+    }
+    index = TopKSimilarityIndex.from_dict(similarity)
+
+    assert 7 in index and 42 not in index
+    assert len(index) == 3
+    assert index[7][:1] == [(3, pytest.approx(0.9))]
+    assert [vid for vid, _ in index[5]] == [7, 3]
+    with pytest.raises(KeyError):
+        index[42]
+
+
+def test_weighted_scores_is_sparse_vector_matrix_product():
+    index = TopKSimilarityIndex.from_dict({
+        1: [(2, 0.5), (3, 0.25)],
+        2: [(1, 0.5), (3, 0.75)],
+        3: [(2, 0.75), (1, 0.25)],
+    })
+
+    ids, scores = index.weighted_scores([1, 2, 99], [2.0, 1.0, 5.0])
+    assert dict(zip(ids.tolist(), scores.tolist())) == pytest.approx({1: 0.5, 2: 1.0, 3: 1.25})
+
+    ids, scores = index.weighted_scores([1, 2], [2.0, 1.0], per_row=1)
+    assert dict(zip(ids.tolist(), scores.tolist())) == pytest.approx({1: 0.5, 2: 1.0})
+
+
+def test_with_rows_replaces_and_inserts_rows():
+    index = TopKSimilarityIndex.from_dict({
+        1: [(2, 0.5), (3, 0.25)],
+        3: [(2, 0.75), (1, 0.25)],
+    })
+
+    patched = index.with_rows({2: (np.array([3, 1]), np.array([0.75, 0.5])), 3: (np.array([1]), np.array([0.9]))})
+
+    assert sorted(patched) == [1, 2, 3] and len(patched) == 3
+    assert patched.scores is index.scores
+    assert patched[1][:] == index[1][:]
+    assert [vid for vid, _ in patched[2]] == [3, 1]
+    assert patched[3][:] == [(1, pytest.approx(0.9))]
+    assert 2 not in index
+
+    ids, scores = patched.weighted_scores([2, 3], [1.0, 2.0])
+    assert dict(zip(ids.tolist(), scores.tolist())) == pytest.approx({3: 0.75, 1: 2.3})
+
+    compacted = patched.compact()
+    assert compacted.vehicle_ids.tolist() == [1, 2, 3] and not compacted.overlay
+    assert compacted.to_dict() == patched.to_dict()
+
+
+def test_content_model_csr_round_trip(model_dir):
+    vehicle_ids = np.array([30, 10, 20])
+    top_idx = np.array([[1, 2], [2, 0], [0, 1]])
+    top_vals = np.array([[0.8, 0.1], [0.7, 0.8], [0.1, 0.7]], dtype=np.float32)
+    index = TopKSimilarityIndex.from_topk(vehicle_ids, top_idx, top_vals)
+
+    model_persistance.save_content_model(index)
+    loaded = model_persistance.load_content_model()
+
+    assert isinstance(loaded, TopKSimilarityIndex)
+    assert isinstance(loaded.scores, np.memmap)
+    assert loaded[30][:2] == [(10, pytest.approx(0.8)), (20, pytest.approx(0.1))]
+    assert loaded.to_dict() == index.to_dict()
+    assert model_persistance.model_exists("vehicle_similarity")
+    assert not (model_dir / "similarity_topk_vehicle.pkl").exists()
+
+
+def test_publish_version_writes_manifest_and_moves_current(model_dir):
+    first = model_persistance.save_collaborative_model({"svd": None}, watermark={"interaction_pairs": 3})
+    second = model_persistance.save_collaborative_model({"svd": None}, watermark={"interaction_pairs": 4})
+
+    assert model_persistance.current_version("collaborative") == second
+    assert model_persistance.list_versions("collaborative") == [first, second]
+
+    manifest = model_persistance.read_manifest("collaborative")
+    assert manifest["version"] == second
+    assert manifest["data_watermark"] == {"interaction_pairs": 4}
+    assert set(manifest["checksums"]) == {"model.pkl"}
+    assert model_persistance.verify_version("collaborative", second)
+    assert model_persistance.load_collaborative_model(first) == {"svd": None}
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models import model_persistance
+from app.services.model_serving_service import ModelServingService
+
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(model_persistance, "KEEP_VERSIONS", 2)
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_load():
+    calls = []
+
+    def slow_loader(version=None):
+        calls.append(1)
+        time.sleep(0.05)
+        return {"name": "model"}
+
+    serving = ModelServingService(max_workers=2, load_timeout=1.0)
+    serving.model_registry = {"collaborative": slow_loader}
+
+    results = await asyncio.gather(*(serving.load_model("collaborative") for _ in range(5)))
+
+    assert all(r == {"name": "model"} for r in results)
+    assert len(calls) == 1
+    assert serving.is_ready
+
+
+@pytest.mark.asyncio
+async def test_load_deadline_returns_none_and_load_continues():
+    serving = ModelServingService(max_workers=1, load_timeout=0.01)
+    serving.model_registry = {"collaborative": lambda version=None: time.sleep(0.1) or "model"}
+
+    assert await serving.load_model("collaborative") is None
+    assert not serving.is_ready
+    assert await serving.preload_all()
+    assert serving.models["collaborative"] == "model"
+
+
+@pytest.mark.asyncio
+async def test_reload_swaps_atomically_and_collects_drained_version():
+    first = model_persistance.save_collaborative_model({"generation": 1})
+    serving = ModelServingService(max_workers=1)
+
+    async with serving.use_model("collaborative") as in_flight:
+        second = model_persistance.save_collaborative_model({"generation": 2})
+        assert await serving.reload_model("collaborative") == second
+
+        assert in_flight == {"generation": 1}
+        assert (await serving.load_model("collaborative")) == {"generation": 2}
+        assert first in model_persistance.list_versions("collaborative")
+
+    assert model_persistance.list_versions("collaborative") == [second]
+
+
+@pytest.mark.asyncio
+async def test_publishing_never_prunes_served_or_leased_versions():
+    first = model_persistance.save_collaborative_model({"generation": 1})
+    serving = ModelServingService(max_workers=1)
+
+    async with serving.use_model("collaborative"):
+        second = model_persistance.save_collaborative_model({"generation": 2})
+        await serving.reload_model("collaborative")
+        assert serving.protected_versions("collaborative") == {first, second}
+
+        # KEEP_VERSIONS is 2: without protection these publishes would prune the leased version.
+        for generation in (3, 4):
+            model_persistance.save_collaborative_model(
+                {"generation": generation}, protect=serving.protected_versions("collaborative")
+            )
+        assert {first, second} <= set(model_persistance.list_versions("collaborative"))
+
+    assert serving.protected_versions("collaborative") == {second}
+
+
+@pytest.mark.asyncio
+async def test_worker_publishes_without_pruning_and_serving_prunes_on_reload():
+    first = model_persistance.save_collaborative_model({"generation": 1})
+    serving = ModelServingService(max_workers=1)
+
+    async with serving.use_model("collaborative"):
+        # The training worker cannot see this process's leases, so it never prunes.
+        published = [model_persistance.save_collaborative_model({"generation": g}, prune=False) for g in (2, 3, 4)]
+        assert model_persistance.list_versions("collaborative") == [first, *published]
+
+        assert await serving.reload_model("collaborative") == published[-1]
+        # Retention applied by the serving process: the leased version survives it.
+        assert model_persistance.list_versions("collaborative") == [first, *published[1:]]
+
+    assert model_persistance.list_versions("collaborative") == published[1:]
@@ -0,0 +1,88 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.retrain_scheduler import RetrainScheduler
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+VEHICLES = {"count": 100, "max_id": 100, "updated_at": "2026-01-01T00:00:00", "vehicle_limit": None, "car_features": "abc"}
+
+
+@pytest.fixture
+def scheduler():
+    user_repo = MagicMock()
+    user_repo.fetch_interaction_watermark = AsyncMock(return_value={"count": 1000, "max_id": 1000})
+    vehicle_repo = MagicMock()
+    vehicle_repo.fetch_watermark = AsyncMock(return_value=dict(VEHICLES))
+    vehicle_repo.count_changed_since = AsyncMock(return_value=0)
+    return RetrainScheduler(
+        vehicle_repo=vehicle_repo, user_repo=user_repo, redis_client=FakeRedis(),
+        retrain=AsyncMock(return_value=True), min_new_interactions=10, min_vehicle_changes=5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_first_round_records_baseline_without_training(scheduler):
+    assert await scheduler.check_once() == []
+    scheduler.retrain.assert_not_awaited()
+    assert await scheduler._load_baseline() == await scheduler.current_watermarks()
+    assert RetrainScheduler.LEASE_KEY not in scheduler.redis.data
+
+
+@pytest.mark.asyncio
+async def test_retrains_only_models_whose_inputs_changed(scheduler):
+    await scheduler.check_once()
+
+    scheduler.user_repo.fetch_interaction_watermark.return_value = {"count": 1005, "max_id": 1005}
+    assert await scheduler.check_once() == []
+
+    scheduler.user_repo.fetch_interaction_watermark.return_value = {"count": 1020, "max_id": 1020}
+    assert await scheduler.check_once() == ["collaborative"]
+    scheduler.retrain.assert_awaited_once_with(["collaborative"])
+    assert (await scheduler._load_baseline())["interactions"]["max_id"] == 1020
+
+    scheduler.vehicle_repo.fetch_watermark.return_value = {**VEHICLES, "updated_at": "2026-01-02T00:00:00"}
+    scheduler.vehicle_repo.count_changed_since.return_value = 7
+    assert await scheduler.check_once() == ["vehicle_similarity", "user_similarity"]
+    scheduler.vehicle_repo.count_changed_since.assert_awaited_with(VEHICLES)
+
+
+@pytest.mark.asyncio
+async def test_lease_and_failed_training_leave_baseline_alone(scheduler):
+    await scheduler.check_once()
+    scheduler.user_repo.fetch_interaction_watermark.return_value = {"count": 2000, "max_id": 2000}
+
+    scheduler.redis.data[RetrainScheduler.LEASE_KEY] = "other-instance"
+    assert await scheduler.check_once() == []
+    scheduler.retrain.assert_not_awaited()
+    assert scheduler.redis.data[RetrainScheduler.LEASE_KEY] == "other-instance"
+
+    del scheduler.redis.data[RetrainScheduler.LEASE_KEY]
+    scheduler.retrain.return_value = False
+    assert await scheduler.check_once() == []
+    assert (await scheduler._load_baseline())["interactions"]["max_id"] == 1000
+
+
+def test_jittered_delay_stays_in_range(scheduler):
+    scheduler.interval, scheduler.jitter = 100.0, 0.2
+    assert all(80.0 <= scheduler.next_delay() <= 120.0 for _ in range(50))
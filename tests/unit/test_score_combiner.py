@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.services.score_combiner import ArrayScoreCombiner, ScoreCombiner, VehicleIdIndex
+
+
+CONTENT = {10: 1.0, 20: 0.5, 30: 0.2}
+COLLAB = {20: 0.9, 40: 0.7, 10: 0.1}
+
+
+def test_array_combiner_matches_dict_combiner():
+    expected = ScoreCombiner().combine(CONTENT, COLLAB, 0.3, 0.7)
+    combined = ArrayScoreCombiner().combine(CONTENT, COLLAB, 0.3, 0.7)
+
+    assert combined.keys() == expected.keys()
+    for vid, score in expected.items():
+        assert combined[vid] == pytest.approx(score)
+
+
+def test_combine_top_n_is_sorted_and_truncated():
+    ranked = ArrayScoreCombiner().combine_top_n(CONTENT, COLLAB, 0.5, 0.5, top_n=2)
+
+    assert [vid for vid, _ in ranked] == [20, 10]
+    assert ranked[0][1] == pytest.approx(0.7)
+
+
+def test_rrf_uses_ranks_not_magnitudes():
+    combiner = ArrayScoreCombiner(fusion="rrf", rrf_k=1.0)
+    combined = combiner.combine({1: 100.0, 2: 1.0}, {2: 0.9, 1: 0.8}, 1.0, 1.0)
+
+    assert combined[1] == pytest.approx(1 / 2 + 1 / 3)
+    assert combined[2] == pytest.approx(1 / 3 + 1 / 2)
+
+
+def test_minmax_normalization_per_source():
+    combiner = ArrayScoreCombiner(normalization="minmax")
+    combined = combiner.combine({1: 10.0, 2: 20.0}, {}, 1.0, 1.0)
+
+    assert combined == {1: pytest.approx(0.0), 2: pytest.approx(1.0)}
+
+
+def test_shared_index_drops_unknown_ids():
+    combiner = ArrayScoreCombiner(vehicle_index=VehicleIdIndex(np.array([10, 20, 30])))
+    ranked = combiner.combine_top_n(CONTENT, COLLAB, 0.5, 0.5, top_n=10)
+
+    assert sorted(vid for vid, _ in ranked) == [10, 20, 30]
+
+
+def test_source_index_tracks_catalog_inserts():
+    catalog = {"ids": np.array([10, 20, 30])}
+    index = VehicleIdIndex(source=lambda: catalog["ids"])
+    combiner = ArrayScoreCombiner(vehicle_index=index)
+
+    assert index.current().ids is catalog["ids"]
+    # Vehicles inserted into the catalog are picked up without rebuilding the index.
+    catalog["ids"] = np.array([10, 20, 30, 40])
+    ranked = combiner.combine_top_n(CONTENT, COLLAB, 0.5, 0.5, top_n=10)
+    assert sorted(vid for vid, _ in ranked) == [10, 20, 30, 40]
+
+
+def test_unknown_ids_do_not_shift_normalization_or_ranking():
+    combiner = ArrayScoreCombiner(normalization="minmax", vehicle_index=VehicleIdIndex(np.array([10, 20, 30, 40, 99])))
+    # Scores are fused over the candidates only; a large catalog adds no absent entries.
+    assert combiner.combine_top_n(CONTENT, COLLAB, 0.5, 0.5, top_n=10) == \
+        ArrayScoreCombiner(normalization="minmax").combine_top_n(CONTENT, COLLAB, 0.5, 0.5, top_n=10)
+    assert combiner.combine_top_n({}, {}, 0.5, 0.5, top_n=3) == []
+
+
+def test_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        ArrayScoreCombiner(fusion="borda")
+    with pytest.raises(ValueError):
+        ArrayScoreCombiner(normalization="softmax")
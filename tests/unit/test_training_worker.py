@@ -0,0 +1,103 @@
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pandas as pd
+import pytest
+
+from app.models import model_persistance
+from app.services.ml_service import MLModelService
+from app.services.training_runner import TrainingRunner
+from app.services.training_worker import EVENT_PREFIX, parse_event, read_status, run_phases
+from config.ml_config import MLConfig
+
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def ml_service():
+    repo = MagicMock()
+    repo.load_interactions_summary = AsyncMock(return_value=pd.DataFrame({
+        "user_id": [1, 1, 2],
+        "vehicle_id": [101, 102, 101],
+        "interaction_type": ["view", "favorite-added", "view"],
+        "count": [5, 3, 2],
+    }))
+    repo.load_vehicle_features = AsyncMock(return_value=pd.DataFrame({
+        "Id": [101, 102],
+        "Make": ["Toyota", "Honda"],
+        "Model": ["Corolla", "Civic"],
+        "Horsepower": [130, 158],
+        "TorqueFtLbs": [128, 138],
+        "EngineSize": ["1.8L", "2.0L"],
+        "ZeroTo60MPH": [10.0, 8.5],
+        "DrivetrainType": ["FWD", "FWD"],
+        "CO2Emissions": [120, 140],
+        "Transmission": ["Auto", "Manual"],
+        "Price": [20000, 22000],
+        "Year": [2020, 2021],
+        "Color": ["Red", "Blue"],
+        "FuelType": ["Gasoline", "Gasoline"],
+        "CityMPG": [30, 32],
+        "Mileage": [15000, 12000],
+        "Status": ["Available", "Sold"],
+    }))
+    return MLModelService(user_repo=repo, vehicle_repo=repo, model_serving=MagicMock(), config=MLConfig())
+
+
+@pytest.mark.asyncio
+async def test_run_phases_publishes_versions_and_reports_timings(ml_service, capsys):
+    versions = await run_phases(ml_service, ["vehicle_similarity", "collaborative"])
+
+    assert versions["vehicle_similarity"] == model_persistance.current_version("vehicle_similarity")
+    assert versions["collaborative"] is not None
+
+    status = read_status()
+    assert status["state"] == "finished"
+    assert set(status["phases"]) == {"prepare_features", "vehicle_similarity", "collaborative"}
+
+    events = [parse_event(line) for line in capsys.readouterr().out.splitlines()]
+    finished = [e["phase"] for e in events if e and e["event"] == "phase_finished"]
+    assert finished == ["prepare_features", "vehicle_similarity", "collaborative"]
+
+
+@pytest.mark.asyncio
+async def test_run_phases_records_failure(ml_service):
+    ml_service.train_collaborative_model = AsyncMock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError):
+        await run_phases(ml_service, ["collaborative"])
+
+    status = read_status()
+    assert status["state"] == "failed" and status["phase"] == "collaborative"
+
+
+def test_runner_command_and_event_parsing():
+    runner = TrainingRunner(model_serving=MagicMock(), python="python")
+
+    assert runner.command(["collaborative"], full_refit=True) == [
+        "python", "-m", "app.services.training_worker", "--models", "collaborative", "--full-refit", "--no-notify"
+    ]
+    runner._handle_line(EVENT_PREFIX + '{"event": "phase_finished", "phase": "collaborative", "seconds": 1.5}')
+    runner._handle_line("[SAVE] Collaborative model saved")
+    assert runner.last_event == {"event": "phase_finished", "phase": "collaborative", "seconds": 1.5}
+
+
+@pytest.mark.asyncio
+async def test_runner_reloads_only_after_successful_worker_exit(monkeypatch):
+    serving = MagicMock()
+    serving.reload_all = AsyncMock(return_value={"collaborative": "v2"})
+    runner = TrainingRunner(model_serving=serving)
+
+    script = f"print({EVENT_PREFIX!r} + '{{\"event\": \"finished\", \"versions\": {{}}}}')"
+    monkeypatch.setattr(runner, "command", lambda models, full_refit=False: [sys.executable, "-c", script])
+    assert await runner.train(["collaborative"]) is True
+    assert runner.last_event["event"] == "finished"
+    serving.reload_all.assert_awaited_once()
+
+    monkeypatch.setattr(runner, "command", lambda models, full_refit=False: [sys.executable, "-c", "raise SystemExit(3)"])
+    assert await runner.train(["collaborative"]) is False
+    serving.reload_all.assert_awaited_once()
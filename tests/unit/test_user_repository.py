@@ -0,0 +1,47 @@
+import asyncio
+
+from app.repositories.user_repository import UserRepository
+
+
+class FakeConnection:
+    def __init__(self):
+        self.watermark = {"count": 3, "max_id": 3}
+        self.summary_queries = 0
+
+    async def fetchrow(self, query, *args):
+        return self.watermark
+
+    async def fetch(self, query, *args):
+        self.summary_queries += 1
+        return [{"user_id": 1, "vehicle_id": 10, "interaction_type": "view", "count": self.watermark["count"]}]
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+def test_interaction_summary_is_reloaded_when_the_watermark_moves():
+    conn = FakeConnection()
+    repo = UserRepository(FakePool(conn))
+
+    first = asyncio.run(repo.load_interactions_summary())
+    assert asyncio.run(repo.load_interactions_summary()) is first
+    assert conn.summary_queries == 1
+
+    conn.watermark = {"count": 4, "max_id": 4}
+    refreshed = asyncio.run(repo.load_interactions_summary())
+    assert conn.summary_queries == 2
+    assert refreshed.loc[0, "count"] == 4
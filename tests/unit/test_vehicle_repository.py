@@ -0,0 +1,191 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from app.repositories.vehicle_repository import VehicleRepository
+
+
+CAR_FEATURES = [
+    {"make": "Acura", "model": "RDX", "year": 2023, "features": {
+        "fuelEconomy": {"CO2Emissions": 240, "cityMPG": 21},
+        "engine": {"horsepower": 330, "torqueFtLBS": 350, "size": "3.0L"},
+        "performance": {"ZeroTo60MPH": 5},
+        "drivetrain": {"type": "all-wheel drive"},
+    }},
+    {"make": "Honda", "model": "Civic", "year": 2020, "features": {"engine": {"horsepower": 150}}},
+    {"make": "Honda", "model": "Civic", "year": 2020, "features": {"engine": {"horsepower": 158}}},
+]
+
+
+def catalog(n=4):
+    return pd.DataFrame({
+        "Id": np.arange(1, n + 1),
+        "Make": ["Acura", "Honda", "Ford", "Acura"][:n],
+        "Model": ["RDX", "Civic", "Focus", "RDX"][:n],
+        "Year": [2023, 2020, 2019, 2022][:n],
+        "Price": [40000.0, 20000.0, 15000.0, 38000.0][:n],
+    })
+
+
+def test_enrichment_joins_on_make_model_year():
+    features = VehicleRepository.flatten_car_features(CAR_FEATURES)
+    df = VehicleRepository.enrich_vehicle_features(catalog(), features)
+
+    assert df["Id"].tolist() == [1, 2, 3, 4]
+    assert df.loc[0, "Horsepower"] == 330
+    assert df.loc[0, "DrivetrainType"] == "all-wheel drive"
+    # Later duplicates win; missing nested values stay None.
+    assert df.loc[1, "Horsepower"] == 158
+    assert df.loc[1, "CityMPG"] is None
+    # Unmatched rows (different model or year) get None everywhere.
+    for row in (2, 3):
+        assert all(df.loc[row, col] is None for col in VehicleRepository.ENRICHMENT_COLUMNS)
+
+
+def test_lookup_built_from_columns():
+    df = VehicleRepository.enrich_vehicle_features(catalog(), VehicleRepository.flatten_car_features(CAR_FEATURES))
+    lookup = VehicleRepository._build_lookup(df)
+
+    assert sorted(lookup) == [1, 2, 3, 4]
+    assert lookup[1]["Make"] == "Acura" and lookup[1]["Horsepower"] == 330
+    assert VehicleRepository.extract_vehicle_features(lookup[3])["Horsepower"] == "None"
+
+
+def test_enrichment_of_empty_catalog():
+    df = VehicleRepository.enrich_vehicle_features(pd.DataFrame(), VehicleRepository.flatten_car_features([]))
+
+    assert df.empty
+    assert set(VehicleRepository.ENRICHMENT_COLUMNS) <= set(df.columns)
+
+
+def test_apply_changes_patches_rows_in_place_and_appends_inserts():
+    df = catalog(3)
+    changes = pd.DataFrame({
+        "Id": [2, 5, 6],
+        "Make": ["Honda", "Kia", "Kia"],
+        "Model": ["Civic", "Rio", "Soul"],
+        "Year": [2020, 2021, 2022],
+        "Price": [18500.0, 12000.0, 14000.0],
+    })
+
+    patched, changed = VehicleRepository.apply_changes(df, changes, vehicle_limit=4)
+
+    assert changed == [2, 5]
+    assert patched["Id"].tolist() == [1, 2, 3, 5]
+    assert patched.loc[1, "Price"] == 18500.0
+    assert df.loc[1, "Price"] == 18500.0
+    assert VehicleRepository._cursor_of(changes)["max_id"] == 6
+
+
+class FakeRecord(tuple):
+    def __new__(cls, row):
+        record = super().__new__(cls, row.values())
+        record._keys = list(row)
+        return record
+
+    def keys(self):
+        return self._keys
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def fetch(self, n):
+        chunk, self.rows = self.rows[:n], self.rows[n:]
+        return chunk
+
+
+class FakeConnection:
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        return [{"column_name": c} for c in self.columns]
+
+    def transaction(self):
+        return _AsyncNullContext()
+
+    async def cursor(self, query):
+        self.queries.append(query)
+        return FakeCursor(self.rows)
+
+
+class _AsyncNullContext:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_stream_catalog_reads_in_chunks_and_selects_catalog_columns():
+    columns = ["Id", "Vin", "Make", "Year", "Price"]
+    rows = [FakeRecord({"Id": i, "Make": "Honda", "Year": 2020, "Price": 1000.0 * i}) for i in range(1, 8)]
+    conn = FakeConnection(rows, columns)
+    repo = VehicleRepository(pool=None, chunk_size=3)
+
+    df = asyncio.run(repo._stream_catalog(conn, expected_rows=2))
+
+    assert '"Vin"' not in conn.queries[0] and "LIMIT" not in conn.queries[0]
+    assert df["Id"].tolist() == list(range(1, 8))
+    assert df["Id"].dtype == np.int64
+    assert df["Price"].tolist()[-1] == 7000.0
+
+
+def test_refresh_rewrites_snapshot_at_bounded_cadence():
+    repo = VehicleRepository(pool=None, snapshot_dir=None, snapshot_every=3, snapshot_min_changes=4)
+    repo._set_catalog(catalog(3), None)
+    repo._car_features = VehicleRepository.flatten_car_features(CAR_FEATURES)
+    polls = iter([[2], [3], [1], [10, 11, 12, 13]])
+    saves = []
+
+    async def fetch_watermark():
+        return {"count": len(repo._vehicle_cache), "updated_at": "2024-01-01T00:00:00"}
+
+    async def fetch_changes():
+        ids = next(polls)
+        return pd.DataFrame({"Id": ids, "Make": "Kia", "Model": "Rio", "Year": 2021, "Price": 9000.0})
+
+    save_snapshot = repo._save_snapshot
+
+    async def record_save(df, watermark):
+        saves.append(len(df))
+        await save_snapshot(df, watermark)
+
+    repo.fetch_watermark, repo.fetch_changes, repo._save_snapshot = fetch_watermark, fetch_changes, record_save
+
+    async def ticks():
+        return [await repo.refresh_changes() for _ in range(4)]
+
+    assert asyncio.run(ticks()) == [[2], [3], [1], [10, 11, 12, 13]]
+    # Every third tick, then early once the changed rows reach the threshold.
+    assert saves == [3, 7]
+    assert repo.get_vehicle_by_id(12)["Make"] == "Kia" and repo.get_vehicle_by_id(2)["Price"] == 9000.0
+
+
+def test_stale_snapshot_is_caught_up_only_without_unseen_changes():
+    snapshot = {"count": 10, "max_id": 10, "updated_at": "2024-01-01T00:00:00", "vehicle_limit": None,
+                "car_features": "abc"}
+
+    assert VehicleRepository._can_catch_up(snapshot, {**snapshot, "count": 12, "updated_at": "2024-01-02T00:00:00"})
+    assert not VehicleRepository._can_catch_up(snapshot, {**snapshot, "count": 9})
+    assert not VehicleRepository._can_catch_up(snapshot, {**snapshot, "car_features": "def"})
+    assert not VehicleRepository._can_catch_up({**snapshot, "updated_at": None}, {**snapshot, "updated_at": None})
+
+
+def test_stream_catalog_buffers_are_typed_per_column():
+    rows = [FakeRecord({"Id": i, "Make": "Honda", "Year": 2020 if i < 4 else None, "Price": None if i == 5 else i})
+            for i in range(1, 8)]
+    repo = VehicleRepository(pool=None, chunk_size=3)
+
+    df = asyncio.run(repo._stream_catalog(FakeConnection(rows, ["Id", "Make", "Year", "Price"])))
+
+    # String columns are object on every pandas version; pandas 3 would otherwise infer StringDtype.
+    assert df["Id"].dtype == np.int64 and df["Make"].dtype == object
+    # Ints widen to float64 once a later chunk carries NULLs.
+    assert df["Year"].dtype == np.float64 and df["Year"].isna().tolist() == [False] * 3 + [True] * 4
+    assert df["Price"].dtype == np.float64 and np.isnan(df.loc[4, "Price"]) and df.loc[6, "Price"] == 7.0
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from app.repositories.vehicle_store import FEATURE_FIELDS, VehicleStore, render_features
+
+
+def catalog():
+    return pd.DataFrame({
+        "Id": np.array([30, 10, 20]),
+        "Make": ["Honda", "Acura", "Honda"],
+        "Year": [2020, 2023, 2021],
+        "Price": [20000.5, np.nan, 18000.0],
+        "Horsepower": pd.Series([158, None, 330], dtype=object),
+    })
+
+
+def test_lookup_by_id_returns_row_views():
+    store = VehicleStore(catalog())
+
+    assert sorted(store) == [10, 20, 30]
+    assert 20 in store and 40 not in store
+    assert store.get(40) is None
+
+    row = store[30]
+    assert row["Make"] == "Honda" and row["Year"] == 2020 and row["Horsepower"] == 158
+    assert store[10]["Horsepower"] is None
+    assert dict(store[20]) == {"Id": 20, "Make": "Honda", "Year": 2021, "Price": 18000.0, "Horsepower": 330}
+
+
+def test_prerendered_features_match_per_row_rendering():
+    df = catalog()
+    store = VehicleStore(df)
+
+    for record in df.to_dict("records"):
+        assert store[record["Id"]].features() == render_features(record.get)
+
+    features = store[10].features()
+    assert list(features) == list(FEATURE_FIELDS)
+    assert features["Price"] == "nan" and features["Horsepower"] == "None" and features["Color"] == ""
+
+
+def test_apply_patches_and_appends_rows_in_place():
+    store = VehicleStore(catalog())
+    features = store._features
+
+    store.apply(pd.DataFrame({
+        "Id": [20, 5, 40],
+        "Make": ["Toyota", "Acura", None],
+        "Year": [2022, 2019, 2024],
+        "Price": [17500.0, 9000.0, np.nan],
+        "Horsepower": pd.Series([None, 200, 150], dtype=object),
+    }))
+
+    assert sorted(store) == [5, 10, 20, 30, 40] and len(store) == 5
+    assert dict(store[20]) == {"Id": 20, "Make": "Toyota", "Year": 2022, "Price": 17500.0, "Horsepower": None}
+    assert store[5]["Make"] == "Acura" and store[40]["Make"] is None and store[30]["Make"] == "Honda"
+    assert store[40].features()["Price"] == "nan" and store[20].features()["Make"] == "Toyota"
+
+    # Unchanged rows keep their rendering; only the grown arrays are new.
+    assert store[30].features() == VehicleStore(catalog())[30].features()
+    assert store._features is not features
+
+
+def test_apply_does_not_write_through_to_the_source_frame():
+    df = catalog()
+    store = VehicleStore(df)
+
+    store.apply(pd.DataFrame({"Id": [30], "Make": ["Honda"], "Year": [1999], "Price": [1.0], "Horsepower": [100]}))
+
+    assert store[30]["Year"] == 1999
+    assert df["Year"].tolist() == [2020, 2023, 2021] and df["Price"].iloc[0] == 20000.5
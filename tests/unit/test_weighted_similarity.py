@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from app.models import model_persistance
+from app.models.topk_index import TopKSimilarityIndex
+from app.models.weighted_similarity import WeightedFeatureIndex
+
+COLUMNS = ["Make", "Price", "Horsepower"]
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(0)
+    return np.arange(50) + 100, rng.normal(size=(50, 3)).astype(np.float32)
+
+
+def _exact(features, row, weights, top_n):
+    weighted = features * weights
+    weighted /= np.linalg.norm(weighted, axis=1, keepdims=True)
+    sims = weighted @ weighted[row]
+    sims[row] = -np.inf
+    return np.argsort(-sims)[:top_n], np.sort(sims)[::-1][:top_n]
+
+
+def test_matches_cosine_of_weighted_features(catalog):
+    vehicle_ids, features = catalog
+    index = WeightedFeatureIndex(vehicle_ids, features, COLUMNS, default_weights={"Price": 3.0})
+
+    rows, scores = _exact(features, 7, np.array([1.0, 3.0, 1.0]), 5)
+    similar = index.similar(107, 5)
+    assert [vid for vid, _ in similar] == vehicle_ids[rows].tolist()
+    assert [s for _, s in similar] == pytest.approx(scores.tolist(), abs=1e-5)
+
+    # A per-request profile overrides the defaults.
+    rows, _ = _exact(features, 7, np.array([1.0, 0.5, 4.0]), 5)
+    assert [vid for vid, _ in index.similar(107, 5, {"Price": 0.5, "Horsepower": 4.0})] == vehicle_ids[rows].tolist()
+    assert index.similar(999, 5) is None
+
+
+def test_rejects_unknown_or_negative_weights(catalog):
+    index = WeightedFeatureIndex(*catalog, COLUMNS)
+    with pytest.raises(ValueError):
+        index.similar(100, 5, {"Seats": 1.0})
+    with pytest.raises(ValueError):
+        index.similar(100, 5, {"Price": -1.0})
+
+
+def test_profile_norms_are_cached_per_profile(catalog):
+    index = WeightedFeatureIndex(*catalog, COLUMNS, profile_cache_size=2)
+    for profile in ({"Price": 2.0}, {"Price": 3.0}, {"Price": 2.0}, {"Price": 4.0}):
+        index.similar(100, 3, profile)
+    assert len(index._inverse_norms) == 2
+
+
+def test_with_vectors_adds_and_replaces_vehicles(catalog):
+    vehicle_ids, features = catalog
+    index = WeightedFeatureIndex(vehicle_ids, features, COLUMNS)
+    patched = index.with_vectors(np.array([105, 1000]), features[[0, 1]])
+
+    assert 1000 in patched and 1000 not in index and len(patched) == 51
+    assert patched.similar(1000, 1)[0][0] == 101
+    assert patched.similar(105, 1)[0] == (100, pytest.approx(1.0, abs=1e-5))
+
+
+def test_with_vectors_shares_matrix_and_norm_cache(catalog):
+    vehicle_ids, features = catalog
+    index = WeightedFeatureIndex(vehicle_ids, features, COLUMNS)
+    index.similar(100, 3, {"Price": 2.0})
+    patched = index.with_vectors(np.array([105, 1000]), features[[0, 1]])
+
+    assert patched.features is index.features and patched._inverse_norms is index._inverse_norms
+    similar, compacted = patched.similar(107, 10, {"Price": 2.0}), patched.compact().similar(107, 10, {"Price": 2.0})
+    assert [vid for vid, _ in similar] == [vid for vid, _ in compacted]
+    assert [s for _, s in similar] == pytest.approx([s for _, s in compacted], abs=1e-5)
+    assert len(patched.compact()) == 51
+
+
+def test_weighted_features_persisted_with_content_model(tmp_path, monkeypatch, catalog):
+    monkeypatch.setattr(model_persistance, "MODEL_DIR", str(tmp_path))
+    vehicle_ids, features = catalog
+    neighbors = ((np.arange(50) + 1) % 50)[:, None]
+    index = TopKSimilarityIndex.from_topk(vehicle_ids, neighbors, np.ones((50, 1), dtype=np.float32))
+    index.weighted = WeightedFeatureIndex(vehicle_ids, features, COLUMNS, default_weights={"Make": 2.0})
+
+    model_persistance.save_content_model(index)
+    loaded = model_persistance.load_content_model()
+
+    assert loaded.weighted.default_weights == {"Make": 2.0}
+    assert not isinstance(loaded.weighted.features, np.memmap)
+    assert loaded.weighted.similar(110, 5, {"Price": 2.0}) == index.weighted.similar(110, 5, {"Price": 2.0})